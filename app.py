@@ -1,44 +1,260 @@
 #final modified tt
-from flask import Flask, request, jsonify
-from datetime import time
+from flask import Flask, Response, request, jsonify, g
+from datetime import time, datetime
 import db_connection
-from integrate_timetable_solver import IntegratedTimetableSolver
+from integrate_timetable_solver import SolverOptions
+from timetable_result import TimetableResult, format_text
 import generate_lab_timetable
+import jobs
+import lab_timetable_store
+import metrics
+import result_cache
 import json
-import ast
+import hashlib
+from time import perf_counter, sleep
 
 app = Flask(__name__)
 
+# Repeated requests are answered from a cache of earlier results; see result_cache.py
+timetable_cache = result_cache.ResultCache('result_cache.db')
+lab_timetable_cache = result_cache.ResultCache('result_cache.db')
+
+# Service metrics, scraped from /metrics; see metrics.py
+registry = metrics.Registry()
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to answer an HTTP request.", ("method", "route", "code"))
+timetable_solves = registry.counter(
+    "timetable_solves_total", "Timetable jobs run by a worker, by job outcome and CP-SAT status.",
+    ("outcome", "status"))
+timetable_solve_duration = registry.histogram(
+    "timetable_solve_duration_seconds", "Time a worker spent on a timetable job, building the model included.",
+    ("outcome",))
+timetable_search_duration = registry.histogram(
+    "timetable_search_duration_seconds", "CP-SAT search time of finished timetable jobs.", ("status",))
+MODEL_SIZE_BUCKETS = (100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+timetable_model_variables = registry.histogram(
+    "timetable_model_variables", "CP-SAT variables of the solved timetable models.", buckets=MODEL_SIZE_BUCKETS)
+timetable_model_constraints = registry.histogram(
+    "timetable_model_constraints", "CP-SAT constraints of the solved timetable models.", buckets=MODEL_SIZE_BUCKETS)
+lab_timetable_solves = registry.counter(
+    "lab_timetable_solves_total", "Lab allocations computed (cache misses), by mode used and whether all "
+    "demand was assigned.", ("mode", "status"))
+lab_timetable_solve_duration = registry.histogram(
+    "lab_timetable_solve_duration_seconds", "Time to compute a lab allocation.", ("mode",))
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Time to run and commit a database query.", ("operation",))
+db_query_errors = registry.counter(
+    "db_query_errors_total", "Database queries that raised.", ("operation",))
+db_pool_acquire_duration = registry.histogram(
+    "db_pool_acquire_duration_seconds", "Time to check a connection out of the pool.")
+registry.collect(
+    "gauge", "db_pool_connections", "Open pooled database connections, by state.", ("state",),
+    lambda: [(state, db_connection.pool.stats()[state]) for state in ("in_use", "idle")])
+registry.collect(
+    "gauge", "db_pool_max_connections", "Most database connections the pool opens.", (),
+    lambda: [((), db_connection.pool.max_size)])
+RESULT_CACHES = {"timetable": timetable_cache, "lab_timetable": lab_timetable_cache}
+registry.collect(
+    "counter", "result_cache_lookups_total", "Result cache lookups, by outcome.", ("cache", "result"),
+    lambda: [((name, result), cache.stats()[count]) for name, cache in RESULT_CACHES.items()
+             for result, count in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses"))])
+registry.collect(
+    "gauge", "result_cache_hit_ratio", "Share of result cache lookups answered from the cache.", ("cache",),
+    lambda: [(name, cache.stats()["hit_rate"]) for name, cache in RESULT_CACHES.items()])
+registry.collect(
+    "gauge", "result_cache_memory_entries", "Results held in the in-memory cache tier.", ("cache",),
+    lambda: [(name, cache.stats()["memory_entries"]) for name, cache in RESULT_CACHES.items()])
+
+
+def record_timetable_job(job, result):
+    """Solve metrics of a finished timetable job (JobQueue on_finish)."""
+    status = result["status"] if result is not None else ""
+    timetable_solves.labels(job["status"], status).inc()
+    if job["started_at"] is not None:
+        timetable_solve_duration.labels(job["status"]).observe(job["finished_at"] - job["started_at"])
+    if result is not None:
+        timetable_search_duration.labels(status).observe(result["wall_time"])
+        model = result["statistics"].get("model")
+        if model:
+            timetable_model_variables.observe(model["variables"])
+            timetable_model_constraints.observe(model["constraints"])
+
+
+# Timetable solves run in the background; see jobs.py
+job_queue = jobs.JobQueue(jobs.JobStore('jobs.db'), max_workers=2, result_cache=timetable_cache,
+                          on_finish=record_timetable_job)
+registry.collect(
+    "gauge", "timetable_jobs_in_flight", "Timetable jobs queued or running in the worker pool.", (),
+    lambda: [((), len(job_queue.futures))])
+
+
+@app.before_request
+def start_timer():
+    g.request_started = perf_counter()
+
+@app.after_request
+def record_request(response):
+    # The route pattern, not the path, so job ids don't make a series each
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request_duration.labels(request.method, route, response.status_code).observe(
+        perf_counter() - g.request_started)
+    return response
+
+
+def get_cursor():
+    """Check a pooled connection out for the rest of this request and return its cursor."""
+    if 'db_connection' not in g:
+        started = perf_counter()
+        g.db_connection = db_connection.pool.acquire()
+        db_pool_acquire_duration.observe(perf_counter() - started)
+        g.db_cursor = g.db_connection.cursor()
+    return g.db_cursor
+
+@app.teardown_appcontext
+def release_connection(error):
+    connection = g.pop('db_connection', None)
+    g.pop('db_cursor', None)
+    if connection is not None:
+        # A request that blew up may have left the connection in a bad state
+        db_connection.pool.release(connection, discard=error is not None or g.pop('db_broken', False))
+
+def rollback():
+    try:
+        g.db_connection.rollback()
+    except Exception:
+        g.db_broken = True
 
 def insert_data(query, values):
     try:
-        connection = db_connection.get_connection()
-
-        cursor = connection.cursor()
+        cursor = get_cursor()
 
         print(query)
+        started = perf_counter()
         cursor.execute(query, values)
 
-        connection.commit()
-        connection.close()
+        g.db_connection.commit()
+        db_query_duration.labels("insert").observe(perf_counter() - started)
+        return True
+    except Exception as error:
+        db_query_errors.labels("insert").inc()
+        if 'db_connection' in g:
+            rollback()
+        return error
+
+def insert_many(query, rows):
+    """Insert every row with one executemany() in a single transaction."""
+    try:
+        cursor = get_cursor()
+
+        started = perf_counter()
+        cursor.executemany(query, rows)
+
+        g.db_connection.commit()
+        db_query_duration.labels("insert_many").observe(perf_counter() - started)
         return True
     except Exception as error:
+        db_query_errors.labels("insert_many").inc()
+        if 'db_connection' in g:
+            rollback()
         return error
 
-def fetch_data(query):
+def is_positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def is_non_negative_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def is_name(value):
+    return isinstance(value, str) and value.strip() != ""
+
+def is_flag(value):
+    # 1.0 == 1, so check the type as well
+    return isinstance(value, bool) or (type(value) is int and value in (0, 1))
+
+def bulk_insert(query, fields):
+    """
+    Validate a JSON array of rows in one pass and insert the valid ones.
+
+    fields is a list of (name, check) pairs in the column order of query.
+    Invalid rows are reported by index and skipped; valid rows are written
+    together in one transaction.
+    """
+    started = perf_counter()
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        return jsonify({"error": "Expected a JSON array of rows"}), 400
+
+    values = []
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"index": index, "error": "Row must be an object"})
+            continue
+        invalid = [name for name, check in fields if not check(row.get(name))]
+        if invalid:
+            errors.append({"index": index, "error": f"Invalid or missing: {', '.join(invalid)}"})
+            continue
+        values.append(tuple(row[name] for name, _ in fields))
+
+    inserted = 0
+    if values:
+        outcome = insert_many(query, values)
+        if outcome is not True:
+            return jsonify({
+                "error": str(outcome),
+                "received": len(rows),
+                "inserted": 0,
+                "errors": errors,
+                "elapsed_ms": round((perf_counter() - started) * 1000, 2),
+            }), 500
+        inserted = len(values)
+
+    return jsonify({
+        "received": len(rows),
+        "inserted": inserted,
+        "errors": errors,
+        "elapsed_ms": round((perf_counter() - started) * 1000, 2),
+    }), 200
+
+# Set once lab_sessions is known to exist in this process
+lab_schema_ready = False
+
+def store_lab_timetable(schedule):
+    """Save a lab timetable and its sessions in one transaction. Returns the new id."""
+    global lab_schema_ready
     try:
-        connection = db_connection.get_connection()
+        cursor = get_cursor()
 
-        cursor = connection.cursor()
+        if not lab_schema_ready:
+            # CREATE TABLE commits implicitly in MySQL, so run it before the inserts
+            lab_timetable_store.ensure_schema(cursor)
+            lab_schema_ready = True
 
-        cursor.execute(query)
+        timetable_id = lab_timetable_store.save_timetable(cursor, schedule)
+
+        g.db_connection.commit()
+        return timetable_id
+    except Exception as error:
+        if 'db_connection' in g:
+            rollback()
+        return error
+
+def fetch_data(query, values=None):
+    try:
+        cursor = get_cursor()
+
+        started = perf_counter()
+        cursor.execute(query, values)
 
         results = cursor.fetchall()
 
-        connection.commit()
-        connection.close()
+        g.db_connection.commit()
+        db_query_duration.labels("fetch").observe(perf_counter() - started)
         return results
     except Exception as error:
+        db_query_errors.labels("fetch").inc()
+        if 'db_connection' in g:
+            rollback()
         return error
 
 
@@ -96,6 +312,27 @@ def add_labs_per_section():
     insert_data(query, values)
     return jsonify({"message": "Lab count added successfully"})
 
+#--- Bulk variants: each takes a JSON array of the single-row payloads ---
+@app.route('/year/bulk', methods=['POST'])
+def add_years():
+    query = "INSERT INTO Years (name) VALUES (%s);"
+    return bulk_insert(query, [("name", is_name)])
+
+@app.route('/section/bulk', methods=['POST'])
+def add_sections():
+    query = "INSERT INTO Sections (year_id, section_name) VALUES (%s, %s);"
+    return bulk_insert(query, [("year_id", is_positive_int), ("section_name", is_name)])
+
+@app.route('/subject/bulk', methods=['POST'])
+def add_subjects():
+    query = "INSERT INTO Subjects (year_id, subject_name, is_lab) VALUES (%s, %s, %s);"
+    return bulk_insert(query, [("year_id", is_positive_int), ("subject_name", is_name), ("is_lab", is_flag)])
+
+@app.route('/labs-per-section/bulk', methods=['POST'])
+def add_labs_per_sections():
+    query = "INSERT INTO LabsPerSection (section_id, num_labs) VALUES (%s, %s);"
+    return bulk_insert(query, [("section_id", is_positive_int), ("num_labs", is_non_negative_int)])
+
 @app.route('/generate_lab_timetable', methods=['POST', 'GET'])
 def _generate_lab_timetable():
     if request.method == "POST":
@@ -104,71 +341,406 @@ def _generate_lab_timetable():
         years_sections = data.get("years_sections")
         labs_per_sections = data.get("labs_per_sections")
         subjects_per_year = data.get("subjects_per_year")
-
-        results = generate_lab_timetable.main(years_sections, labs_per_sections, subjects_per_year)
-        query = "INSERT INTO lab_timetables (timetable) values (%s);"
-        insert_data(query, f"{results}")
-
-        return jsonify(results), 200
+        mode = data.get("mode", "greedy")
+        if mode not in generate_lab_timetable.ALLOCATION_MODES:
+            return jsonify({"error": f"mode must be one of {', '.join(generate_lab_timetable.ALLOCATION_MODES)}"}), 400
+
+        # Optional lab inventory; the six paired labs and the usual week by default
+        try:
+            resources = generate_lab_timetable.LabResources.from_dict(data.get("lab_resources"))
+        except ValueError as error:
+            return jsonify({"error": f"lab_resources: {error}"}), 400
+
+        cache_key = result_cache.lab_timetable_key(data)
+        allocation = lab_timetable_cache.get(cache_key)
+        # Entries cached before timetable ids were kept are allocated and stored again
+        if allocation is None or "timetable_id" not in allocation:
+            started = perf_counter()
+            allocation = generate_lab_timetable.allocate_labs(years_sections, labs_per_sections, subjects_per_year,
+                                                              mode, resources=resources)
+            lab_timetable_solve_duration.labels(allocation["mode"]).observe(perf_counter() - started)
+            lab_timetable_solves.labels(allocation["mode"], "partial" if allocation["unassigned"] else "complete").inc()
+            # Stored once per allocation; a cache hit returns the id of the stored copy
+            timetable_id = store_lab_timetable(allocation["schedule"])
+            if isinstance(timetable_id, Exception):
+                return jsonify({"error": f"Could not store the lab timetable: {timetable_id}"}), 500
+            allocation["timetable_id"] = timetable_id
+            lab_timetable_cache.put(cache_key, allocation)
+
+        return jsonify({
+            "id": allocation["timetable_id"],
+            "timetable": allocation["schedule"],
+            "mode": allocation["mode"],
+            "unassigned": allocation["unassigned"],
+        }), 200
     elif request.method == "GET":
-        query = "SELECT * FROM lab_timetables;"
-        response = fetch_data(query)
-        for item in response:
-            item["timetable"] = ast.literal_eval(item["timetable"])
-            item["created_date"] = item["created_date"].isoformat() 
-
-        return jsonify(response), 200
+        return list_lab_timetables()
     else:
         return 500
 
 
+LAB_TIMETABLE_FIELDS = ("id", "created_date", "timetable")
+LAB_TIMETABLE_PAGE_SIZE = 20
+LAB_TIMETABLE_MAX_PAGE_SIZE = 100
+
+def parse_lab_timetable_query(args):
+    """Validate the GET /generate_lab_timetable query string."""
+    limit = int(args.get("limit", LAB_TIMETABLE_PAGE_SIZE))
+    if not 1 <= limit <= LAB_TIMETABLE_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {LAB_TIMETABLE_MAX_PAGE_SIZE}")
+
+    cursor = args.get("cursor")
+    cursor = int(cursor) if cursor else None
+
+    created_from = args.get("created_from")
+    created_to = args.get("created_to")
+    created_from = datetime.fromisoformat(created_from) if created_from else None
+    created_to = datetime.fromisoformat(created_to) if created_to else None
+
+    fields = args.get("fields", ",".join(LAB_TIMETABLE_FIELDS))
+    if fields == "metadata":
+        fields = "id,created_date"
+    fields = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in LAB_TIMETABLE_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"fields must be 'metadata' or a list of {', '.join(LAB_TIMETABLE_FIELDS)}")
+
+    return {
+        "limit": limit,
+        "cursor": cursor,
+        "created_from": created_from,
+        "created_to": created_to,
+        "year": args.get("year"),
+        "section": args.get("section"),
+        "fields": fields,
+    }
+
+def list_lab_timetables():
+    """
+    One page of stored lab timetables, newest first.
+
+    Query string: limit, cursor (next_cursor of the previous page), created_from,
+    created_to (ISO dates), year, section and fields ('metadata' or a comma list of
+    id, created_date, timetable). Pages are keyed on id, so each page costs the same
+    however long the history is. The ETag covers the page's ids, and stored timetables
+    never change, so a matching If-None-Match returns 304 before any timetable is loaded.
+    """
+    try:
+        params = parse_lab_timetable_query(request.args)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    conditions = []
+    values = []
+    if params["cursor"] is not None:
+        conditions.append("t.id < %s")
+        values.append(params["cursor"])
+    if params["created_from"] is not None:
+        conditions.append("t.created_date >= %s")
+        values.append(params["created_from"])
+    if params["created_to"] is not None:
+        conditions.append("t.created_date < %s")
+        values.append(params["created_to"])
+    if params["year"] is not None or params["section"] is not None:
+        # Served by the (year, section, day) index on lab_sessions
+        session_conditions = ["s.timetable_id = t.id"]
+        if params["year"] is not None:
+            session_conditions.append("s.year = %s")
+            values.append(params["year"])
+        if params["section"] is not None:
+            session_conditions.append("s.section = %s")
+            values.append(params["section"])
+        conditions.append(f"EXISTS (SELECT 1 FROM lab_sessions s WHERE {' AND '.join(session_conditions)})")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT t.id, t.created_date FROM lab_timetables t {where} ORDER BY t.id DESC LIMIT %s;"
+    page = fetch_data(query, (*values, params["limit"]))
+    if isinstance(page, Exception):
+        return jsonify({"error": str(page)}), 500
+
+    next_cursor = str(page[-1]["id"]) if len(page) == params["limit"] else None
+    etag = hashlib.sha1(json.dumps({
+        "query": request.query_string.decode(),
+        "ids": [item["id"] for item in page],
+    }).encode()).hexdigest()
+    if etag in request.if_none_match:
+        return "", 304, {"ETag": f'"{etag}"'}
+
+    timetables = {}
+    if "timetable" in params["fields"] and page:
+        placeholders = ", ".join(["%s"] * len(page))
+        rows = fetch_data(f"SELECT id, timetable FROM lab_timetables WHERE id IN ({placeholders});",
+                          [item["id"] for item in page])
+        if isinstance(rows, Exception):
+            return jsonify({"error": str(rows)}), 500
+        try:
+            timetables = {row["id"]: lab_timetable_store.load_timetable(row["timetable"]) for row in rows}
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 500
+
+    items = []
+    for item in page:
+        entry = {}
+        if "id" in params["fields"]:
+            entry["id"] = item["id"]
+        if "created_date" in params["fields"]:
+            entry["created_date"] = item["created_date"].isoformat()
+        if "timetable" in params["fields"]:
+            entry["timetable"] = timetables.get(item["id"])
+        items.append(entry)
+
+    response = jsonify({"items": items, "next_cursor": next_cursor})
+    response.headers["ETag"] = f'"{etag}"'
+    return response, 200
+
+
+def lab_demand_error(lab_demand):
+    """
+    Why a /generate_timetable lab_demand is invalid, or None if it is absent or valid.
+
+    lab_demand = {"labs_per_section": {section: labs}, "subjects_per_year": {year: [lab subjects]},
+                  "lab_resources": optional lab inventory, see generate_lab_timetable.LabResources.from_dict}
+    """
+    if lab_demand is None:
+        return None
+    if not isinstance(lab_demand, dict):
+        return "lab_demand must be an object"
+    labs_per_section = lab_demand.get("labs_per_section")
+    subjects_per_year = lab_demand.get("subjects_per_year")
+    if not isinstance(labs_per_section, dict) or not all(is_non_negative_int(labs) for labs in labs_per_section.values()):
+        return "lab_demand.labs_per_section must map sections to non-negative integers"
+    if not isinstance(subjects_per_year, dict) or not all(
+            isinstance(subjects, list) and all(is_name(subject) for subject in subjects)
+            for subjects in subjects_per_year.values()):
+        return "lab_demand.subjects_per_year must map years to lists of subject names"
+    try:
+        generate_lab_timetable.LabResources.from_dict(lab_demand.get("lab_resources"))
+    except ValueError as error:
+        return f"lab_demand.lab_resources: {error}"
+    return None
+
+def previous_result_error(spec, name):
+    """
+    Why a previous timetable reference (incremental or warm_start) is invalid, or None.
+
+    spec = {"previous_job_id": id of a done job} or {"previous_result": a job result}
+           or {"latest": true} for the last finished job
+    """
+    if spec is None:
+        return None
+    if not isinstance(spec, dict):
+        return f"{name} must be an object"
+    if spec.get("previous_result") is not None:
+        if not isinstance(spec["previous_result"], dict):
+            return f"{name}.previous_result must be a job result object"
+    elif spec.get("latest"):
+        if job_queue.store.latest_done() is None:
+            return f"{name}.latest: no finished job to start from"
+    else:
+        job = job_queue.store.get(spec.get("previous_job_id"))
+        if job is None or job["status"] != jobs.DONE:
+            return f"{name}.previous_job_id must name a finished job with a result"
+    return None
+
+def incremental_error(incremental):
+    """
+    Why a /generate_timetable incremental is invalid, or None if it is absent or valid.
+
+    incremental = {previous timetable, see previous_result_error,
+                   "changed": optional {"sections": [[year, section]], "teachers": [...], "years": [...]}}
+    """
+    if incremental is None:
+        return None
+    error = previous_result_error(incremental, "incremental")
+    if error:
+        return error
+    changed = incremental.get("changed") or {}
+    if not isinstance(changed, dict) or not all(isinstance(changed.get(name, []), list)
+                                                for name in ("sections", "teachers", "years")):
+        return "incremental.changed must map sections, teachers and years to lists"
+    return None
+
+# CP-SAT time limit of a timetable job whose solver_options leave max_time_in_seconds out;
+# null asks for no limit (a job can still be cancelled or accepted)
+TIMETABLE_TIME_LIMIT = 120.0
+
 @app.route('/generate_timetable', methods=['POST', 'GET'])
 def _generate_timetable():
     if request.method == "POST":
         data = request.json
         print(data)
-        lab_summary=generate_lab_timetable.print_lab_timetable(data.get("lab_summary"))
-        years_sections=data.get("years_sections") 
-        num_subjects=data.get("num_subjects")
-        lang=data.get("lang")
-        num_classrooms=data.get("num_classrooms")
-        subject_input=data.get("subject_input")
-        hours_input=data.get("hours_input")
-        teacher_name=data.get("teacher_name")
-        optional_subject=data.get("optional_subject")
-        optional_subject_hours=data.get("optional_subject_hours")
-        optional_subject_teacher=data.get("optional_subject_teacher")
-        rooms=data.get("rooms")
-        
-
-        solver = IntegratedTimetableSolver(
-            lab_summary,
-            years_sections, 
-            num_subjects,
-            lang,
-            num_classrooms,
-            subject_input,
-            hours_input,
-            teacher_name,
-            optional_subject,
-            optional_subject_hours,
-            optional_subject_teacher,
-            rooms,
-            )
-
-        solver.create_variables()
-        solver.add_constraints()
-        output = solver.solve()
-        with open(output, 'r') as file:
-            contents = file.read()
-            return jsonify({"output": contents}), 200
+
+        try:
+            SolverOptions.from_dict(data.get("solver_options"))
+        except (TypeError, ValueError) as error:
+            return jsonify({"error": str(error)}), 400
+        # SolverOptions has no time limit; a job without one gets the service's
+        solver_options = data.get("solver_options") or {}
+        if "max_time_in_seconds" not in solver_options:
+            data["solver_options"] = dict(solver_options, max_time_in_seconds=TIMETABLE_TIME_LIMIT)
+
+        # lab_demand places labs in the same solve instead of using lab_summary
+        error = lab_demand_error(data.get("lab_demand"))
+        if error:
+            return jsonify({"error": error}), 400
+
+        # incremental re-solves around what changed since a previous job's timetable
+        error = incremental_error(data.get("incremental"))
+        if error:
+            return jsonify({"error": error}), 400
+
+        # warm_start hints the search with a previous job's timetable
+        error = previous_result_error(data.get("warm_start"), "warm_start")
+        if error:
+            return jsonify({"error": error}), 400
+
+        # debug adds the solver's phase timings and search statistics to the result
+        if "debug" in data and not is_flag(data["debug"]):
+            return jsonify({"error": "debug must be true or false"}), 400
+
+        # Identical inputs reuse a cached result, or the job already solving them
+        job_id = job_queue.submit(data, cache_key=result_cache.timetable_key(data))
+        job = job_queue.store.get(job_id)
+        response = jsonify({
+            "job_id": job_id,
+            "status": job["status"],
+            "max_time_in_seconds": data["solver_options"]["max_time_in_seconds"],
+        })
+        response.headers["Location"] = f"/jobs/{job_id}"
+        return response, 200 if job["status"] == jobs.DONE else 202
     else:
         return 500
 
 
+#--- Routes to follow background timetable jobs ---
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(jobs.job_status(job)), 200
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == jobs.DONE:
+        result = json.loads(job["result"])
+        # ?format=text adds the tabulate rendering of the timetable
+        if request.args.get("format") == "text":
+            result["text"] = format_text(TimetableResult.from_dict(result))
+        return jsonify(result), 200
+    if job["status"] in jobs.FINISHED:
+        return jsonify(jobs.job_status(job)), 409
+    # Still queued or running
+    return jsonify(jobs.job_status(job)), 202
+
+# How often /jobs/<id>/events looks for new events, and how long it may stay silent
+JOB_EVENTS_POLL_SECONDS = 0.5
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+def server_sent_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Server-Sent Events of a job: "solution" with the summary of every solution the
+    search finds (objective, time, gap, sections complete, ...), and "status" with the
+    job status whenever its status or progress changes. The stream ends after the
+    finished status. A client reconnecting with Last-Event-ID resumes after that solution.
+    """
+    store = job_queue.store
+    if store.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    try:
+        after = int(request.headers.get("Last-Event-ID") or 0)
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an event id"}), 400
+
+    def stream():
+        nonlocal after
+        last_status = None
+        quiet = 0.0
+        while True:
+            # The job row first: events recorded before it finished are all read below
+            job = store.get(job_id)
+            sent = False
+            for event in store.events(job_id, after):
+                yield server_sent_event(event["event"], event["data"], event["id"])
+                after = event["id"]
+                sent = True
+            status = jobs.job_status(job)
+            if (status["status"], status["progress"]) != last_status:
+                yield server_sent_event("status", status)
+                last_status = (status["status"], status["progress"])
+                sent = True
+            if job["status"] in jobs.FINISHED:
+                return
+
+            quiet = 0.0 if sent else quiet + JOB_EVENTS_POLL_SECONDS
+            if quiet >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                # A comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                quiet = 0.0
+            sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/jobs/<job_id>/accept', methods=['POST'])
+def accept_job(job_id):
+    """End a job's search early with the best timetable found so far (the first one if none yet)."""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] not in jobs.FINISHED:
+        job_queue.store.request_accept(job_id)
+        job = job_queue.store.get(job_id)
+    return jsonify(jobs.job_status(job)), 200
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Cancel a job. A job shared by identical submissions keeps running until every one of
+    them has cancelled; until then the response says "detached": true.
+    """
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    detached = False
+    if job["status"] not in jobs.FINISHED:
+        detached = not job_queue.cancel(job_id)
+        job = job_queue.store.get(job_id)
+    status = jobs.job_status(job)
+    if detached:
+        status["detached"] = True
+    return jsonify(status), 200
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "timetable": timetable_cache.stats(),
+        "lab_timetable": lab_timetable_cache.stats(),
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return registry.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
 
 if __name__ == '__main__':
     # with app.app_context():
     #     db.create_all()
+    # The development server is the only process using jobs.db; under a multi-worker
+    # server run `python jobs.py fail-unfinished` once before starting it instead
+    job_queue.store.fail_unfinished(jobs.INTERRUPTED_ERROR)
     app.run(debug=True)
 
@@ -0,0 +1,8 @@
+"""
+Benchmarks, run as modules from the repository root:
+
+- bench_timetable: every phase of a full run on seeded synthetic institutions, with
+  JSON output and baseline comparison (see synthetic.py for the generator)
+- bench_gap_encoding: the two gap encodings of constraint 12
+- bench_lab_scheduler: the greedy lab scheduler on large departments
+"""
@@ -0,0 +1,100 @@
+"""
+Compare the 'pairwise' and 'linear' gap encodings of constraint 12.
+
+Builds the same synthetic institution with each encoding and reports model size,
+build time and CP-SAT solve time.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_gap_encoding
+    python -m benchmarks.bench_gap_encoding --sections 10 50 200 --time-limit 60
+"""
+import argparse
+import time
+
+from ortools.sat.python import cp_model
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+SECTIONS_PER_YEAR = 25
+SUBJECTS = ["maths", "physics", "chemistry", "biology"]
+LAB_TIMES = ["8:00 - 11:00", "11:00 - 14:00", "14:00 - 17:00"]
+LAB_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+def synthetic_instance(num_sections):
+    """Build solver inputs for num_sections sections, one 3-hour lab per section."""
+    years_sections = {}
+    lab_schedule = []
+    for i in range(num_sections):
+        year = str(i // SECTIONS_PER_YEAR + 1)
+        section = f"S{i}"
+        years_sections.setdefault(year, []).append(section)
+        lab_schedule.append({
+            "Year": year,
+            "Section": section,
+            "Day": LAB_DAYS[i % len(LAB_DAYS)],
+            "Time": LAB_TIMES[i % len(LAB_TIMES)],
+            "Batch": "Batch 1 (Lab 1, Lab)",
+            "Subject": "Lab",
+        })
+
+    # The solver hands the same teacher list to every year, so teachers are shared across years
+    teachers = [f"T{i}" for i in range(SECTIONS_PER_YEAR * len(SUBJECTS))]
+
+    return dict(
+        lab_schedule=lab_schedule,
+        years_sections=years_sections,
+        num_subjects=len(SUBJECTS),
+        lang="none",
+        num_classrooms=num_sections,
+        subject_input=SUBJECTS,
+        hours_input=1,
+        teacher_name=teachers,
+        optional_subject="",
+        optional_subject_hours="",
+        optional_subject_teacher="",
+        rooms=[f"R{i}" for i in range(num_sections)],
+    )
+
+
+def run(num_sections, gap_encoding, time_limit, workers):
+    start = time.perf_counter()
+    options = SolverOptions(max_time_in_seconds=time_limit, num_search_workers=workers,
+                            gap_encoding=gap_encoding)
+    solver = IntegratedTimetableSolver(options=options, **synthetic_instance(num_sections))
+    solver.create_variables()
+    solver.add_constraints()
+    build_time = time.perf_counter() - start
+
+    proto = solver.model.Proto()
+    cp_solver = cp_model.CpSolver()
+    options.apply(cp_solver)
+    status = cp_solver.Solve(solver.model)
+
+    return {
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "build_time": build_time,
+        "solve_time": cp_solver.WallTime(),
+        "status": cp_solver.StatusName(status),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sections", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--time-limit", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    header = f"{'sections':>8} {'encoding':>9} {'vars':>9} {'constraints':>11} {'build s':>8} {'solve s':>8}  status"
+    print(header)
+    print("-" * len(header))
+    for num_sections in args.sections:
+        for gap_encoding in SolverOptions.GAP_ENCODINGS:
+            r = run(num_sections, gap_encoding, args.time_limit, args.workers)
+            print(f"{num_sections:>8} {gap_encoding:>9} {r['variables']:>9} {r['constraints']:>11} "
+                  f"{r['build_time']:>8.2f} {r['solve_time']:>8.2f}  {r['status']}")
+
+
+if __name__ == "__main__":
+    main()
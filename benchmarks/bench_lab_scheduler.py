@@ -0,0 +1,79 @@
+"""
+Time the greedy lab scheduler on large synthetic departments.
+
+Every section asks for the same number of labs and every year rotates two lab
+subjects. Reports labs requested and assigned, and the best time over a few runs.
+--lab-rooms sizes the lab inventory (consecutive pairs, the usual week); by default
+the six standard labs are used.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_lab_scheduler
+    python -m benchmarks.bench_lab_scheduler --sections 1000 5000 --labs 4 --repeat 5 --lab-rooms 200
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from generate_lab_timetable import LabResources, greedy_lab_allocation
+
+SECTIONS_PER_YEAR = 25
+
+
+def synthetic_demand(num_sections, labs_per_section):
+    """years_sections, num_labs_per_section and subjects_per_year for num_sections sections."""
+    years_sections = {}
+    for i in range(num_sections):
+        years_sections.setdefault(str(i // SECTIONS_PER_YEAR + 1), []).append(f"S{i}")
+    num_labs_per_section = {section: labs_per_section
+                            for sections in years_sections.values() for section in sections}
+    subjects_per_year = {year: ["Lab A", "Lab B"] for year in years_sections}
+    return years_sections, num_labs_per_section, subjects_per_year
+
+
+def lab_inventory(lab_rooms):
+    """LabResources with lab_rooms labs in consecutive pairs, or the default six labs."""
+    if not lab_rooms:
+        return LabResources.default()
+    return LabResources.from_dict({"labs": [{"id": f"L{i}"} for i in range(lab_rooms)]})
+
+
+def run(num_sections, labs_per_section, repeat, lab_rooms=None):
+    years_sections, num_labs_per_section, subjects_per_year = synthetic_demand(num_sections, labs_per_section)
+    resources = lab_inventory(lab_rooms)
+
+    best = None
+    for _ in range(repeat):
+        demand = dict(num_labs_per_section)
+        # The scheduler reports progress with print(); keep it out of the timing table
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            schedule = greedy_lab_allocation(years_sections, demand, subjects_per_year, resources)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        "requested": sum(num_labs_per_section.values()),
+        "assigned": len(schedule),
+        "time": best,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sections", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--labs", type=int, default=4, help="labs requested per section")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lab-rooms", type=int, default=None, help="labs in the inventory (default: the six standard labs)")
+    args = parser.parse_args()
+
+    header = f"{'sections':>8} {'requested':>9} {'assigned':>8} {'best ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for num_sections in args.sections:
+        r = run(num_sections, args.labs, args.repeat, args.lab_rooms)
+        print(f"{num_sections:>8} {r['requested']:>9} {r['assigned']:>8} {r['time'] * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
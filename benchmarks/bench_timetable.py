@@ -0,0 +1,193 @@
+"""
+Time every phase of a full timetable run on seeded synthetic institutions.
+
+For each scenario: the lab allocation (generate_lab_timetable.main), the solver's
+__init__, create_variables, add_constraints and solve, plus the CP-SAT model size,
+the solve status and the peak RSS. Each scenario runs in a fresh process, so peak
+RSS is its own. --output writes the results as JSON; --baseline compares them with
+an earlier --output and exits with status 1 if a phase got slower than the
+tolerance, the model grew, or a solve lost its status.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_timetable
+    python -m benchmarks.bench_timetable --scenario small medium --output bench.json
+    python -m benchmarks.bench_timetable --scenario large --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+SCENARIOS = {
+    "small": dict(years=2, sections_per_year=3, subjects=4, hours=1),
+    "medium": dict(years=3, sections_per_year=10, subjects=4, hours=2),
+    "large": dict(years=4, sections_per_year=25, subjects=4, hours=2, lab_rooms=40),
+    "departments": dict(years=4, sections_per_year=10, subjects=4, hours=2, departments=True),
+}
+PHASES = ("lab_allocation", "solver_init", "create_variables", "add_constraints", "solve")
+
+# Phases faster than this in both runs are too noisy to compare
+MIN_COMPARED_SECONDS = 0.05
+
+STATUS_RANK = {"OPTIMAL": 3, "FEASIBLE": 2, "UNKNOWN": 1, "INFEASIBLE": 0, "MODEL_INVALID": 0}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_scenario(name, params, seed, time_limit, workers):
+    """Run one scenario and return its result; meant for a fresh process."""
+    import generate_lab_timetable
+    from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+    from benchmarks.synthetic import institution
+
+    data = institution(seed=seed, **params)
+    demand = data["lab_demand"]
+    phases = {}
+
+    # The lab scheduler and the solver report progress with print(); keep it out of the output
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        lab_schedule = generate_lab_timetable.main(demand["years_sections"], dict(demand["labs_per_section"]),
+                                                   demand["subjects_per_year"], resources=data["lab_resources"])
+        phases["lab_allocation"] = time.perf_counter() - start
+
+        options = SolverOptions(max_time_in_seconds=time_limit, num_search_workers=workers, random_seed=seed)
+        start = time.perf_counter()
+        solver = IntegratedTimetableSolver(lab_schedule, options=options, **data["solver_inputs"])
+        phases["solver_init"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        solver.create_variables()
+        phases["create_variables"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        solver.add_constraints()
+        phases["add_constraints"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = solver.solve()
+        phases["solve"] = time.perf_counter() - start
+
+    proto = solver.model.Proto()
+    return {
+        "scenario": name,
+        "params": dict(params, seed=seed),
+        "sections": sum(len(sections) for sections in demand["years_sections"].values()),
+        "lab_sessions": len(lab_schedule),
+        "phases": phases,
+        "search_time": result.wall_time,
+        "model": {
+            "variables": len(proto.variables),
+            "constraints": len(proto.constraints),
+            "class_variables": len(solver.schedule),
+        },
+        "status": result.status,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(name, params, seed, time_limit, workers):
+    """run_scenario in a fresh spawned process."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_scenario, name, params, seed, time_limit, workers).result()
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against a baseline run, as readable lines."""
+    previous = {result["scenario"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result["scenario"])
+        if old is None:
+            continue
+        if old["params"] != result["params"]:
+            print(f"{result['scenario']}: parameters differ from the baseline, not compared")
+            continue
+
+        for phase in PHASES:
+            before, after = old["phases"].get(phase), result["phases"][phase]
+            if before is None or max(before, after) < MIN_COMPARED_SECONDS:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append(f"{result['scenario']}: {phase} {before:.3f}s -> {after:.3f}s "
+                                   f"(+{(after / before - 1) * 100:.0f}%)")
+
+        for size in ("variables", "constraints"):
+            if result["model"][size] > old["model"][size]:
+                regressions.append(f"{result['scenario']}: {size} {old['model'][size]} -> {result['model'][size]}")
+
+        if STATUS_RANK.get(result["status"], 0) < STATUS_RANK.get(old["status"], 0):
+            regressions.append(f"{result['scenario']}: status {old['status']} -> {result['status']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=["small", "medium"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per phase (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    header = (f"{'scenario':>11} {'sections':>8} " + " ".join(f"{phase:>16}" for phase in PHASES)
+              + f" {'vars':>8} {'constraints':>11} {'rss MB':>7}  status")
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for name in args.scenario:
+        r = run_isolated(name, SCENARIOS[name], args.seed, args.time_limit, args.workers)
+        results.append(r)
+        rss = f"{r['peak_rss_mb']:>7.0f}" if r["peak_rss_mb"] is not None else f"{'-':>7}"
+        print(f"{name:>11} {r['sections']:>8} " + " ".join(f"{r['phases'][phase]:>15.3f}s" for phase in PHASES)
+              + f" {r['model']['variables']:>8} {r['model']['constraints']:>11} {rss}  {r['status']}")
+
+    if args.output:
+        import ortools
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "ortools": ortools.__version__,
+            "time_limit": args.time_limit,
+            "workers": args.workers,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.baseline}:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Seeded synthetic institutions for the benchmarks.
+
+institution() builds everything a full timetable run needs: the lab demand for
+generate_lab_timetable and the IntegratedTimetableSolver inputs. The same sizes
+and seed always give the same institution.
+"""
+import random
+
+from generate_lab_timetable import LabResources
+
+SUBJECTS = ["maths", "physics", "chemistry", "biology", "english", "economics", "history", "geography"]
+LAB_SUBJECTS = ["Java", "DBMS", "Machine learning", "Mobile app development", "Networks", "Electronics"]
+
+
+def institution(years=2, sections_per_year=3, subjects=4, hours=1, rooms=None, labs_per_section=2,
+                lab_rooms=None, departments=False, language=False, seed=0):
+    """
+    A synthetic institution as a dict:
+    - solver_inputs: IntegratedTimetableSolver keyword arguments, without lab_schedule
+    - lab_demand: years_sections, labs_per_section and subjects_per_year for generate_lab_timetable
+    - lab_resources: the LabResources inventory
+
+    Parameters:
+    - years: number of years
+    - sections_per_year: average sections per year; each year gets up to a quarter more or fewer
+    - subjects: core subjects per year (at most len(SUBJECTS)), each taught hours a week
+    - rooms: classrooms, one per section if None
+    - labs_per_section: most lab sessions a section asks for (an even number)
+    - lab_rooms: labs in the inventory, in consecutive pairs; the six standard labs if None
+    - departments: every year has its own teachers instead of sharing one list
+    - language: make the last subject the language subject, synchronized across the
+      sections of a year (infeasible once the teacher rotation gives one teacher the
+      language class of two sections)
+    - seed: random seed
+    """
+    rng = random.Random(seed)
+    spread = sections_per_year // 4
+
+    years_sections = {}
+    for year in range(1, years + 1):
+        count = max(1, sections_per_year + rng.randint(-spread, spread))
+        years_sections[str(year)] = [f"{year}{chr(65 + i % 26)}{i // 26 or ''}" for i in range(count)]
+
+    labs = {section: 2 * rng.randint(1, max(1, labs_per_section // 2))
+            for sections in years_sections.values() for section in sections}
+    subjects_per_year = {year: rng.sample(LAB_SUBJECTS, 2) for year in years_sections}
+
+    # Every year needs ceil(sections * subjects / 2) teachers (see calculate_required_teachers)
+    most_sections = max(len(sections) for sections in years_sections.values())
+    num_teachers = (most_sections * subjects + 1) // 2
+    if departments:
+        teacher_name = {year: [f"T{year}_{i}" for i in range(num_teachers)] for year in years_sections}
+    else:
+        teacher_name = [f"T{i}" for i in range(num_teachers)]
+
+    num_sections = sum(len(sections) for sections in years_sections.values())
+    num_rooms = num_sections if rooms is None else rooms
+    subject_names = SUBJECTS[:subjects]
+
+    if lab_rooms:
+        resources = LabResources.from_dict({"labs": [{"id": f"L{i}"} for i in range(lab_rooms)]})
+    else:
+        resources = LabResources.default()
+
+    return {
+        "solver_inputs": {
+            "years_sections": years_sections,
+            "num_subjects": subjects,
+            "lang": subject_names[-1] if language else "none",
+            "num_classrooms": num_rooms,
+            "subject_input": subject_names,
+            "hours_input": hours,
+            "teacher_name": teacher_name,
+            "optional_subject": "",
+            "optional_subject_hours": "",
+            "optional_subject_teacher": "",
+            "rooms": [f"R{i}" for i in range(num_rooms)],
+        },
+        "lab_demand": {
+            "years_sections": years_sections,
+            "labs_per_section": labs,
+            "subjects_per_year": subjects_per_year,
+        },
+        "lab_resources": resources,
+    }
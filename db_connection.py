@@ -1,3 +1,6 @@
+import threading
+import time
+
 import pymysql.cursors
 
 # Connect to the database
@@ -9,3 +12,129 @@ def get_connection():
                                 cursorclass=pymysql.cursors.DictCursor)
     return connection
 
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe bounded pool of database connections.
+
+    - connect: zero-argument factory returning a new DB-API connection
+    - max_size: most connections open at once, idle and checked out together
+    - max_idle: seconds an idle connection is kept before it is closed
+    - ping_after: idle seconds after which a connection is health checked before reuse
+    - checkout_timeout: seconds acquire() waits for a free connection
+
+    Any DB-API driver works, e.g. an SQLite stand-in for tests:
+        ConnectionPool(lambda: sqlite3.connect('test.db', check_same_thread=False))
+    """
+
+    def __init__(self, connect=get_connection, max_size=10, max_idle=300, ping_after=30, checkout_timeout=10):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+
+        self.idle = []  # (connection, released_at), most recently released last
+        self.size = 0   # open connections, idle or checked out
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Check a connection out, reusing an idle one when possible."""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            connection, released_at = None, None
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No database connection free after {self.checkout_timeout}s")
+                    self.condition.wait(remaining)
+
+                if self.idle:
+                    connection, released_at = self.idle.pop()
+                else:
+                    self.size += 1
+
+            # Connect and health check outside the lock
+            if connection is None:
+                try:
+                    return self.connect()
+                except Exception:
+                    self._forget()
+                    raise
+
+            idle_for = time.monotonic() - released_at
+            if idle_for <= self.max_idle and (idle_for <= self.ping_after or self._healthy(connection)):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection, discard=False):
+        """Return a checked out connection. Pass discard=True if it may be broken."""
+        if discard:
+            self._discard(connection)
+            return
+        with self.condition:
+            expired = self._pop_expired()
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+        for connection in expired:
+            self._close(connection)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                "max_size": self.max_size,
+            }
+
+    def close_all(self):
+        """Close every idle connection. Checked out connections close when released with discard=True."""
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def _healthy(self, connection):
+        try:
+            if hasattr(connection, 'ping'):
+                connection.ping(reconnect=False)
+            else:
+                connection.cursor().execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def _pop_expired(self):
+        # Called with the lock held; idle is ordered oldest first
+        now = time.monotonic()
+        expired = []
+        while self.idle and now - self.idle[0][1] > self.max_idle:
+            connection, _ = self.idle.pop(0)
+            self.size -= 1
+            expired.append(connection)
+        return expired
+
+    def _discard(self, connection):
+        self._close(connection)
+        self._forget()
+
+    def _forget(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+# Shared pool for the Flask app; connections are opened on first use
+pool = ConnectionPool()
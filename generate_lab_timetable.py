@@ -1,3 +1,4 @@
+from collections import deque
 from datetime import time
 import itertools
 from ortools.sat.python import cp_model
@@ -53,11 +54,11 @@ def print_lab_timetable(lab_schedule):
     print("\nLab Utilization:")
     labs = set()
     for entry in sorted_schedule:
-        batch = entry['Batch']
-        lab_num = int(batch.split('Lab ')[1].split(',')[0])
-        labs.add(lab_num)
+        labs.add(batch_lab(entry['Batch']))
 
-    print(f"Labs used: {', '.join(str(lab) for lab in sorted(labs))}")
+    # Numeric lab ids in numeric order, then named ones
+    labs = sorted(labs, key=lambda lab: (0, int(lab), '') if lab.isdigit() else (1, 0, lab))
+    print(f"Labs used: {', '.join(labs)}")
 
     # Print section allocation summary
     print("\nSection Allocation Summary:")
@@ -74,45 +75,455 @@ def print_lab_timetable(lab_schedule):
     return sorted_schedule
 
 
-def main(years_sections, num_labs_per_section, subjects_per_year):
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    time_slots = [(8, 11), (11, 14), (14, 17)]  # Available time slots (Monday to Friday)
-    saturday_slots = [(8, 11), (11, 14)]  # Saturday has only morning slots
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+TIME_SLOTS = [(8, 11), (11, 14), (14, 17)]  # Available time slots (Monday to Friday)
+SATURDAY_SLOTS = [(8, 11), (11, 14)]  # Saturday has only morning slots
+LAB_PAIRS = [(1, 2), (3, 4), (5, 6)]  # Using fixed pairs to ensure consistent rotation
+
+ALLOCATION_MODES = ('greedy', 'exact')
+
+
+class LabResources:
+    """
+    The lab inventory the allocators schedule into.
+
+    - labs: {lab_id: capacity}; capacity may be None when unknown
+    - pairs: allowed (lab1, lab2) pairings; a session puts Batch 1 in lab1 and Batch 2 in lab2
+    - calendar: {day: [(start_hour, end_hour), ...]} lab slots offered on each day
+    - min_capacity: labs with a known capacity below this are left out of every pair
+
+    The default is six labs in fixed pairs (1, 2), (3, 4), (5, 6), with TIME_SLOTS on
+    weekdays and SATURDAY_SLOTS on Saturday.
+    """
+
+    def __init__(self, labs, pairs, calendar, min_capacity=0):
+        self.labs = labs
+        self.calendar = calendar
+        self.min_capacity = min_capacity
+
+        usable = {lab for lab, capacity in labs.items() if capacity is None or capacity >= min_capacity}
+        self.pairs = [pair for pair in pairs if pair[0] in usable and pair[1] in usable]
+
+        # Indexes: a pair by its two labs, the pairs each lab belongs to, and for each pair
+        # the pairs it blocks (shares a lab with) as a bitmask over pair positions
+        self.pair_index = {(str(lab1), str(lab2)): (lab1, lab2) for lab1, lab2 in self.pairs}
+        self.lab_pairs = {}
+        for i, pair in enumerate(self.pairs):
+            for lab in pair:
+                self.lab_pairs.setdefault(lab, []).append(i)
+        self.pair_conflicts = [
+            sum(1 << j for j in {j for lab in pair for j in self.lab_pairs[lab]})
+            for pair in self.pairs
+        ]
+
+    @classmethod
+    def default(cls):
+        labs = {lab: None for pair in LAB_PAIRS for lab in pair}
+        calendar = {day: list(SATURDAY_SLOTS if day == 'Saturday' else TIME_SLOTS) for day in DAYS}
+        return cls(labs, list(LAB_PAIRS), calendar)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build from a request payload, or the default inventory when data is None.
+
+            {"labs": [{"id": "CS-1", "capacity": 30}, ...],
+             "pairs": [["CS-1", "CS-2"], ...],        (default: consecutive labs as listed)
+             "calendar": {"Monday": [[8, 11], [11, 14]], ...},   (default: the usual week)
+             "min_capacity": 25}                      (default: 0)
+
+        Raises ValueError if the inventory is malformed.
+        """
+        if data is None:
+            return cls.default()
+        if not isinstance(data, dict):
+            raise ValueError("must be an object")
+
+        labs = {}
+        if not isinstance(data.get("labs") or [], list):
+            raise ValueError("labs must be a list")
+        for lab in data.get("labs") or []:
+            lab_id = lab.get("id") if isinstance(lab, dict) else None
+            capacity = lab.get("capacity") if isinstance(lab, dict) else None
+            if not isinstance(lab_id, (int, str)) or isinstance(lab_id, bool) or str(lab_id).strip() == "":
+                raise ValueError("every lab needs an id")
+            if ',' in str(lab_id):
+                # Schedule entries name the lab as 'Batch 1 (Lab <id>, <subject>)'
+                raise ValueError(f"lab {lab_id}: ids cannot contain commas")
+            if capacity is not None and (not isinstance(capacity, int) or isinstance(capacity, bool) or capacity < 1):
+                raise ValueError(f"lab {lab_id}: capacity must be a positive integer")
+            if lab_id in labs:
+                raise ValueError(f"lab {lab_id} is listed twice")
+            labs[lab_id] = capacity
+        if len(labs) < 2:
+            raise ValueError("at least 2 labs are needed")
+
+        ids = list(labs)
+        pairs = data.get("pairs")
+        if pairs is None:
+            pairs = [(ids[i], ids[i + 1]) for i in range(0, len(ids) - 1, 2)]
+        if not isinstance(pairs, (list, tuple)):
+            raise ValueError("pairs must be a list")
+        seen = set()
+        for pair in pairs:
+            if (not isinstance(pair, (list, tuple)) or len(pair) != 2
+                    or not all(isinstance(lab, (int, str)) and not isinstance(lab, bool) for lab in pair)):
+                raise ValueError("every pair must list 2 lab ids")
+            if pair[0] not in labs or pair[1] not in labs or pair[0] == pair[1]:
+                raise ValueError(f"pair {list(pair)} must name 2 different listed labs")
+            if tuple(pair) in seen:
+                raise ValueError(f"pair {list(pair)} is listed twice")
+            seen.add(tuple(pair))
+        pairs = [tuple(pair) for pair in pairs]
+
+        calendar = data.get("calendar")
+        if calendar is None:
+            calendar = cls.default().calendar
+        if not isinstance(calendar, dict):
+            raise ValueError("calendar must map days to lists of [start_hour, end_hour]")
+        for day, slots in calendar.items():
+            if day not in DAYS:
+                raise ValueError(f"calendar: unknown day {day}")
+            if not isinstance(slots, (list, tuple)):
+                raise ValueError(f"calendar: {day} must be a list of [start_hour, end_hour]")
+            for slot in slots:
+                if (not isinstance(slot, (list, tuple)) or len(slot) != 2
+                        or not all(isinstance(hour, int) and not isinstance(hour, bool) for hour in slot)
+                        or not 8 <= slot[0] < slot[1] <= 17 or slot[1] - slot[0] > 8):
+                    raise ValueError(f"calendar: {day} slot {slot} must be [start_hour, end_hour] "
+                                     f"within 8-17 and at most 8 hours")
+            ends = []
+            for slot in sorted(tuple(slot) for slot in slots):
+                if ends and slot[0] < ends[-1]:
+                    raise ValueError(f"calendar: {day} slots overlap")
+                ends.append(slot[1])
+        # Days in week order, slots by start hour
+        calendar = {day: sorted(tuple(slot) for slot in calendar[day]) for day in DAYS if day in calendar}
+
+        min_capacity = data.get("min_capacity", 0)
+        if not isinstance(min_capacity, int) or isinstance(min_capacity, bool) or min_capacity < 0:
+            raise ValueError("min_capacity must be a non-negative integer")
+
+        return cls(labs, pairs, calendar, min_capacity)
+
+    def to_dict(self):
+        """The from_dict form of this inventory."""
+        return {
+            "labs": [{"id": lab, "capacity": capacity} for lab, capacity in self.labs.items()],
+            "pairs": [list(pair) for pair in self.pairs],
+            "calendar": {day: [list(slot) for slot in slots] for day, slots in self.calendar.items()},
+            "min_capacity": self.min_capacity,
+        }
+
+    def day_slots(self):
+        """(day, (start_hour, end_hour)) for every lab slot of the week, in week order."""
+        return [(day, time_slot) for day, slots in self.calendar.items() for time_slot in slots]
+
+    def sessions_per_slot(self):
+        """
+        Upper bound on the lab sessions in one slot: each needs one of the pairs and
+        two labs no other session uses. Exact when no lab is in two pairs.
+        """
+        paired_labs = len(self.lab_pairs)
+        return min(len(self.pairs), paired_labs // 2)
+
+    def max_sessions_per_week(self):
+        return len(self.day_slots()) * self.sessions_per_slot()
+
+
+def batch_lab(batch):
+    """The lab id, as a string, in a schedule entry's Batch, e.g. 'Batch 1 (Lab 3, Java)' -> '3'."""
+    return batch.split('(Lab ', 1)[1].split(', ', 1)[0]
+
+
+def rotation_subjects(subjects, cycle_pos):
+    """Subjects for batch 1 and batch 2 at a section's position in the subject rotation."""
+    subject_count = len(subjects)
+    if subject_count == 2:
+        # For 2 subjects rotation
+        if cycle_pos == 0:
+            return subjects[0], subjects[1]
+        return subjects[1], subjects[0]
+    elif subject_count == 3:
+        # For 3 subjects rotation
+        if cycle_pos == 0:
+            return subjects[0], subjects[1]
+        elif cycle_pos == 1:
+            return subjects[2], subjects[0]
+        return subjects[1], subjects[2]
+    # For more than 3 subjects
+    idx1 = cycle_pos % subject_count
+    idx2 = (cycle_pos + 1) % subject_count
+    return subjects[idx1], subjects[idx2]
+
+
+def lab_session_entries(year, section, day, time_slot, lab_pair, subject1, subject2):
+    """The two schedule entries (Batch 1 and Batch 2) for one lab session of a section."""
+    lab1, lab2 = lab_pair
+    time_range = f'{time_slot[0]}:00 - {time_slot[1]}:00'
+    return [
+        {
+            'Year': year,
+            'Section': section,
+            'Day': day,
+            'Time': time_range,
+            'Batch': f'Batch 1 (Lab {lab1}, {subject1})',
+            'Subject': subject1
+        },
+        {
+            'Year': year,
+            'Section': section,
+            'Day': day,
+            'Time': time_range,
+            'Batch': f'Batch 2 (Lab {lab2}, {subject2})',
+            'Subject': subject2
+        },
+    ]
+
+
+def main(years_sections, num_labs_per_section, subjects_per_year, mode='greedy', time_limit=10.0, resources=None):
+    """Generate the lab timetable and return its schedule entries."""
+    return allocate_labs(years_sections, num_labs_per_section, subjects_per_year, mode, time_limit,
+                         resources)['schedule']
+
+
+def allocate_labs(years_sections, num_labs_per_section, subjects_per_year, mode='greedy', time_limit=10.0,
+                  resources=None):
+    """
+    Generate the lab timetable with the given allocation mode.
+
+    - 'greedy': the fast round-robin heuristic
+    - 'exact': CP-SAT maximizes the number of assigned labs, starting from the greedy
+      schedule; if CP-SAT finds nothing better within time_limit seconds the greedy
+      schedule is kept
+
+    resources is the LabResources inventory, LabResources.default() if None.
+
+    Returns a dict with the schedule, the mode that produced it and the demand that
+    could not be assigned, by section.
+    """
+    if mode not in ALLOCATION_MODES:
+        raise ValueError(f"mode must be one of {', '.join(ALLOCATION_MODES)}")
+    resources = resources or LabResources.default()
+
+    schedule = greedy_lab_allocation(years_sections, dict(num_labs_per_section), subjects_per_year, resources)
+    used_mode = 'greedy'
+
+    if mode == 'exact':
+        exact = exact_lab_allocation(years_sections, num_labs_per_section, subjects_per_year, time_limit,
+                                     hint=schedule, resources=resources)
+        if exact is not None and len(exact) > len(schedule):
+            schedule = exact
+            used_mode = 'exact'
+        elif exact is None:
+            print("Exact lab allocation found no schedule in time; keeping the greedy schedule.")
+        else:
+            print("Exact lab allocation could not improve on the greedy schedule.")
+
+    unassigned = unassigned_lab_demand(years_sections, num_labs_per_section, subjects_per_year, schedule)
+    for section, demand in unassigned.items():
+        print(f"  - {demand['year']} - {section}: {demand['remaining']} labs unassigned ({demand['reason']})")
+
+    return {"schedule": schedule, "mode": used_mode, "unassigned": unassigned}
+
+
+def unassigned_lab_demand(years_sections, num_labs_per_section, subjects_per_year, schedule):
+    """Requested labs that the schedule does not cover, by section, with the likely reason."""
+    assigned = {}
+    for entry in schedule:
+        assigned[entry['Section']] = assigned.get(entry['Section'], 0) + 1
+
+    unassigned = {}
+    for year in years_sections:
+        for section in years_sections[year]:
+            requested = num_labs_per_section.get(section, 0)
+            remaining = requested - assigned.get(section, 0)
+            if remaining <= 0:
+                continue
+
+            if len(subjects_per_year.get(year, [])) < 2:
+                reason = "year needs at least 2 lab subjects"
+            elif remaining == 1:
+                reason = "labs are assigned in pairs"
+            else:
+                reason = "no free lab pair, year slot or day"
+
+            unassigned[section] = {
+                "year": year,
+                "requested": requested,
+                "assigned": assigned.get(section, 0),
+                "remaining": remaining,
+                "reason": reason,
+            }
+    return unassigned
+
+
+def exact_lab_allocation(years_sections, num_labs_per_section, subjects_per_year, time_limit=10.0, hint=None,
+                         resources=None):
+    """
+    Assign lab sessions with CP-SAT, maximizing the number of labs assigned.
+
+    Applies the same rules as the greedy pass: a session uses a lab pair for both
+    batches, one section per year per slot, one lab session per section per day, and
+    subjects rotate in session order. Returns the schedule, or None if CP-SAT finds no
+    solution within time_limit seconds.
+    """
+    resources = resources or LabResources.default()
+    model = cp_model.CpModel()
+    sessions = add_lab_session_variables(model, years_sections, num_labs_per_section, subjects_per_year, resources)
+    if not sessions:
+        return []
+
+    model.Maximize(sum(sessions.values()))
+
+    # Start from the greedy schedule
+    if hint:
+        hinted = session_keys(hint, resources)
+        for key, var in sessions.items():
+            model.AddHint(var, key in hinted)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    print(f"Exact lab allocation: {solver.StatusName(status)}, "
+          f"{int(solver.ObjectiveValue())} sessions in {solver.WallTime():.2f}s")
+
+    return schedule_from_sessions([key for key, var in sessions.items() if solver.Value(var)], subjects_per_year)
 
-    # Create lab pairs
-    labs = [1, 2, 3, 4, 5, 6]  # Available labs
-    lab_pairs = [(1, 2), (3, 4), (5, 6)]  # Using fixed pairs to ensure consistent rotation
+
+def session_keys(schedule, resources=None):
+    """
+    The (year, section, day, time_slot, lab_pair) session keys of schedule entries, the
+    keys of add_lab_session_variables. lab_pair is None if the inventory has no such pair.
+    """
+    resources = resources or LabResources.default()
+    batch_labs = {}
+    for entry in schedule:
+        start, end = (int(part.split(':')[0]) for part in entry['Time'].split(' - '))
+        key = (entry['Year'], entry['Section'], entry['Day'], (start, end))
+        batch_labs.setdefault(key, {})[entry['Batch'].split(' (')[0]] = batch_lab(entry['Batch'])
+    return {key + (resources.pair_index.get((labs.get('Batch 1'), labs.get('Batch 2'))),)
+            for key, labs in batch_labs.items()}
+
+
+def add_lab_session_variables(model, years_sections, num_labs_per_section, subjects_per_year, resources=None):
+    """
+    Add lab session decision variables and the lab allocation rules to a CP-SAT model.
+
+    Returns {(year, section, day, time_slot, lab_pair): BoolVar}. A session uses a lab
+    pair for both batches; each lab hosts one batch per slot, a year has one section in
+    labs per slot, a section has one lab session per day, and a section gets at most
+    its requested labs. resources is the LabResources inventory, LabResources.default() if None.
+    """
+    resources = resources or LabResources.default()
+    day_slots = resources.day_slots()
+    sessions = {}
+
+    for year in years_sections:
+        if len(subjects_per_year.get(year, [])) < 2:
+            continue
+        for section in years_sections[year]:
+            if num_labs_per_section.get(section, 0) < 2:
+                continue
+            for day, time_slot in day_slots:
+                for lab_pair in resources.pairs:
+                    sessions[(year, section, day, time_slot, lab_pair)] = model.NewBoolVar(
+                        f'lab_{year}_{section}_{day}_{time_slot[0]}_{lab_pair[0]}_{lab_pair[1]}')
+
+    by_lab_slot = {}
+    by_year_slot = {}
+    by_section_day = {}
+    by_section = {}
+    for key, var in sessions.items():
+        year, section, day, time_slot, lab_pair = key
+        for lab in lab_pair:
+            by_lab_slot.setdefault((day, time_slot, lab), []).append(var)
+        by_year_slot.setdefault((year, day, time_slot), []).append(var)
+        by_section_day.setdefault((section, day), []).append(var)
+        by_section.setdefault(section, []).append(var)
+
+    # Each lab hosts one batch per slot
+    for group in by_lab_slot.values():
+        model.AddAtMostOne(group)
+    # One section of a year per slot
+    for group in by_year_slot.values():
+        model.AddAtMostOne(group)
+    # One lab session per section per day
+    for group in by_section_day.values():
+        model.AddAtMostOne(group)
+    # A session covers two labs of the section's demand
+    for section, group in by_section.items():
+        model.Add(sum(group) <= num_labs_per_section[section] // 2)
+
+    return sessions
+
+
+def schedule_from_sessions(chosen, subjects_per_year):
+    """Schedule entries for the chosen (year, section, day, time_slot, lab_pair) sessions."""
+    # Rotate subjects in session order, as the greedy pass does
+    chosen = sorted(chosen, key=lambda key: (key[1], DAYS.index(key[2]), key[3]))
+    lab_schedule = []
+    cycle_position = {}
+    for year, section, day, time_slot, lab_pair in chosen:
+        cycle_pos = cycle_position.get(section, 0)
+        subject1, subject2 = rotation_subjects(subjects_per_year[year], cycle_pos)
+        lab_schedule.extend(lab_session_entries(year, section, day, time_slot, lab_pair, subject1, subject2))
+        cycle_position[section] = (cycle_pos + 1) % len(subjects_per_year[year])
+
+    return lab_schedule
+
+
+def greedy_lab_allocation(years_sections, num_labs_per_section, subjects_per_year, resources=None):
+    """
+    Greedy lab allocation. Consumes num_labs_per_section as labs are assigned.
+
+    Sections are taken in order of demand, most first, then round-robin: a section that
+    gets a session goes to the back of the queue. Each one gets the earliest free (day,
+    slot, lab pair). Occupancy is kept as integer bitmasks over the week's slots (labs in
+    use per slot, slots with a free pair, slots used per year and slots closed per
+    section), so finding a slot is a few bit operations. A section that finds nothing
+    free is dropped, since occupancy only grows; the schedule is the one the original
+    list-based scheduler produced, without its cap of 1000 attempts.
+
+    resources is the LabResources inventory, LabResources.default() if None.
+    """
+    resources = resources or LabResources.default()
 
     lab_schedule = []
     # years_sections=years_sections.split(",")
     # Create a list of all sections with their years
     section_list = [(year, section) for year in years_sections for section in years_sections[year]]
 
-    # Create a priority queue based on the number of labs needed
-    priority_queue = sorted([(year, section, num_labs_per_section[section])
-                            for year, section in section_list
-                            if num_labs_per_section[section] > 0],
-                           key=lambda x: x[2], reverse=True)
-
-    # Track lab usage per time slot per day
-    lab_usage = {day: {slot: set() for slot in (saturday_slots if day == 'Saturday' else time_slots)} for day in days}
+    # Most labs needed first, input order among equals
+    priority_queue = deque(sorted(((year, section) for year, section in section_list
+                                   if num_labs_per_section[section] > 0),
+                                  key=lambda item: num_labs_per_section[item[1]], reverse=True))
 
-    # Track year usage per time slot per day
-    year_slot_usage = {day: {slot: set() for slot in (saturday_slots if day == 'Saturday' else time_slots)} for day in days}
+    # (day, time slot) in scan order; bit i of a slot mask stands for day_slots[i]
+    day_slots = resources.day_slots()
+    day_masks = {}
+    for i, (day, _) in enumerate(day_slots):
+        day_masks[day] = day_masks.get(day, 0) | 1 << i
 
-    # Track section usage per time slot per day
-    section_slot_usage = {day: {slot: set() for slot in (saturday_slots if day == 'Saturday' else time_slots)} for day in days}
+    # Occupancy bitmasks: free lab pairs per slot (bit j for resources.pairs[j]), slots
+    # with a free pair, slots used by each year, and slots closed to each section (days it has a lab)
+    all_pairs = (1 << len(resources.pairs)) - 1
+    free_pairs = [all_pairs] * len(day_slots)
+    open_slots = (1 << len(day_slots)) - 1 if all_pairs else 0
+    year_slots = {year: 0 for year in years_sections}
+    section_closed = {section: 0 for year, section in section_list}
 
-    # Track subject assignment history for each section
-    section_subject_state = {section: {'cycle_position': 0, 'assigned_dates': set()}
-                             for year in years_sections for section in years_sections[year]}
+    # Subject rotation position for each section
+    cycle_position = {section: 0 for year, section in section_list}
 
     # Calculate total sections that need lab assignments
     total_sections_to_assign = sum(1 for section in num_labs_per_section if num_labs_per_section[section] >= 2)
 
     # Calculate maximum possible lab pair assignments
-    max_pairs_per_week = calculate_max_labs_per_week(time_slots, saturday_slots, lab_pairs)
-    max_section_assignments = max_pairs_per_week
+    max_section_assignments = resources.max_sessions_per_week()
 
     print(f"Resource calculation:")
     print(f"- Total sections needing labs: {total_sections_to_assign}")
@@ -124,25 +535,15 @@ def main(years_sections, num_labs_per_section, subjects_per_year):
         print("Warning: The required lab assignments exceed the maximum capacity.")
         print("Some sections might not get all their required lab slots.")
 
-    # Track assignments made for each section
-    section_assignments = {section: 0 for year in years_sections for section in years_sections[year]}
     total_labs_to_assign = sum(num_labs_per_section.values())
     labs_assigned = 0
 
-    # Track which day-slots we've tried for each section to avoid repeated attempts
-    tried_slots = {(year, section): set() for year, section in section_list}
-
-    # Maximum attempts to prevent infinite loop
-    max_attempts = 1000
-    attempt_counter = 0
-
-    # First scheduling pass - try to assign each section its required labs
-    while priority_queue and labs_assigned < total_labs_to_assign and attempt_counter < max_attempts:
-        attempt_counter += 1
-        year, section, _ = priority_queue.pop(0)  # Get highest priority section
+    while priority_queue and open_slots and labs_assigned < total_labs_to_assign:
+        year, section = priority_queue.popleft()
 
         if num_labs_per_section[section] < 2:
-            continue  # Skip if fewer than 2 labs needed (we assign in pairs)
+            print(f"Warning: Section {section} has 1 lab remaining which cannot be assigned (labs are assigned in pairs).")
+            continue
 
         # Get subject count for this year
         subject_count = len(subjects_per_year[year])
@@ -150,125 +551,31 @@ def main(years_sections, num_labs_per_section, subjects_per_year):
             print(f"Warning: Year {year} needs at least 2 subjects for rotation.")
             continue
 
-        # Determine subjects based on the current cycle position
-        cycle_pos = section_subject_state[section]['cycle_position']
-        if subject_count == 2:
-            # For 2 subjects rotation
-            if cycle_pos == 0:
-                subject1 = subjects_per_year[year][0]
-                subject2 = subjects_per_year[year][1]
-            else:  # cycle_pos == 1
-                subject1 = subjects_per_year[year][1]
-                subject2 = subjects_per_year[year][0]
-        elif subject_count == 3:
-            # For 3 subjects rotation
-            if cycle_pos == 0:
-                subject1 = subjects_per_year[year][0]
-                subject2 = subjects_per_year[year][1]
-            elif cycle_pos == 1:
-                subject1 = subjects_per_year[year][2]
-                subject2 = subjects_per_year[year][0]
-            else:  # cycle_pos == 2
-                subject1 = subjects_per_year[year][1]
-                subject2 = subjects_per_year[year][2]
-        else:
-            # For more than 3 subjects
-            idx1 = cycle_pos % subject_count
-            idx2 = (cycle_pos + 1) % subject_count
-            subject1 = subjects_per_year[year][idx1]
-            subject2 = subjects_per_year[year][idx2]
-
-        # Try each day and time slot
-        assigned = False
-        for day in days:
-            # Skip days this section already has an assignment on
-            if day in section_subject_state[section]['assigned_dates']:
-                continue
-
-            slot_options = saturday_slots if day == 'Saturday' else time_slots
-            for time_slot in slot_options:
-
-                # Skip if we've already tried this combination
-                if (day, time_slot) in tried_slots[(year, section)]:
-                    continue
-
-                # Mark this slot as tried
-                tried_slots[(year, section)].add((day, time_slot))
-
-                # Skip if this section already has a lab in this slot
-                if section in section_slot_usage[day][time_slot]:
-                    continue
-
-                # Skip if the year already has a lab in this slot (to avoid year conflicts)
-                if year in year_slot_usage[day][time_slot]:
-                    continue
-
-                # Try each lab pair
-                for lab1, lab2 in lab_pairs:
-                    # Check if both labs in the pair are available
-                    if lab1 not in lab_usage[day][time_slot] and lab2 not in lab_usage[day][time_slot]:
-                        # Found an available slot and lab pair!
-
-                        # Assign Batch 1
-                        lab_usage[day][time_slot].add(lab1)
-                        year_slot_usage[day][time_slot].add(year)
-                        section_slot_usage[day][time_slot].add(section)
-
-                        batch1 = f'Batch 1 (Lab {lab1}, {subject1})'
-                        lab_schedule.append({
-                            'Year': year,
-                            'Section': section,
-                            'Day': day,
-                            'Time': f'{time_slot[0]}:00 - {time_slot[1]}:00',
-                            'Batch': batch1,
-                            'Subject': subject1
-                        })
-                        num_labs_per_section[section] -= 1
-                        labs_assigned += 1
-
-                        # Assign Batch 2
-                        lab_usage[day][time_slot].add(lab2)
-                        batch2 = f'Batch 2 (Lab {lab2}, {subject2})'
-                        lab_schedule.append({
-                            'Year': year,
-                            'Section': section,
-                            'Day': day,
-                            'Time': f'{time_slot[0]}:00 - {time_slot[1]}:00',
-                            'Batch': batch2,
-                            'Subject': subject2
-                        })
-                        num_labs_per_section[section] -= 1
-                        labs_assigned += 1
-
-                        # Update tracking
-                        section_subject_state[section]['assigned_dates'].add(day)
-                        section_assignments[section] += 1
-
-                        # Update cycle position
-                        if subject_count == 2:
-                            section_subject_state[section]['cycle_position'] = (cycle_pos + 1) % 2
-                        elif subject_count == 3:
-                            section_subject_state[section]['cycle_position'] = (cycle_pos + 1) % 3
-                        else:
-                            section_subject_state[section]['cycle_position'] = (cycle_pos + 1) % subject_count
-
-                        assigned = True
-                        break
-                if assigned:
-                    break
-            if assigned:
-                break
-
-        # If this section still needs labs, add it back to the queue
-        if num_labs_per_section[section] >= 2:
-            priority_queue.append((year, section, num_labs_per_section[section]))
-        elif num_labs_per_section[section] == 1:
-            print(f"Warning: Section {section} has 1 lab remaining which cannot be assigned (labs are assigned in pairs).")
-
-    # Check if we hit the max attempts limit
-    if attempt_counter >= max_attempts:
-        print(f"Warning: Reached maximum scheduling attempts ({max_attempts}).")
-        print("This could indicate a scheduling conflict or inadequate resources.")
+        # Earliest slot with a free lab pair that the year and the section can both use
+        candidates = open_slots & ~year_slots[year] & ~section_closed[section]
+        assigned = candidates != 0
+        if assigned:
+            i = (candidates & -candidates).bit_length() - 1
+            day, time_slot = day_slots[i]
+            j = (free_pairs[i] & -free_pairs[i]).bit_length() - 1
+            lab_pair = resources.pairs[j]
+
+            # Assign Batch 1 and Batch 2; pairs sharing a lab with this one are no longer free
+            free_pairs[i] &= ~resources.pair_conflicts[j]
+            if not free_pairs[i]:
+                open_slots &= ~(1 << i)
+            year_slots[year] |= 1 << i
+            section_closed[section] |= day_masks[day]
+
+            subject1, subject2 = rotation_subjects(subjects_per_year[year], cycle_position[section])
+            lab_schedule.extend(lab_session_entries(year, section, day, time_slot, lab_pair, subject1, subject2))
+            cycle_position[section] = (cycle_position[section] + 1) % subject_count
+            num_labs_per_section[section] -= 2
+            labs_assigned += 2
+
+        # Back of the queue while labs remain; nothing free now means nothing free later
+        if assigned and num_labs_per_section[section] > 0:
+            priority_queue.append((year, section))
 
     # If not all labs are assigned, show a warning
     if labs_assigned < total_labs_to_assign:
@@ -276,10 +583,10 @@ def main(years_sections, num_labs_per_section, subjects_per_year):
         print("This could be due to scheduling constraints or resource limitations.")
 
         # Report on remaining unassigned labs
+        section_years = {section: year for year, section in section_list}
         for section in num_labs_per_section:
             if num_labs_per_section[section] > 0:
-                year = next(y for y in years_sections if section in years_sections[y])
-                print(f"  - {year} - {section}: {num_labs_per_section[section]} labs remaining")
+                print(f"  - {section_years[section]} - {section}: {num_labs_per_section[section]} labs remaining")
     else:
         print(f"Success! All {total_labs_to_assign} labs were successfully assigned.")
 
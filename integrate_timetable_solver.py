@@ -1,20 +1,185 @@
+import io
 import itertools
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from ortools.sat.python import cp_model
-from tabulate import tabulate
-from datetime import datetime
 
-import sys
+import generate_lab_timetable
+
+from solver_profile import SolverProfiler
+from timetable_result import TimetableResult, timetable_diff
+
+
+class SolverOptions:
+    """
+    Tuning options for IntegratedTimetableSolver.
+
+    - max_time_in_seconds: CP-SAT time limit (None, the default, for no limit; the web
+      service sets its own, see TIMETABLE_TIME_LIMIT in app.py)
+    - num_search_workers: parallel search workers (None for the CP-SAT default)
+    - random_seed: CP-SAT random seed (None for the CP-SAT default)
+    - stop_after_first_solution: stop as soon as any feasible timetable is found
+    - log_search_progress: print the CP-SAT search log
+    - gap_encoding: how constraint 12 (no gaps) is encoded, 'linear' or 'pairwise'
+      (joint lab mode and the soft objective always use 'linear')
+    - decompose: solve groups of years that share no teachers as separate models in
+      parallel processes (see IntegratedTimetableSolver.solve_components). Off by
+      default: the spawned processes import the caller's main module, which then needs
+      an `if __name__ == "__main__":` guard
+    - component_workers: processes for the decomposed solve (None for one per
+      component, up to the CPU count)
+    - strategy: 'full' solves the whole model at once, 'lns' runs a large neighbourhood
+      search within max_time_in_seconds (see IntegratedTimetableSolver.solve_lns)
+    - lns_neighbourhood_time: time limit of each LNS re-solve
+    - objective: 'none' keeps every rule hard; 'soft' turns the no-gaps rule (12) into a
+      penalty and minimizes the weighted penalties of add_soft_objective (the class
+      model only: joint lab mode keeps its own objective, and LNS is not supported)
+    - penalty_weights: weight of each soft penalty by name (see PENALTIES), over
+      DEFAULT_PENALTY_WEIGHTS; a weight of 0 drops the penalty
+    - teacher_daily_hours: class hours a teacher teaches a day before 'teacher_overload' counts
+    - late_hour: classes starting at this hour or later count as 'late_classes'
+    """
+    GAP_ENCODINGS = ('linear', 'pairwise')
+    STRATEGIES = ('full', 'lns')
+    OBJECTIVES = ('none', 'soft')
+    PENALTIES = ('gaps', 'teacher_overload', 'uneven_spread', 'late_classes')
+    DEFAULT_PENALTY_WEIGHTS = {'gaps': 10, 'teacher_overload': 5, 'uneven_spread': 2, 'late_classes': 1}
+    FIELDS = {
+        'max_time_in_seconds': (int, float),
+        'num_search_workers': int,
+        'random_seed': int,
+        'stop_after_first_solution': bool,
+        'log_search_progress': bool,
+        'gap_encoding': str,
+        'decompose': bool,
+        'component_workers': int,
+        'strategy': str,
+        'lns_neighbourhood_time': (int, float),
+        'objective': str,
+        'penalty_weights': dict,
+        'teacher_daily_hours': int,
+        'late_hour': int,
+    }
 
-# Open a log file in write (or append) mode
-now = datetime.now()
-timestamp = now.timestamp()
-path = f'output/output_{timestamp}.txt'
-log_file = open(path, 'w')
-
-sys.stdout = log_file
+    def __init__(
+        self,
+        max_time_in_seconds=None,
+        num_search_workers=None,
+        random_seed=None,
+        stop_after_first_solution=False,
+        log_search_progress=False,
+        gap_encoding='linear',
+        decompose=False,
+        component_workers=None,
+        strategy='full',
+        lns_neighbourhood_time=5.0,
+        objective='none',
+        penalty_weights=None,
+        teacher_daily_hours=4,
+        late_hour=15
+    ):
+        if gap_encoding not in self.GAP_ENCODINGS:
+            raise ValueError(f"gap_encoding must be one of {', '.join(self.GAP_ENCODINGS)}")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"strategy must be one of {', '.join(self.STRATEGIES)}")
+        if lns_neighbourhood_time <= 0:
+            raise ValueError("lns_neighbourhood_time must be positive")
+        if max_time_in_seconds is not None and max_time_in_seconds <= 0:
+            raise ValueError("max_time_in_seconds must be positive")
+        if num_search_workers is not None and num_search_workers < 0:
+            raise ValueError("num_search_workers must not be negative")
+        if component_workers is not None and component_workers < 1:
+            raise ValueError("component_workers must be at least 1")
+        if objective not in self.OBJECTIVES:
+            raise ValueError(f"objective must be one of {', '.join(self.OBJECTIVES)}")
+        if objective == 'soft' and strategy == 'lns':
+            raise ValueError("objective 'soft' cannot be combined with strategy 'lns'")
+        for name, weight in (penalty_weights or {}).items():
+            if name not in self.PENALTIES:
+                raise ValueError(f"Unknown penalty: {name}; penalties are {', '.join(self.PENALTIES)}")
+            if not isinstance(weight, int) or isinstance(weight, bool) or weight < 0:
+                raise ValueError(f"Penalty weight {name} must be a non-negative integer")
+        if teacher_daily_hours < 0:
+            raise ValueError("teacher_daily_hours must not be negative")
+        if not 0 <= late_hour <= 24:
+            raise ValueError("late_hour must be an hour of the day")
+
+        self.max_time_in_seconds = max_time_in_seconds
+        self.num_search_workers = num_search_workers
+        self.random_seed = random_seed
+        self.stop_after_first_solution = stop_after_first_solution
+        self.log_search_progress = log_search_progress
+        self.gap_encoding = gap_encoding
+        self.decompose = decompose
+        self.component_workers = component_workers
+        self.strategy = strategy
+        self.lns_neighbourhood_time = lns_neighbourhood_time
+        self.objective = objective
+        self.penalty_weights = dict(self.DEFAULT_PENALTY_WEIGHTS, **(penalty_weights or {}))
+        self.teacher_daily_hours = teacher_daily_hours
+        self.late_hour = late_hour
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build options from a request payload, rejecting unknown keys and wrong types."""
+        if data is None:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError("solver_options must be an object")
+
+        for key, value in data.items():
+            if key not in cls.FIELDS:
+                raise ValueError(f"Unknown solver option: {key}")
+            expected = cls.FIELDS[key]
+            # bool is a subclass of int, so don't let True/False through as numbers
+            if value is not None and (not isinstance(value, expected) or
+                                      (isinstance(value, bool) and expected is not bool)):
+                raise ValueError(f"Invalid value for solver option {key}: {value!r}")
+        return cls(**data)
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def apply(self, solver):
+        """Copy these options onto a cp_model.CpSolver."""
+        if self.max_time_in_seconds is not None:
+            solver.parameters.max_time_in_seconds = self.max_time_in_seconds
+        if self.num_search_workers is not None:
+            solver.parameters.num_search_workers = self.num_search_workers
+        if self.random_seed is not None:
+            solver.parameters.random_seed = self.random_seed
+        solver.parameters.stop_after_first_solution = self.stop_after_first_solution
+        solver.parameters.log_search_progress = self.log_search_progress
+
+
+class ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback of the solver's searches: reports each solution to the solver's
+    progress callable and stops the search once accept() was called.
+    """
+
+    def __init__(self, solver, search):
+        super().__init__()
+        self.solver = solver
+        self.search = search
+
+    def on_solution_callback(self):
+        solver = self.solver
+        solver.solutions_found += 1
+        if solver.progress is not None:
+            solver.progress(solver.solution_summary(self, self.search))
+        if solver.accept_requested:
+            self.StopSearch()
 
 
 class IntegratedTimetableSolver:
+    # Time allowed for deriving the auxiliary variables of a warm start, see complete_hints
+    HINT_COMPLETION_SECONDS = 10.0
+
     def __init__(
         self, 
         lab_schedule, 
@@ -28,8 +193,24 @@ class IntegratedTimetableSolver:
         optional_subject,
         optional_subject_hours,
         optional_subject_teacher,
-        rooms
+        rooms,
+        lab_demand=None,
+        options=None,
+        report_sink=None,
+        profiler=None,
+        progress=None
     ):
+        # Everything this solver prints goes into its own report, and also into
+        # report_sink (any object with write()) when the caller passes one
+        self.report = io.StringIO()
+        self.report_sink = report_sink
+
+        # Phase timings and model sizes are always recorded (see solver_profile.py);
+        # the result carries the report in result.profile when the caller passes a profiler
+        self.profiler = profiler or SolverProfiler()
+        self.attach_profile = profiler is not None
+        laps = self.profiler.laps("init")
+
         # Time slots for regular classes (1-hour slots)
         self.time_slots = [
             '8:00-9:00', '9:00-10:00', '10:00-11:00', '11:00-12:00',
@@ -45,6 +226,16 @@ class IntegratedTimetableSolver:
         # Mapping time slots to index positions
         self.time_slot_indices = {slot: i for i, slot in enumerate(self.time_slots)}
 
+        # Joint mode: lab_demand = {"labs_per_section": {section: labs}, "subjects_per_year": {year: [lab subjects]}}
+        # makes lab sessions decision variables of this model instead of a fixed lab_schedule
+        # lab_demand may also carry a "lab_resources" inventory (see generate_lab_timetable.LabResources)
+        self.lab_demand = lab_demand
+        self.joint_labs = lab_demand is not None
+        self.lab_resources = None
+        if self.joint_labs:
+            lab_schedule = None
+            self.lab_resources = generate_lab_timetable.LabResources.from_dict(lab_demand.get("lab_resources"))
+
         self.lab_schedule = lab_schedule or []  # Ensure lab_schedule is not None
         self.years_sections = years_sections
 
@@ -85,6 +276,37 @@ class IntegratedTimetableSolver:
         self.optional_subject_teacher = optional_subject_teacher
         self.rooms = rooms
 
+        # CP-SAT parameters and model encoding choices
+        self.options = options or SolverOptions()
+
+        # LNS works on the class model; joint mode always solves the whole model
+        self.use_lns = self.options.strategy == 'lns' and not self.joint_labs
+        # Soft objective mode works on the class model too; joint mode has its own objective
+        self.use_soft = self.options.objective == 'soft' and not self.joint_labs
+        # Soft mode: the penalized variables and expressions, by penalty name
+        self.penalties = {}
+
+        # Filled in by solve()
+        self.status_name = None
+        self.wall_time = None
+
+        # The CpSolver of a running solve(), so stop() can interrupt it from another thread
+        self.cp_solver = None
+        self.stop_requested = False
+
+        # progress, if given, is called with a solution_summary for every solution CP-SAT
+        # finds; accept() ends the search at the best one so far
+        self.progress = progress
+        self.accept_requested = False
+        self.solutions_found = 0
+        self.search_started = None
+        self.section_indices = None
+
+        # Decomposed solve: the event that stops the component processes, and the
+        # per-component summary reported in statistics["decomposition"]
+        self.component_stop = None
+        self.decomposition = None
+
         # Get number of core subjects per year and calculate required teachers
         self.core_subjects_per_year = self.get_core_subjects_info()
         self.required_teachers = self.calculate_required_teachers()
@@ -92,42 +314,87 @@ class IntegratedTimetableSolver:
         # Get classrooms from user
         self.classrooms = self.get_classroom_input()
 
+        # Classes allowed at once (constraint 5); a component of a decomposed solve gets a share
+        self.room_capacity = len(self.classrooms)
+
         # Get subjects, teachers and hours required per subject per year
         self.subjects, self.teacher_assignments, self.hours_per_subject = self.get_subject_data()
 
         # Identify the language subject for each year
         self.lang_subject = self.identify_lang_subject()
+        laps.lap("inputs")
+
+        # Index lab sessions by (year, section, day) so lookups don't rescan lab_schedule
+        self.lab_index = self.build_lab_index()
+        laps.lap("lab_index")
 
         # Calculate continuous timeslot ranges for each section and day
-        self.continuous_time_slots = self.calculate_continuous_time_slots()
+        if self.joint_labs:
+            # The window depends on the lab start, which the solver decides
+            self.continuous_time_slots = {}
+            self.log("Lab sessions are decided together with the classes (joint mode).")
+        else:
+            self.continuous_time_slots = self.calculate_continuous_time_slots()
+        laps.lap("continuous_time_slots")
 
         # Create the model
         self.model = cp_model.CpModel()
         self.schedule = {}
 
-        print(self)
+        # Joint mode: (year, section, day, time_slot, lab_pair) -> BoolVar, and the
+        # lab start choices of each (year, section, day) as [(lab_time, literal)]
+        self.lab_sessions = {}
+        self.lab_options = {}
+
+        # Scheduled (year, section, subject, day, slot) keys, filled in by solve()
+        self.solution = None
+
+        # Incremental mode, set up by pin_previous(): the previous TimetableResult, the
+        # literals of each section with their previous values, and the (name, sections
+        # pinned) stages solve() tries in turn
+        self.previous = None
+        self.pins = {}
+        self.pin_stages = []
+        self.incremental_stage = None
+        self.incremental_wall_time = 0.0
+
+        # Warm start, set up by warm_start(): {variable: hinted value}, the previous
+        # classes that matched a variable, the hint counts for the statistics, and the
+        # seconds complete_hints() spent, which count against max_time_in_seconds
+        self.hints = {}
+        self.hinted_classes = set()
+        self.hint_counts = {}
+        self.hint_time = 0.0
+
+        self.log(self)
+
+    def log(self, *args, **kwargs):
+        """print() into this solver's report and the caller's report_sink."""
+        print(*args, file=self.report, **kwargs)
+        if self.report_sink is not None:
+            print(*args, file=self.report_sink, **kwargs)
 
     def get_core_subjects_info(self):
         """Get the number of core subjects per year."""
         core_subjects_per_year = {}
-        print("\nEnter the number of core subjects for each year:")
+        self.log("\nEnter the number of core subjects for each year:")
         for year in self.years:
             while True:
                 try:
                     num_subjects = self.num_subjects
                     if num_subjects <= 0:
-                        print("Number of subjects must be positive. Please try again.")
+                        self.log("Number of subjects must be positive. Please try again.")
                     else:
                         core_subjects_per_year[year] = num_subjects
                         break
                 except ValueError:
-                    print("Please enter a valid number.")
+                    self.log("Please enter a valid number.")
         return core_subjects_per_year
 
     def calculate_required_teachers(self):
         """Calculate required teachers based on the formula."""
         required_teachers = {}
-        print("\nCalculating required teachers per year:")
+        self.log("\nCalculating required teachers per year:")
         for year in self.years:
             num_sections = len(self.sections[year])
             num_subjects = self.core_subjects_per_year[year]
@@ -140,8 +407,8 @@ class IntegratedTimetableSolver:
                 required = (product + 1) // 2
 
             required_teachers[year] = required
-            print(f"Year {year}: {num_sections} sections X {num_subjects} subjects = {product}")
-            print(f"{required} teachers required")
+            self.log(f"Year {year}: {num_sections} sections X {num_subjects} subjects = {product}")
+            self.log(f"{required} teachers required")
 
         return required_teachers
 
@@ -150,14 +417,14 @@ class IntegratedTimetableSolver:
         lang_subject = {}
         for year in self.years:
             if year in self.subjects:
-                print(f"\nIdentify language subject for Year {year}")
-                print(f"Available subjects: {', '.join(self.subjects[year])}")
+                self.log(f"\nIdentify language subject for Year {year}")
+                self.log(f"Available subjects: {', '.join(self.subjects[year])}")
                 lang = self.lang
                 if lang.lower() != 'none' and lang in self.subjects[year]:
                     lang_subject[year] = lang
-                    print(f"Language subject '{lang}' identified for Year {year}")
+                    self.log(f"Language subject '{lang}' identified for Year {year}")
                 else:
-                    print(f"No language subject set for Year {year}")
+                    self.log(f"No language subject set for Year {year}")
         return lang_subject
 
     def get_classroom_input(self):
@@ -177,11 +444,11 @@ class IntegratedTimetableSolver:
         for year in self.years:
             subjects[year] = []
 
-            print(f"\nEnter data for Year {year}")
-            print(f"You need to assign {self.required_teachers[year]} teachers for {self.core_subjects_per_year[year]} core subjects across {len(self.sections[year])} sections")
+            self.log(f"\nEnter data for Year {year}")
+            self.log(f"You need to assign {self.required_teachers[year]} teachers for {self.core_subjects_per_year[year]} core subjects across {len(self.sections[year])} sections")
 
             # Ask for core subjects
-            print(f"Enter {self.core_subjects_per_year[year]} core subjects for Year {year}:")
+            self.log(f"Enter {self.core_subjects_per_year[year]} core subjects for Year {year}:")
             core_subjects = []
             for i in range(self.core_subjects_per_year[year]):
                 subject_input = self.subject_input[i]
@@ -214,54 +481,100 @@ class IntegratedTimetableSolver:
 
             # Assign teachers to core subjects
             if core_subjects:
-                print(f"\nAssign {self.required_teachers[year]} teachers for core subjects in Year {year}:")
+                self.log(f"\nAssign {self.required_teachers[year]} teachers for core subjects in Year {year}:")
+                # One list for every year, or {year: [names]} when each year has its own staff
+                names = self.teacher_name
+                if isinstance(names, dict):
+                    names = names.get(year, [])
                 teacher_list = []
                 for i in range(self.required_teachers[year]):
-                    teacher_name = self.teacher_name[i]
+                    teacher_name = names[i]
                     teacher_list.append(teacher_name)
 
                 # Now assign teachers to core subjects for each section
-                print("\nAssigning teachers to core subjects for each section:")
+                self.log("\nAssigning teachers to core subjects for each section:")
                 teacher_index = 0
                 for section in self.sections[year]:
                     for subject in core_subjects:
                         # Assign the next teacher in the rotation
                         teacher_assignments[(year, section, subject)] = teacher_list[teacher_index]
-                        print(f"Assigned {teacher_list[teacher_index]} to {subject} for Section {section}")
+                        self.log(f"Assigned {teacher_list[teacher_index]} to {subject} for Section {section}")
 
                         # Move to next teacher, wrap around if needed
                         teacher_index = (teacher_index + 1) % len(teacher_list)
 
         return subjects, teacher_assignments, hours_per_subject
 
-    def slot_overlaps_lab(self, year, section, day, time_slot):
-        """Check if a class time slot overlaps with a lab session."""
-        # Extract hour from time slot (e.g., '8:00-9:00' -> 8)
-        start_hour = int(time_slot.split(':')[0])
+    def build_lab_index(self):
+        """
+        Build the lab occupancy index, keyed by (year, section, day).
+
+        Each entry holds:
+        - mask: bitmask over self.time_slots, bit i set if slot i overlaps a lab
+        - sessions: parsed lab sessions (start, end, time, subject, batch) in schedule order
+        - slot_sessions: the first session covering each slot index, or None
+        - first_time: (start_hour, end_hour) of the first session that day
+        - hours: lab hours that day, counting each distinct time range once
+        """
+        slot_hours = [int(slot.split(':')[0]) for slot in self.time_slots]
+        index = {}
 
-        # Check each lab session for this section
         for lab in self.lab_schedule:
-            if lab['Year'] == year and lab['Section'] == section and lab['Day'] == day:
-                # Parse lab time range (e.g., '8:00 - 11:00')
-                lab_start, lab_end = lab['Time'].split(' - ')
-                lab_start_hour = int(lab_start.split(':')[0])
-                lab_end_hour = int(lab_end.split(':')[0])
+            key = (lab['Year'], lab['Section'], lab['Day'])
+
+            # Parse lab time range (e.g., '8:00 - 11:00')
+            lab_start, lab_end = lab['Time'].split(' - ')
+            lab_start_hour = int(lab_start.split(':')[0])
+            lab_end_hour = int(lab_end.split(':')[0])
+
+            session = {
+                'start': lab_start_hour,
+                'end': lab_end_hour,
+                'time': lab['Time'],
+                'subject': lab.get('Subject'),
+                'batch': lab['Batch'].split('(')[0].strip(),  # Extract "Batch 1" or "Batch 2"
+            }
+
+            entry = index.get(key)
+            if entry is None:
+                entry = {
+                    'mask': 0,
+                    'sessions': [],
+                    'slot_sessions': [None] * len(self.time_slots),
+                    'first_time': (lab_start_hour, lab_end_hour),
+                    'hours': 0,
+                    'times': set(),
+                }
+                index[key] = entry
+
+            entry['sessions'].append(session)
+
+            # Only count each time range once
+            if lab['Time'] not in entry['times']:
+                entry['times'].add(lab['Time'])
+                entry['hours'] += lab_end_hour - lab_start_hour
+
+            for i, hour in enumerate(slot_hours):
+                if lab_start_hour <= hour < lab_end_hour:
+                    entry['mask'] |= 1 << i
+                    if entry['slot_sessions'][i] is None:
+                        entry['slot_sessions'][i] = session
+
+        return index
 
-                # If class start time falls within lab session time, there's an overlap
-                if lab_start_hour <= start_hour < lab_end_hour:
-                    return True
-
-        return False
+    def slot_overlaps_lab(self, year, section, day, time_slot):
+        """Check if a class time slot overlaps with a lab session."""
+        entry = self.lab_index.get((year, section, day))
+        if entry is None:
+            return False
+        return bool(entry['mask'] >> self.time_slot_indices[time_slot] & 1)
 
     def get_lab_time_for_section(self, year, section, day):
         """Get lab start and end times for a section on a given day, or None if no lab."""
-        for lab in self.lab_schedule:
-            if lab['Year'] == year and lab['Section'] == section and lab['Day'] == day:
-                lab_start, lab_end = lab['Time'].split(' - ')
-                lab_start_hour = int(lab_start.split(':')[0])
-                lab_end_hour = int(lab_end.split(':')[0])
-                return (lab_start_hour, lab_end_hour)
-        return None
+        entry = self.lab_index.get((year, section, day))
+        if entry is None:
+            return None
+        return entry['first_time']
 
     def calculate_continuous_time_slots(self):
         """
@@ -282,54 +595,7 @@ class IntegratedTimetableSolver:
                 for day in self.days:
                     # Get lab time for this section on this day
                     lab_time = self.get_lab_time_for_section(year, section, day)
-
-                    # Apply rules based on lab timing
-                    if lab_time:
-                        lab_start_hour, lab_end_hour = lab_time
-
-                        if lab_start_hour == 8:
-                            # If lab is at 8:00 AM, classes should be till 4:00 PM (16:00)
-                            # Lab is at beginning, so classes after lab till 15:00
-                            start_idx = self.time_slot_indices[f'{lab_end_hour}:00-{lab_end_hour+1}:00']
-                            end_idx = self.time_slot_indices.get('16:00-17:00', len(self.time_slots)-1)
-                            allowed_slots = self.time_slots[start_idx:end_idx+1]
-
-                        elif lab_start_hour == 11:
-                            # If lab is at 11:00 AM, classes should be from 9:00 AM
-                            # Classes before lab from 9:00 and after lab if needed
-                            before_lab = self.time_slots[self.time_slot_indices['9:00-10:00']:self.time_slot_indices[f'{lab_start_hour}:00-{lab_start_hour+1}:00']]
-                            after_lab = self.time_slots[self.time_slot_indices[f'{lab_end_hour}:00-{lab_end_hour+1}:00']:] if lab_end_hour < 17 else []
-                            # allowed_slots = before_lab + after_lab
-                            # Add a break slot right after the lab ends
-                            break_slot_after_lab = [self.break_slot]
-
-                            # Get slots after the break (if any remaining hours)
-                            break_slot_idx = self.time_slot_indices.get(f'{lab_end_hour}:00-{lab_end_hour+1}:00', None)
-                            after_break = [] if break_slot_idx is None or break_slot_idx >= len(self.time_slots)-1 else self.time_slots[break_slot_idx+1:]
-
-                            allowed_slots = before_lab + break_slot_after_lab + after_break
-
-                        elif lab_start_hour == 14:  # 2:00 PM
-                            # If lab is at 2:00 PM, classes should be from 9:00 AM
-                            # Classes before lab from 9:00
-                            start_idx = self.time_slot_indices['9:00-10:00']
-                            end_idx = self.time_slot_indices[f'{lab_start_hour}:00-{lab_start_hour+1}:00'] - 1
-                            allowed_slots = self.time_slots[start_idx:end_idx+1]
-
-                        else:
-                            # For other lab times, handle appropriately
-                            before_lab = self.time_slots[self.time_slot_indices['9:00-10:00']:self.time_slot_indices[f'{lab_start_hour}:00-{lab_start_hour+1}:00']]
-                            after_lab = self.time_slots[self.time_slot_indices[f'{lab_end_hour}:00-{lab_end_hour+1}:00']:] if lab_end_hour < 17 else []
-                            allowed_slots = before_lab + after_lab
-
-                    else:
-                        # No lab on this day, allocate continuous classes from 9:00 AM
-                        start_idx = self.time_slot_indices['9:00-10:00']
-                        allowed_slots = self.time_slots[start_idx:]
-
-                    # Remove break slot on weekdays (except for the 11:00 AM lab case where we explicitly added it)
-                    if day in self.weekdays and self.break_slot in allowed_slots and lab_time and lab_start_hour != 11:
-                        allowed_slots = [slot for slot in allowed_slots if slot != self.break_slot]
+                    allowed_slots = self.allowed_slots_for_lab(day, lab_time)
 
                 # Store the allowed slots for this day
                     continuous_slots[year][section][day] = allowed_slots
@@ -341,64 +607,185 @@ class IntegratedTimetableSolver:
                             output_slots.append(f"[BREAK: {slot}]")
                         else:
                             output_slots.append(slot)
-                    print(f"For Year {year}, Section {section}, {day}: {', '.join(output_slots)}")
+                    self.log(f"For Year {year}, Section {section}, {day}: {', '.join(output_slots)}")
         return continuous_slots
 
-    def count_lab_hours_in_day(self, year, section, day):
-      """Count the number of hours spent in labs on a given day."""
-      lab_hours = 0
+    def allowed_slots_for_lab(self, day, lab_time):
+        """Class slots allowed on day for a section whose lab that day is lab_time ((start, end) hours, or None)."""
+        # Apply rules based on lab timing
+        if lab_time:
+            lab_start_hour, lab_end_hour = lab_time
+
+            if lab_start_hour == 8:
+                # If lab is at 8:00 AM, classes should be till 4:00 PM (16:00)
+                # Lab is at beginning, so classes after lab till 15:00
+                start_idx = self.time_slot_indices[f'{lab_end_hour}:00-{lab_end_hour+1}:00']
+                end_idx = self.time_slot_indices.get('16:00-17:00', len(self.time_slots)-1)
+                allowed_slots = self.time_slots[start_idx:end_idx+1]
+
+            elif lab_start_hour == 11:
+                # If lab is at 11:00 AM, classes should be from 9:00 AM
+                # Classes before lab from 9:00 and after lab if needed
+                before_lab = self.time_slots[self.time_slot_indices['9:00-10:00']:self.time_slot_indices[f'{lab_start_hour}:00-{lab_start_hour+1}:00']]
+                after_lab = self.time_slots[self.time_slot_indices[f'{lab_end_hour}:00-{lab_end_hour+1}:00']:] if lab_end_hour < 17 else []
+                # allowed_slots = before_lab + after_lab
+                # Add a break slot right after the lab ends
+                break_slot_after_lab = [self.break_slot]
+
+                # Get slots after the break (if any remaining hours)
+                break_slot_idx = self.time_slot_indices.get(f'{lab_end_hour}:00-{lab_end_hour+1}:00', None)
+                after_break = [] if break_slot_idx is None or break_slot_idx >= len(self.time_slots)-1 else self.time_slots[break_slot_idx+1:]
+
+                allowed_slots = before_lab + break_slot_after_lab + after_break
+
+            elif lab_start_hour == 14:  # 2:00 PM
+                # If lab is at 2:00 PM, classes should be from 9:00 AM
+                # Classes before lab from 9:00
+                start_idx = self.time_slot_indices['9:00-10:00']
+                end_idx = self.time_slot_indices[f'{lab_start_hour}:00-{lab_start_hour+1}:00'] - 1
+                allowed_slots = self.time_slots[start_idx:end_idx+1]
+
+            else:
+                # For other lab times, handle appropriately
+                before_lab = self.time_slots[self.time_slot_indices['9:00-10:00']:self.time_slot_indices[f'{lab_start_hour}:00-{lab_start_hour+1}:00']]
+                after_lab = self.time_slots[self.time_slot_indices[f'{lab_end_hour}:00-{lab_end_hour+1}:00']:] if lab_end_hour < 17 else []
+                allowed_slots = before_lab + after_lab
 
-    # Get unique lab sessions by start/end time to avoid counting duplicates
-      counted_sessions = set()
+        else:
+            # No lab on this day, allocate continuous classes from 9:00 AM
+            start_idx = self.time_slot_indices['9:00-10:00']
+            allowed_slots = self.time_slots[start_idx:]
 
-      for lab in self.lab_schedule:
-          if lab['Year'] == year and lab['Day'] == day and lab['Section'] == section:
-              time_key = lab['Time']  # Use the time string as a key
+        # Remove break slot on weekdays (except for the 11:00 AM lab case where we explicitly added it)
+        if day in self.weekdays and self.break_slot in allowed_slots and lab_time and lab_start_hour != 11:
+            allowed_slots = [slot for slot in allowed_slots if slot != self.break_slot]
 
-            # Only count each time slot once
-              if time_key not in counted_sessions:
-                  counted_sessions.add(time_key)
+        return allowed_slots
 
-                  # Parse lab time range
-                  lab_start, lab_end = lab['Time'].split(' - ')
-                  lab_start_hour = int(lab_start.split(':')[0])
-                  lab_end_hour = int(lab_end.split(':')[0])
+    def count_lab_hours_in_day(self, year, section, day):
+        """Count the number of hours spent in labs on a given day."""
+        entry = self.lab_index.get((year, section, day))
+        if entry is None:
+            return 0
+        return entry['hours']
 
-                  # Add the duration of this lab
-                  lab_hours += (lab_end_hour - lab_start_hour)
+    def class_slot_mask(self, year, section, day):
+        """
+        Bitmask over self.time_slots of the slots where a section can have a class on day.
 
-      return lab_hours
+        Leaves out what constraints 4, 6, 7 and 11 rule out: lab slots, Saturday
+        afternoons, the weekday break and slots outside the continuous window (in joint
+        mode, outside the window of every lab option).
+        """
+        if self.joint_labs:
+            allowed = {slot for lab_time, _ in self.lab_options[(year, section, day)]
+                       for slot in self.allowed_slots_for_lab(day, lab_time)}
+            lab_mask = 0
+        else:
+            allowed = self.continuous_time_slots[year][section][day]
+            entry = self.lab_index.get((year, section, day))
+            lab_mask = entry['mask'] if entry else 0
+
+        mask = 0
+        for i, slot in enumerate(self.time_slots):
+            if slot not in allowed or lab_mask >> i & 1:
+                continue
+            if day in self.weekdays and slot == self.break_slot:
+                continue
+            if day == 'Saturday' and int(slot.split(':')[0]) >= 12:
+                continue
+            mask |= 1 << i
+        return mask
 
     def create_variables(self):
-        """Create decision variables for the schedule."""
-        # Create schedule variables for each year, section, subject, day, and time slot
+        """
+        Create decision variables for the schedule.
+
+        Only slots in class_slot_mask get a variable, so self.schedule is sparse: a
+        missing (year, section, subject, day, slot) key is a class that can never be
+        there. Look keys up with self.schedule.get(key, 0) or class_vars.
+        """
+        laps = self.profiler.laps("create_variables", self.model)
+        if self.joint_labs:
+            # The class slots depend on the lab options
+            self.create_lab_variables()
+            laps.lap("labs")
+
+        # Create schedule variables for each year, section, subject, day, and allowed time slot
         for year in self.years:
             for section in self.sections[year]:
+                masks = {day: self.class_slot_mask(year, section, day) for day in self.days}
                 for subject in self.subjects.get(year, []):
                     for day in self.days:
-                        for slot in self.time_slots:
-                            self.schedule[(year, section, subject, day, slot)] = self.model.NewBoolVar(
-                                f'y{year}_s{section}_{subject}_{day}_{slot}')
+                        for i, slot in enumerate(self.time_slots):
+                            if masks[day] >> i & 1:
+                                self.schedule[(year, section, subject, day, slot)] = self.model.NewBoolVar(
+                                    f'y{year}_s{section}_{subject}_{day}_{slot}')
+        laps.lap("classes")
+
+    def class_vars(self, keys):
+        """The variables of the schedule keys that have one."""
+        return [self.schedule[key] for key in keys if key in self.schedule]
+
+    def create_lab_variables(self):
+        """Joint mode: lab sessions and each section's lab start per day become decision variables."""
+        self.lab_sessions = generate_lab_timetable.add_lab_session_variables(
+            self.model, self.years_sections,
+            self.lab_demand.get("labs_per_section", {}), self.lab_demand.get("subjects_per_year", {}),
+            self.lab_resources)
+
+        starts = {}
+        for (year, section, day, time_slot, lab_pair), var in self.lab_sessions.items():
+            starts.setdefault((year, section, day), {}).setdefault(time_slot, []).append(var)
+
+        for year in self.years:
+            for section in self.sections[year]:
+                for day in self.days:
+                    day_starts = starts.get((year, section, day))
+                    if not day_starts:
+                        # No lab possible that day: a single, always-true option
+                        self.lab_options[(year, section, day)] = [(None, None)]
+                        continue
+
+                    no_lab = self.model.NewBoolVar(f'no_lab_{year}_{section}_{day}')
+                    options = [(None, no_lab)]
+                    for time_slot, sessions in day_starts.items():
+                        lab_start = self.model.NewBoolVar(f'lab_start_{year}_{section}_{day}_{time_slot[0]}')
+                        self.model.Add(lab_start == sum(sessions))
+                        options.append((time_slot, lab_start))
+                    self.model.AddExactlyOne(literal for _, literal in options)
+                    self.lab_options[(year, section, day)] = options
 
     def add_constraints(self):
         """Add constraints to the model."""
+        # One profile span per constraint family
+        laps = self.profiler.laps("constraints", self.model)
+
         # 1. Each subject must be scheduled for the specified number of hours per week
+        # (LNS mode: at most that many, and the objective schedules as many as it can)
         for year in self.years:
             for section in self.sections[year]:
                 for subject in self.subjects.get(year, []):
-                    self.model.Add(sum(self.schedule[(year, section, subject, day, slot)]
-                                        for day in self.days
-                                        for slot in self.time_slots) == self.hours_per_subject.get((year, subject), 0))
+                    hours = cp_model.LinearExpr.Sum(self.class_vars(
+                        (year, section, subject, day, slot) for day in self.days for slot in self.time_slots))
+                    if self.use_lns:
+                        self.model.Add(hours <= self.hours_per_subject.get((year, subject), 0))
+                    else:
+                        self.model.Add(hours == self.hours_per_subject.get((year, subject), 0))
+
+        if self.use_lns:
+            self.add_lns_objective()
+        laps.lap("1_weekly_hours")
 
         # 9. No same subject allocation more than once per day for each section
         for year in self.years:
             for section in self.sections[year]:
                 for subject in self.subjects.get(year, []):
                     for day in self.days:
-                        self.model.Add(
-                            sum(self.schedule[(year, section, subject, day, slot)]
-                                for slot in self.time_slots) <= 1
-                        )
+                        classes = self.class_vars((year, section, subject, day, slot) for slot in self.time_slots)
+                        if len(classes) > 1:
+                            self.model.Add(sum(classes) <= 1)
+        laps.lap("9_once_a_day")
 
         # 2. No teacher can be assigned to more than one class at the same time
         for day in self.days:
@@ -415,53 +802,44 @@ class IntegratedTimetableSolver:
 
                 # Add constraint for each teacher
                 for teacher, assignments in teacher_classes.items():
-                    self.model.Add(sum(self.schedule[(year, section, subject, day, slot)]
-                                      for year, section, subject in assignments) <= 1)
+                    classes = self.class_vars((year, section, subject, day, slot)
+                                              for year, section, subject in assignments)
+                    if len(classes) > 1:
+                        self.model.Add(sum(classes) <= 1)
+        laps.lap("2_teacher_clash")
 
         # 3. No section can have more than one class at the same time
         for year in self.years:
             for section in self.sections[year]:
                 for day in self.days:
                     for slot in self.time_slots:
-                        self.model.Add(sum(self.schedule[(year, section, subject, day, slot)]
-                                          for subject in self.subjects.get(year, [])) <= 1)
+                        classes = self.class_vars((year, section, subject, day, slot)
+                                                  for subject in self.subjects.get(year, []))
+                        if len(classes) > 1:
+                            self.model.Add(sum(classes) <= 1)
+        laps.lap("3_section_clash")
 
         # 4. No class can be scheduled when a lab is already scheduled
-        for year in self.years:
-            for section in self.sections[year]:
-                for day in self.days:
-                    for slot in self.time_slots:
-                        if self.slot_overlaps_lab(year, section, day, slot):
-                            self.model.Add(sum(self.schedule[(year, section, subject, day, slot)]
-                                              for subject in self.subjects.get(year, [])) == 0)
+        # 6. No classes on Saturday afternoon (after 12:00)
+        # 7. No classes during break time (12:00-13:00) on weekdays
+        # create_variables gives these slots no variables (see class_slot_mask)
 
         # 5. No more classes than available classrooms at any time
         for day in self.days:
             for slot in self.time_slots:
-                self.model.Add(sum(self.schedule[(year, section, subject, day, slot)]
-                                   for year in self.years
-                                   for section in self.sections[year]
-                                   for subject in self.subjects.get(year, [])) <= len(self.classrooms))
-
-        # 6. No classes on Saturday afternoon (after 12:00)
-        for slot in self.time_slots:
-            start_hour = int(slot.split(':')[0])
-            if start_hour >= 12 and 'Saturday' in self.days:  # 12 PM or later
-                self.model.Add(sum(self.schedule[(year, section, subject, 'Saturday', slot)]
-                                   for year in self.years
-                                   for section in self.sections[year]
-                                   for subject in self.subjects.get(year, [])) == 0)
-
-        # 7. No classes during break time (12:00-13:00) on weekdays
-        # Skip this constraint if there's already a lab scheduled
-        for day in self.weekdays:  # Only Monday to Friday
-            for year in self.years:
-                for section in self.sections[year]:
-                    # Only add the break constraint if there's no lab scheduled at that time
-                    if not self.slot_overlaps_lab(year, section, day, self.break_slot):
-                        # Prevent any subject from being scheduled during break
-                        self.model.Add(sum(self.schedule[(year, section, subject, day, self.break_slot)]
-                                          for subject in self.subjects.get(year, [])) == 0)
+                classes = self.class_vars((year, section, subject, day, slot)
+                                          for year in self.years
+                                          for section in self.sections[year]
+                                          for subject in self.subjects.get(year, []))
+                if len(classes) > self.room_capacity:
+                    self.model.Add(sum(classes) <= self.room_capacity)
+        laps.lap("5_classrooms")
+
+        if self.joint_labs:
+            # Constraints 8, 10, 11 and 12 depend on the lab start, which the solver decides
+            self.add_joint_lab_constraints()
+            laps.lap("joint_labs")
+            return
 
         # 8. Limit each section to a maximum of 8 hours per day (including break)
         for year in self.years:
@@ -476,12 +854,15 @@ class IntegratedTimetableSolver:
                         break_used = 1
 
                     # Total class hours (each scheduled class = 1 hour)
-                    class_hours = sum(self.schedule[(year, section, subject, day, slot)]
-                                     for subject in self.subjects.get(year, [])
-                                     for slot in self.time_slots)
+                    classes = self.class_vars((year, section, subject, day, slot)
+                                              for subject in self.subjects.get(year, [])
+                                              for slot in self.time_slots)
 
                     # Limit total hours to max_hours_per_day
-                    self.model.Add(class_hours + lab_hours + break_used <= self.max_hours_per_day)
+                    if len(classes) + lab_hours + break_used > self.max_hours_per_day:
+                        self.model.Add(cp_model.LinearExpr.Sum(classes) + lab_hours + break_used
+                                       <= self.max_hours_per_day)
+        laps.lap("8_daily_hours")
 
         # 10. Language subject must be scheduled at the same time for all sections of the same year
         for year in self.years:
@@ -507,42 +888,42 @@ class IntegratedTimetableSolver:
                     if len(available_sections) < 2:
                         continue
 
+                    # Language variables of the available sections; skip if none can have it here
+                    lang_vars = [self.schedule.get((year, section, lang, day, slot))
+                                 for section in available_sections]
+                    if not any(var is not None for var in lang_vars):
+                        continue
+
                     # Create variables that indicate if any section has lang at this time
                     any_lang_scheduled = self.model.NewBoolVar(f'any_lang_{year}_{day}_{slot}')
 
                     # Connect the indicator variable to the actual schedules
                     self.model.AddMaxEquality(
                         any_lang_scheduled,
-                        [self.schedule[(year, section, lang, day, slot)]
-                         for section in available_sections]
+                        [var for var in lang_vars if var is not None]
                     )
 
                     # If any section has lang, all available sections must have lang
-                    for section in available_sections:
-                        self.model.AddImplication(
-                            any_lang_scheduled,
-                            self.schedule[(year, section, lang, day, slot)]
-                        )
+                    for var in lang_vars:
+                        if var is None:
+                            # A section that can't have a class here rules the slot out for all
+                            self.model.Add(any_lang_scheduled == 0)
+                        else:
+                            self.model.AddImplication(any_lang_scheduled, var)
+        laps.lap("10_language_sync")
 
         # 11. NEW: Continuous allocation constraint - classes must be scheduled within the allowed time slots
-        for year in self.years:
-            for section in self.sections[year]:
-                for day in self.days:
-                    allowed_slots = self.continuous_time_slots[year][section][day]
-                    disallowed_slots = [slot for slot in self.time_slots if slot not in allowed_slots]
-
-                    # No classes can be scheduled in disallowed slots
-                    for slot in disallowed_slots:
-                        # Skip if this slot overlaps with a lab (already handled by constraint 4)
-                        if not self.slot_overlaps_lab(year, section, day, slot):
-                            self.model.Add(sum(self.schedule[(year, section, subject, day, slot)]
-                                             for subject in self.subjects.get(year, [])) == 0)
+        # Slots outside the window get no variables (see class_slot_mask)
 
         # 12. NEW: Try to schedule classes continuously without gaps
+        # (soft mode: extra gaps are penalized instead, and not encoded at all without a weight)
+        gap_penalties = self.penalties.setdefault('gaps', []) if self.use_soft else None
         for year in self.years:
             for section in self.sections[year]:
                 for day in self.days:
                     allowed_slots = self.continuous_time_slots[year][section][day]
+                    if self.use_soft and not self.options.penalty_weights['gaps']:
+                        continue
 
                     # Skip days with insufficient slots
                     if len(allowed_slots) <= 1:
@@ -552,245 +933,1192 @@ class IntegratedTimetableSolver:
                     slot_used = {}
                     for slot in allowed_slots:
                         slot_used[(day, slot)] = self.model.NewBoolVar(f'slot_used_{year}_{section}_{day}_{slot}')
+                        classes = self.class_vars((year, section, subject, day, slot)
+                                                  for subject in self.subjects.get(year, []))
 
                         # Link slot_used to actual class schedule
                         # slot_used = 1 if any class is scheduled in this slot
                         self.model.Add(slot_used[(day, slot)] == 0).OnlyEnforceIf(
-                            [self.schedule[(year, section, subject, day, slot)].Not()
-                             for subject in self.subjects.get(year, [])])
+                            [var.Not() for var in classes])
 
-                        for subject in self.subjects.get(year, []):
-                            self.model.AddImplication(
-                                self.schedule[(year, section, subject, day, slot)],
-                                slot_used[(day, slot)]
-                            )
-
-                    # Add constraints to minimize gaps between used slots
-                    # For each consecutive pair of slots, if the later slot is used, either the earlier slot
-                    # is used or all slots between are used
-                    for i in range(len(allowed_slots) - 1):
-                        for j in range(i + 2, len(allowed_slots)):
-                            # If slot j is used and some slot between i and j is not used, then slot i is not used
-                            # This encourages continuous block scheduling
-                            gap_exists = self.model.NewBoolVar(f'gap_{year}_{section}_{day}_{i}_{j}')
-
-                            # Check if any slot between i+1 and j-1 is not used
-                            middle_slots_all_used = self.model.NewBoolVar(f'middle_all_used_{year}_{section}_{day}_{i}_{j}')
-
-                            if j > i + 1:  # If there are slots between i and j
-                                middle_slot_vars = [slot_used[(day, allowed_slots[k])] for k in range(i+1, j)]
-                                self.model.AddMinEquality(
-                                    middle_slots_all_used,
-                                    middle_slot_vars
-                                )
-
-                                # gap_exists is true if j is used, middle is not all used, and i is not used
-                                self.model.AddBoolAnd([
-                                    slot_used[(day, allowed_slots[j])],
-                                    middle_slots_all_used.Not(),
-                                    slot_used[(day, allowed_slots[i])].Not()
-                                ]).OnlyEnforceIf(gap_exists)
-
-                                # If gap_exists is false, then either j is not used, all middle slots are used, or i is used
-                                self.model.AddBoolOr([
-                                    slot_used[(day, allowed_slots[j])].Not(),
-                                    middle_slots_all_used,
-                                    slot_used[(day, allowed_slots[i])]
-                                ]).OnlyEnforceIf(gap_exists.Not())
-
-                                # Minimize gaps
-                                self.model.Add(gap_exists == 0)
+                        for var in classes:
+                            self.model.AddImplication(var, slot_used[(day, slot)])
 
-    def solve(self):
-        """Solve the model and print the timetable."""
-        solver = cp_model.CpSolver()
-        status = solver.Solve(self.model)
+                    if self.use_soft:
+                        gap_penalties.append(
+                            self.add_gap_constraints_linear(year, section, day, allowed_slots, slot_used, soft=True))
+                    elif self.options.gap_encoding == 'pairwise':
+                        self.add_gap_constraints_pairwise(year, section, day, allowed_slots, slot_used)
+                    else:
+                        self.add_gap_constraints_linear(year, section, day, allowed_slots, slot_used)
+        laps.lap("12_no_gaps")
 
-        if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
-            print("\nComplete Timetable Generated Successfully!")
+        if self.use_soft:
+            self.add_soft_objective()
+            laps.lap("soft_objective")
+
+    def add_gap_constraints_pairwise(self, year, section, day, allowed_slots, slot_used):
+        """
+        Original gap encoding: two auxiliary BoolVars per (i, j) pair of allowed slots.
+
+        For every i < j - 1, if slot j is used and slot i is not, every slot between them
+        must be used. Kept for comparison with add_gap_constraints_linear.
+        """
+        # Add constraints to minimize gaps between used slots
+        # For each consecutive pair of slots, if the later slot is used, either the earlier slot
+        # is used or all slots between are used
+        for i in range(len(allowed_slots) - 1):
+            for j in range(i + 2, len(allowed_slots)):
+                # If slot j is used and some slot between i and j is not used, then slot i is not used
+                # This encourages continuous block scheduling
+                gap_exists = self.model.NewBoolVar(f'gap_{year}_{section}_{day}_{i}_{j}')
+
+                # Check if any slot between i+1 and j-1 is not used
+                middle_slots_all_used = self.model.NewBoolVar(f'middle_all_used_{year}_{section}_{day}_{i}_{j}')
+
+                if j > i + 1:  # If there are slots between i and j
+                    middle_slot_vars = [slot_used[(day, allowed_slots[k])] for k in range(i+1, j)]
+                    self.model.AddMinEquality(
+                        middle_slots_all_used,
+                        middle_slot_vars
+                    )
+
+                    # gap_exists is true if j is used, middle is not all used, and i is not used
+                    self.model.AddBoolAnd([
+                        slot_used[(day, allowed_slots[j])],
+                        middle_slots_all_used.Not(),
+                        slot_used[(day, allowed_slots[i])].Not()
+                    ]).OnlyEnforceIf(gap_exists)
+
+                    # If gap_exists is false, then either j is not used, all middle slots are used, or i is used
+                    self.model.AddBoolOr([
+                        slot_used[(day, allowed_slots[j])].Not(),
+                        middle_slots_all_used,
+                        slot_used[(day, allowed_slots[i])]
+                    ]).OnlyEnforceIf(gap_exists.Not())
+
+                    # Minimize gaps
+                    self.model.Add(gap_exists == 0)
+
+    def add_gap_constraints_linear(self, year, section, day, allowed_slots, slot_used, enforce=None, soft=False):
+        """
+        Linear gap encoding with one auxiliary BoolVar per allowed slot.
+
+        Accepts exactly the same days as the pairwise encoding: the used slots are the
+        allowed slots up to the last used one, with at most one unused slot among them.
+        tail[k] marks slots after the last used slot; tail slots are unused, the tail is a
+        suffix, and at most one slot is neither used nor in the tail.
 
-            # Create combined timetable for each year and section
+        With an enforce literal the constraints only hold when it is true (joint mode).
+        With soft=True any number of gaps is allowed, and the IntVar counting the unused
+        slots beyond the first is returned for the objective to minimize.
+        """
+        enforce = [] if enforce is None else [enforce]
+        tail = [self.model.NewBoolVar(f'tail_{year}_{section}_{day}_{k}')
+                for k in range(len(allowed_slots))]
+        used = [slot_used[(day, slot)] for slot in allowed_slots]
+
+        for k in range(len(allowed_slots)):
+            # Tail slots are never used
+            self.model.AddBoolOr([used[k].Not(), tail[k].Not()]).OnlyEnforceIf(enforce)
+            # Once in the tail, stay in the tail
+            if k + 1 < len(allowed_slots):
+                self.model.AddImplication(tail[k], tail[k + 1]).OnlyEnforceIf(enforce)
+
+        # At most one gap before the tail
+        if soft:
+            extra_gaps = self.model.NewIntVar(0, len(allowed_slots), f'extra_gaps_{year}_{section}_{day}')
+            self.model.Add(sum(used) + sum(tail) + extra_gaps >= len(allowed_slots) - 1)
+            return extra_gaps
+        self.model.Add(sum(used) + sum(tail) >= len(allowed_slots) - 1).OnlyEnforceIf(enforce)
+
+    def add_soft_objective(self):
+        """
+        Soft mode: minimize the weighted penalties (SolverOptions.penalty_weights):
+        - gaps: unused slots in a section's day beyond the one allowed (see add_gap_constraints_linear)
+        - teacher_overload: class hours of a teacher in a day above teacher_daily_hours
+        - uneven_spread: a subject of a section taught on two consecutive days
+        - late_classes: classes starting at late_hour or later
+
+        penalty_breakdown counts the same penalties on a finished timetable.
+        """
+        weights = self.options.penalty_weights
+
+        if weights['teacher_overload']:
+            overloads = self.penalties.setdefault('teacher_overload', [])
+            limit = self.options.teacher_daily_hours
+            for teacher, assignments in self.teacher_classes().items():
+                for day in self.days:
+                    classes = self.class_vars((year, section, subject, day, slot)
+                                              for year, section, subject in assignments for slot in self.time_slots)
+                    if len(classes) > limit:
+                        overload = self.model.NewIntVar(0, len(classes) - limit, f'overload_{teacher}_{day}')
+                        self.model.Add(overload >= sum(classes) - limit)
+                        overloads.append(overload)
+
+        if weights['uneven_spread']:
+            repeats = self.penalties.setdefault('uneven_spread', [])
             for year in self.years:
                 for section in self.sections[year]:
-                    print(f"\n=== Year {year}, Section {section} Timetable ===")
+                    for subject in self.subjects.get(year, []):
+                        # At most one class a day (constraint 9), so these are 0 or 1
+                        taught = [cp_model.LinearExpr.Sum(self.class_vars(
+                            (year, section, subject, day, slot) for slot in self.time_slots)) for day in self.days]
+                        for i in range(len(self.days) - 1):
+                            repeat = self.model.NewBoolVar(f'repeat_{year}_{section}_{subject}_{self.days[i]}')
+                            self.model.Add(repeat >= taught[i] + taught[i + 1] - 1)
+                            repeats.append(repeat)
+
+        if weights['late_classes']:
+            self.penalties['late_classes'] = [var for key, var in self.schedule.items()
+                                              if int(key[4].split(':')[0]) >= self.options.late_hour]
+
+        terms = [(var, weights[name]) for name, variables in self.penalties.items() if weights[name]
+                 for var in variables]
+        if terms:
+            self.model.Minimize(cp_model.LinearExpr.WeightedSum([var for var, _ in terms],
+                                                               [weight for _, weight in terms]))
+
+    def teacher_classes(self):
+        """{teacher: [(year, section, subject)]} of the classes each teacher teaches."""
+        classes = {}
+        for year in self.years:
+            for section in self.sections[year]:
+                for subject in self.subjects.get(year, []):
+                    teacher = self.teacher_assignments.get((year, section, subject))
+                    if teacher:
+                        classes.setdefault(teacher, []).append((year, section, subject))
+        return classes
 
-                    # Create timetable data
-                    table_data = []
-                    headers = ["Day"] + self.time_slots
+    def penalty_breakdown(self, solution):
+        """
+        The soft penalties of a timetable (a set of schedule keys), as counted by
+        add_soft_objective: {name: {"count", "weight", "cost"}} and the "total" cost.
+        """
+        weights = self.options.penalty_weights
+        counts = dict.fromkeys(self.options.PENALTIES, 0)
+        hours = {}  # (year, section, day) -> set of slots with a class
+        for year, section, subject, day, slot in solution:
+            hours.setdefault((year, section, day), set()).add(slot)
+            if int(slot.split(':')[0]) >= self.options.late_hour:
+                counts['late_classes'] += 1
 
+        for year in self.years:
+            for section in self.sections[year]:
+                for day in self.days:
+                    allowed_slots = self.continuous_time_slots[year][section][day]
+                    used = [slot in hours.get((year, section, day), ()) for slot in allowed_slots]
+                    if len(allowed_slots) > 1 and any(used):
+                        last = max(k for k, slot_used in enumerate(used) if slot_used)
+                        counts['gaps'] += max(used[:last + 1].count(False) - 1, 0)
+
+                for subject in self.subjects.get(year, []):
+                    taught = [any((year, section, subject, day, slot) in solution for slot in self.time_slots)
+                              for day in self.days]
+                    counts['uneven_spread'] += sum(1 for i in range(len(taught) - 1) if taught[i] and taught[i + 1])
+
+        for teacher, assignments in self.teacher_classes().items():
+            for day in self.days:
+                taught = sum(1 for year, section, subject in assignments for slot in self.time_slots
+                             if (year, section, subject, day, slot) in solution)
+                counts['teacher_overload'] += max(taught - self.options.teacher_daily_hours, 0)
+
+        breakdown = {name: {"count": count, "weight": weights[name], "cost": count * weights[name]}
+                     for name, count in counts.items()}
+        breakdown["total"] = sum(penalty["cost"] for penalty in breakdown.values())
+        return breakdown
+
+    def add_joint_lab_constraints(self):
+        """
+        Joint mode versions of constraints 8, 10, 11 and 12.
+
+        Each (year, section, day) picks exactly one lab option: no lab, or a lab start.
+        A class slot is open if the chosen option's allowed_slots_for_lab window holds it
+        and its lab does not cover it; the daily hours and the gap rule follow the chosen
+        option. Constraints 4 and 7 need no change: with no fixed labs, 4 is empty and 7
+        closes the weekday break for every section. The lab placement maximizes the labs
+        assigned, as the exact lab allocation mode does.
+        """
+        in_lab = {}  # (year, section, day, slot) -> literals of the lab options covering it
+
+        for year in self.years:
+            subjects = self.subjects.get(year, [])
+            for section in self.sections[year]:
+                for day in self.days:
+                    options = self.lab_options[(year, section, day)]
+                    windows = [(lab_time, literal, self.allowed_slots_for_lab(day, lab_time))
+                               for lab_time, literal in options]
+
+                    # 11. Classes only in the window of the chosen option, and never during its lab
+                    for slot in self.time_slots:
+                        hour = int(slot.split(':')[0])
+                        covers = [bool(lab_time) and lab_time[0] <= hour < lab_time[1] for lab_time, _, _ in windows]
+                        in_lab[(year, section, day, slot)] = [
+                            literal for (_, literal, _), covered in zip(windows, covers) if covered]
+
+                        open_options = [literal for (_, literal, allowed), covered in zip(windows, covers)
+                                        if slot in allowed and not covered]
+                        classes = self.class_vars((year, section, subject, day, slot) for subject in subjects)
+                        if not classes:
+                            continue
+                        if options[0][1] is None:
+                            # Fixed no-lab day
+                            if not open_options:
+                                self.model.Add(sum(classes) == 0)
+                        else:
+                            self.model.Add(sum(classes) <= sum(open_options))
+
+                    # 8. At most 8 hours a day, counting the lab and the weekday break
+                    lab_hours = sum((lab_time[1] - lab_time[0]) * literal
+                                    for lab_time, literal in options if lab_time)
+                    break_used = 0
+                    if day in self.weekdays:
+                        break_used = 1 - sum(in_lab[(year, section, day, self.break_slot)])
+                    class_hours = cp_model.LinearExpr.Sum(self.class_vars(
+                        (year, section, subject, day, slot) for subject in subjects for slot in self.time_slots))
+                    self.model.Add(class_hours + lab_hours + break_used <= self.max_hours_per_day)
+
+                    # 12. No gaps within the chosen option's window
+                    windows = [window for window in windows if len(window[2]) > 1]
+                    slot_used = {}
+                    for slot in dict.fromkeys(slot for _, _, allowed in windows for slot in allowed):
+                        slot_used[(day, slot)] = self.model.NewBoolVar(f'slot_used_{year}_{section}_{day}_{slot}')
+                        classes = self.class_vars((year, section, subject, day, slot) for subject in subjects)
+                        self.model.Add(slot_used[(day, slot)] == 0).OnlyEnforceIf([var.Not() for var in classes])
+                        for var in classes:
+                            self.model.AddImplication(var, slot_used[(day, slot)])
+                    for lab_time, literal, allowed in windows:
+                        self.add_gap_constraints_linear(year, section, day, allowed, slot_used, enforce=literal)
+
+        # 10. If one section of a year has the language subject in a slot, every other
+        # section of the year has it too, unless that section is in a lab
+        for year in self.years:
+            if year not in self.lang_subject or len(self.sections[year]) < 2:
+                continue
+            lang = self.lang_subject[year]
+            for day in self.days:
+                for slot in self.time_slots:
+                    any_lang_scheduled = self.model.NewBoolVar(f'any_lang_{year}_{day}_{slot}')
+                    for section in self.sections[year]:
+                        lang_var = self.schedule.get((year, section, lang, day, slot), 0)
+                        if not isinstance(lang_var, int):
+                            self.model.AddImplication(lang_var, any_lang_scheduled)
+                        self.model.Add(cp_model.LinearExpr.Sum([lang_var, *in_lab[(year, section, day, slot)]])
+                                       >= any_lang_scheduled)
+
+        # The total demand bounds the objective, so a solve that places every lab stops as optimal
+        labs_per_section = self.lab_demand.get("labs_per_section", {})
+        demand = sum(labs_per_section.get(section, 0) // 2
+                     for section in {key[1] for key in self.lab_sessions})
+        assigned = self.model.NewIntVar(0, demand, 'labs_assigned')
+        self.model.Add(assigned == sum(self.lab_sessions.values()))
+        self.model.Maximize(assigned)
+
+    def changed_sections(self, previous, changed=None):
+        """
+        Sections whose inputs no longer match the previous TimetableResult.
+
+        A section has changed if it is new, or if a subject's teacher, a subject's weekly
+        hours or its lab slots differ from the previous timetable. changed can name more:
+        {"sections": [[year, section], ...], "teachers": [name, ...], "years": [year, ...]};
+        every section of a named year or taught by a named teacher counts as changed.
+
+        Returns (sections, teachers): the changed (year, section) pairs, and the teachers
+        whose classes they touch, before and after the change.
+        """
+        changed = changed or {}
+        sections = {tuple(key) for key in changed.get("sections", [])}
+        teachers = set(changed.get("teachers", []))
+        years = set(changed.get("years", []))
+        previous_keys = previous.class_keys()
+
+        for year in self.years:
+            for section in self.sections[year]:
+                timetable = previous.sections.get(year, {}).get(section)
+                if timetable is None or year in years:
+                    sections.add((year, section))
+                    continue
+
+                assignments = previous.teacher_assignments.get(year, {}).get("sections", {}).get(section, {})
+                for subject in self.subjects.get(year, []):
+                    teacher = self.teacher_assignments.get((year, section, subject))
+                    hours = sum(1 for day in self.days for slot in self.time_slots
+                                if (year, section, subject, day, slot) in previous_keys)
+                    if assignments.get(subject) != teacher or hours != self.hours_per_subject.get((year, subject), 0):
+                        sections.add((year, section))
+                        teachers.update(name for name in (assignments.get(subject), teacher) if name)
+
+                if not self.joint_labs:
                     for day in self.days:
-                        row = [day]
-                        for slot in self.time_slots:
-                            # Check if there's a lab session
-                            lab_entry = None
-                            for lab in self.lab_schedule:
-                                if (lab['Year'] == year and
-                                    lab['Section'] == section and
-                                    lab['Day'] == day):
-                                    lab_time = lab['Time']
-                                    lab_start = int(lab_time.split(':')[0])
-                                    lab_end = int(lab_time.split(' - ')[1].split(':')[0])
-                                    slot_hour = int(slot.split(':')[0])
-
-                                    if lab_start <= slot_hour < lab_end:
-                                        batch_info = lab['Batch'].split('(')[0].strip()  # Extract "Batch 1" or "Batch 2"
-                                        lab_entry = f"LAB {lab['Subject']} ({batch_info})"
-                                        break
-
-                            if lab_entry:
-                                row.append(lab_entry)
-                            # Check if it's break time (12:00-13:00) on weekdays
-                            elif slot == self.break_slot and day in self.weekdays:
-                                row.append("BREAK")  # Mark as break time
-                            else:
-                                # Check if there's a class scheduled
-                                class_entry = "--"
-                                for subject in self.subjects.get(year, []):
-                                    if solver.Value(self.schedule.get((year, section, subject, day, slot), 0)) == 1:
-                                        teacher = self.teacher_assignments.get((year, section, subject), "")
-                                        class_entry = f"{subject} ({teacher})"
-                                        break
-                                row.append(class_entry)
-
-                        table_data.append(row)
-
-                    # Print timetable
-                    print(tabulate(table_data, headers=headers, tablefmt="grid"))
-
-                    # Calculate total hours for this section for each day
-                    print("\nDaily Hours Summary:")
-                    for day in self.days:
-                        lab_hours = self.count_lab_hours_in_day(year, section, day)
-                        class_hours = sum(
-                            solver.Value(self.schedule.get((year, section, subject, day, slot), 0))
-                            for subject in self.subjects.get(year, [])
-                            for slot in self.time_slots
-                        )
-                        break_hours = 0
-                        if day in self.weekdays and not self.slot_overlaps_lab(year, section, day, self.break_slot):
-                            break_hours = 1
-
-                        total_hours = lab_hours + class_hours + break_hours
-                        print(f"{day}: {total_hours} hours (Lab: {lab_hours}, Class: {class_hours}, Break: {break_hours})")
-
-            #Print language subject synchronization summary
-            if any(self.lang_subject):
-                print("\nLanguage Subject Synchronization Summary:")
-                for year in self.lang_subject:
-                    lang = self.lang_subject[year]
-                    print(f"\nYear {year} - Language Subject: {lang}")
-
-                    # Find all slots where language is scheduled
-                    lang_slots = {}
-                    for day in self.days:
-                        for slot in self.time_slots:
-                            # Check if language is scheduled for any section at this time
-                            sections_with_lang = []
-                            for section in self.sections[year]:
-                                if solver.Value(self.schedule.get((year, section, lang, day, slot), 0)) == 1:
-                                    sections_with_lang.append(section)
-
-                            if sections_with_lang:
-                                if day not in lang_slots:
-                                    lang_slots[day] = {}
-                                lang_slots[day][slot] = sections_with_lang
-
-                    # Print the language schedule
-                    if lang_slots:
-                        for day in self.days:
-                            if day in lang_slots:
-                                for slot in sorted(lang_slots[day].keys()):
-                                    sections = lang_slots[day][slot]
-                                    print(f"  {day}, {slot}: {lang} scheduled for sections {', '.join(sections)}")
-
-            # Print teacher assignment summary
-            print("\nTeacher Assignment Summary:")
-            # Group subjects into core and additional categories
-            for year in self.years:
-                core_subjects = self.subjects[year][:self.core_subjects_per_year[year]]
-                additional_subjects = self.subjects[year][self.core_subjects_per_year[year]:]
-
-                print(f"\nYear {year}:")
-                print(f"  Required teachers for core subjects: {self.required_teachers[year]}")
-                print(f"  Sections: {len(self.sections[year])}")
-                print(f"  Core subjects: {self.core_subjects_per_year[year]}")
-                if additional_subjects:
-                    print(f"  Additional subjects: {len(additional_subjects)}")
-
-                # Print teacher-subject-section assignments
-                teachers_used = set()
-                for (y, sec, subj), teacher in self.teacher_assignments.items():
-                    if y == year:
-                        teachers_used.add(teacher)
-
-                print(f"  Total teachers assigned: {len(teachers_used)}")
-                print("  Teacher assignments per section:")
-                for section in self.sections[year]:
-                    print(f"    Section {section}:")
-
-                    # Print core subjects first
-                    if core_subjects:
-                        print(f"      Core Subjects:")
-                        for subject in core_subjects:
-                            teacher = self.teacher_assignments.get((year, section, subject), "Not assigned")
-                            print(f"        {subject}: {teacher}")
-
-                    # Then print additional subjects
-                    if additional_subjects:
-                        print(f"      Additional Subjects:")
-                        for subject in additional_subjects:
-                            teacher = self.teacher_assignments.get((year, section, subject), "Not assigned")
-                            print(f"        {subject}: {teacher}")
-
-            # Print summary statistics
-            print("\nSchedule Summary:")
-            total_classes = sum(
-                solver.Value(self.schedule.get((year, section, subject, day, slot), 0))
-                for year in self.years
-                for section in self.sections[year]
-                for subject in self.subjects.get(year, [])
-                for day in self.days
-                for slot in self.time_slots
-            )
-            print(f"Total scheduled classes: {total_classes}")
-            print(f"Total scheduled lab sessions: {len(self.lab_schedule)}")
-
-            # Count break slots
-            break_count = sum(
-                1 for day in self.weekdays
-                for year in self.years
-                for section in self.sections[year]
-                if not any(
-                    lab['Year'] == year and lab['Section'] == section and
-                    lab['Day'] == day and self.slot_overlaps_lab(year, section, day, self.break_slot)
-                    for lab in self.lab_schedule
-                )
-            )
-            print(f"Total break slots: {break_count}")
-
-            # Generate individual teacher timetables
-            self.generate_teacher_timetables(
-                self.years,
-                self.sections,
-                self.subjects,
-                self.schedule,
-                self.teacher_assignments,
-                self.time_slots,
-                self.days,
-                self.lab_schedule,
-                solver
-            )
-            sys.stdout = sys.__stdout__  # Reset to default
-            log_file.close()
-            return path
+                        was_lab = [bool(cell) and cell["type"] == "lab" for cell in timetable["grid"][day]]
+                        is_lab = [self.slot_overlaps_lab(year, section, day, slot) for slot in self.time_slots]
+                        if was_lab != is_lab:
+                            sections.add((year, section))
+
+        # Sections taught by a named teacher
+        for (year, section, subject), teacher in self.teacher_assignments.items():
+            if teacher in teachers:
+                sections.add((year, section))
+
+        for year, section in sections:
+            for subject in self.subjects.get(year, []):
+                teacher = self.teacher_assignments.get((year, section, subject))
+                if teacher:
+                    teachers.add(teacher)
+
+        return sections, teachers
+
+    def pin_previous(self, previous, changed=None):
+        """
+        Incremental mode: re-solve only around what changed since previous (a TimetableResult).
+
+        Call after add_constraints(). solve() then fixes sections to their previous
+        classes (and, in joint mode, lab start times), trying in turn to pin:
+        - every section except the changed ones (see changed_sections)
+        - every section except the changed ones and their neighbours: sections sharing
+          a teacher with them, and the other sections of their years (language sync)
+        - nothing, a full solve
+        moving on only when a stage is infeasible. Pinned variables are fixed in a copy
+        of the model, so presolve removes them. Every variable is hinted with its
+        previous value, and the result carries a diff against previous.
+        """
+        self.previous = previous
+        previous_keys = previous.class_keys()
+
+        changed_sections, teachers = self.changed_sections(previous, changed)
+        years = {year for year, _ in changed_sections}
+        neighbours = set(changed_sections)
+        for (year, section, subject), teacher in self.teacher_assignments.items():
+            if teacher in teachers or year in years:
+                neighbours.add((year, section))
+
+        previous_labs = {}
+        for entry in previous.lab_schedule:
+            start, end = (int(part.split(':')[0]) for part in entry['Time'].split(' - '))
+            previous_labs.setdefault((entry['Year'], entry['Section'], entry['Day']), (start, end))
+
+        for year in self.years:
+            for section in self.sections[year]:
+                pins = [(self.schedule[key], key in previous_keys)
+                        for key in itertools.product([year], [section], self.subjects.get(year, []),
+                                                     self.days, self.time_slots)
+                        if key in self.schedule]
+                for day in self.days if self.joint_labs else []:
+                    lab_time = previous_labs.get((year, section, day))
+                    pins.extend((literal, option_time == lab_time)
+                                for option_time, literal in self.lab_options[(year, section, day)]
+                                if literal is not None)
+                self.pins[(year, section)] = pins
+
+        # The pinned stages re-solve around the change anyway, so a previous timetable
+        # that no longer fits is not worth searching for the closest one
+        self.warm_start(previous, closest=False)
+
+        all_sections = set(self.pins)
+        self.pin_stages = [
+            ("changed sections", all_sections - changed_sections),
+            ("neighbourhood", all_sections - neighbours),
+            ("full", set()),
+        ]
+        self.log(f"Incremental re-solve: {len(changed_sections)} changed sections, "
+                 f"{len(neighbours)} with their neighbourhood, {len(all_sections)} in total.")
+
+    def warm_start(self, previous, closest=True):
+        """
+        Hint the search with a previous TimetableResult, e.g. the last stored timetable.
+
+        Call after add_constraints(). Every class variable is hinted with its value in
+        previous, and in joint mode so are the lab sessions; complete_hints(closest) then
+        derives the remaining variables from them. Previous classes whose (year, section, subject,
+        day, slot) no longer has a variable are skipped; solve() reports how many hints
+        matched and how many the solution kept in statistics["warm_start"].
+        """
+        previous_keys = previous.class_keys()
+        self.hints = {var: key in previous_keys for key, var in self.schedule.items()}
+        if self.joint_labs:
+            previous_sessions = generate_lab_timetable.session_keys(previous.lab_schedule, self.lab_resources)
+            self.hints.update((var, key in previous_sessions) for key, var in self.lab_sessions.items())
+            matched_sessions = len(previous_sessions & self.lab_sessions.keys())
+
+        self.hinted_classes = previous_keys & self.schedule.keys()
+        self.hint_counts = {
+            "previous_classes": len(previous_keys),
+            "matched_classes": len(self.hinted_classes),
+            "hinted_variables": len(self.hints),
+        }
+        if self.joint_labs:
+            self.hint_counts["previous_lab_sessions"] = len(previous_sessions)
+            self.hint_counts["matched_lab_sessions"] = matched_sessions
+        self.hint_counts["complete"] = self.complete_hints(closest)
+        self.log(f"Warm start: {self.hint_counts['matched_classes']} of "
+                 f"{self.hint_counts['previous_classes']} previous classes hinted"
+                 + (", with every variable." if self.hint_counts["complete"] else ", repairing the rest."))
+
+    def complete_hints(self, closest=True):
+        """
+        Turn the hints of warm_start() into a hint for every variable of the model.
+
+        The slot-used, gap and penalty variables follow from the classes and labs, but
+        CP-SAT only finds that out by search: with just the classes hinted, the first
+        solution often strays far from them. So the hinted values are fixed and the
+        rest solved, which is mostly propagation, and that solution is hinted in full.
+        When the previous timetable no longer fits (a lab moved, hours changed, ...)
+        and closest is set, the timetable that changes the fewest hinted values is
+        hinted instead. Only when neither is found are the classes and labs hinted on
+        their own, for solve() to repair. Returns whether the hint is complete.
+
+        Each search gets at most HINT_COMPLETION_SECONDS, stop() interrupts it, and the
+        time spent is taken off the time limit of solve().
+        """
+        self.model.ClearHints()
+        start = time.perf_counter()
+        with self.profiler.span("warm_start.complete_hints"):
+            solver, status = self.run_hint_solver(self.fixed_model(self.hints.items()), start)
+            changed = 0
+            if closest and status not in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+                model = self.model.clone()
+                model.clear_objective()
+                model.Minimize(cp_model.LinearExpr.Sum([var.Not() if value else var
+                                                        for var, value in self.hints.items()]))
+                for var, value in self.hints.items():
+                    model.AddHint(var, value)
+                solver, status = self.run_hint_solver(model, start)
+                if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+                    changed = int(solver.ObjectiveValue())
+        self.hint_time = time.perf_counter() - start
+
+        if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+            self.hint_counts["hints_changed"] = changed
+            hint = self.model.Proto().solution_hint
+            hint.vars.extend(range(len(self.model.Proto().variables)))
+            hint.values.extend(solver.ResponseProto().solution)
+            return True
+        for var, value in self.hints.items():
+            self.model.AddHint(var, value)
+        return False
+
+    def run_hint_solver(self, model, start):
+        """
+        Solve model for complete_hints(), which started at start. Returns the CpSolver
+        and the CP-SAT status, UNKNOWN when stopped or out of time.
+        """
+        solver = cp_model.CpSolver()
+        time_limit = self.HINT_COMPLETION_SECONDS
+        if self.options.max_time_in_seconds is not None:
+            time_limit = min(time_limit, self.options.max_time_in_seconds - (time.perf_counter() - start))
+        solver.parameters.max_time_in_seconds = max(time_limit, 0.0)
+        solver.parameters.keep_symmetry_in_presolve = True
+        if self.options.num_search_workers is not None:
+            solver.parameters.num_search_workers = self.options.num_search_workers
+        self.cp_solver = solver
+        # stop() before cp_solver was set could not interrupt the search
+        if self.stop_requested or time_limit <= 0:
+            status = cp_model.UNKNOWN
+        else:
+            status = solver.Solve(model)
+        self.cp_solver = None
+        return solver, status
+
+    def search_time_limit(self, spent=0.0):
+        """
+        max_time_in_seconds less the seconds already spent and those complete_hints()
+        took, or None without a time limit.
+        """
+        if self.options.max_time_in_seconds is None:
+            return None
+        return max(self.options.max_time_in_seconds - spent - self.hint_time, 0.0)
+
+    def hint_statistics(self, solver):
+        """Hint counts from warm_start() plus how many hints the solution in solver agrees with."""
+        statistics = dict(self.hint_counts)
+        statistics["hints_kept"] = sum(1 for var, value in self.hints.items() if solver.BooleanValue(var) == value)
+        statistics["classes_kept"] = len(self.solution & self.hinted_classes)
+        return statistics
+
+    def fixed_model(self, assignments):
+        """A copy of the model with the (literal, value) assignments fixed."""
+        model = self.model.clone()
+        # Shrinking the variable domains is much cheaper than adding one constraint per variable
+        variables = model.Proto().variables
+        for var, value in assignments:
+            index = var.Index()
+            if index < 0:
+                # A negated literal (lab options are plain BoolVars, but stay safe)
+                index, value = -index - 1, not value
+            domain = variables[index].domain  # [0, 1] for a BoolVar
+            domain[0] = domain[1] = int(value)
+        return model
+
+    def pinned_model(self, pinned):
+        """A copy of the model with the pinned sections fixed to their previous values."""
+        if not pinned:
+            return self.model
+        return self.fixed_model(itertools.chain.from_iterable(self.pins[key] for key in pinned))
+
+    def solve_incremental(self, solver):
+        """Run the pin_stages in turn until one is not infeasible. Returns the CP-SAT status."""
+        wall_time = 0.0
+        time_limit = solver.parameters.max_time_in_seconds
+        seen = []
+        for name, pinned in self.pin_stages:
+            # A stage pinning the same sections as one that failed would fail again
+            if pinned in seen:
+                continue
+            seen.append(pinned)
+
+            solver.parameters.max_time_in_seconds = max(time_limit - wall_time, 0.0)
+            with self.profiler.span(f"search.{name.replace(' ', '_')}"):
+                model = self.pinned_model(pinned)
+                status = solver.Solve(model, ProgressCallback(self, f"incremental {name}"))
+            self.profiler.record_search(f"incremental {name}", solver, status, model)
+            wall_time += solver.WallTime()
+            self.log(f"Incremental stage '{name}': {len(self.pins) - len(pinned)} sections re-solved, "
+                     f"{solver.StatusName(status)}")
+            self.incremental_stage = name
+            if status != cp_model.INFEASIBLE or self.stop_requested or self.accepted:
+                break
+
+        self.incremental_wall_time = wall_time
+        return status
+
+    def stop(self):
+        """Ask a running solve() to stop searching. Safe to call from another thread."""
+        self.stop_requested = True
+        solver = self.cp_solver
+        if solver is not None:
+            solver.StopSearch()
+        if self.component_stop is not None:
+            self.component_stop.set()
+
+    def accept(self):
+        """
+        Ask a running solve() to finish with the best timetable found so far, or with the
+        first one if none was found yet. Safe to call from another thread. The decomposed
+        solve runs its components to the end.
+        """
+        self.accept_requested = True
+        solver = self.cp_solver
+        if solver is not None and self.solutions_found:
+            solver.StopSearch()
+
+    @property
+    def accepted(self):
+        """Whether accept() was called and there is a timetable to accept."""
+        return self.accept_requested and self.solutions_found > 0
+
+    def solution_summary(self, callback, search):
+        """
+        Progress report of the solution a ProgressCallback was just given:
+        - search: which search found it ("search", "incremental <stage>", "lns <neighbourhood>")
+        - solution: how many solutions solve() has found
+        - time: seconds since solve() started
+        - objective, best_bound, gap: of that search, when the model has an objective; gap is
+          relative to the objective
+        - class_hours, required_hours: class hours scheduled and required
+        - sections_complete, sections: sections with every class hour scheduled, and all sections
+        """
+        if self.section_indices is None:
+            self.section_indices = {(year, section): [] for year in self.years for section in self.sections[year]}
+            for key, var in self.schedule.items():
+                self.section_indices[key[:2]].append(var.Index())
+        values = callback.Response().solution
+
+        class_hours = 0
+        complete = 0
+        for (year, section), indices in self.section_indices.items():
+            scheduled = sum(values[index] for index in indices)
+            class_hours += scheduled
+            if scheduled >= sum(self.hours_per_subject.get((year, subject), 0)
+                                for subject in self.subjects.get(year, [])):
+                complete += 1
+
+        summary = {
+            "search": search,
+            "solution": self.solutions_found,
+            "time": time.perf_counter() - self.search_started,
+            "objective": None,
+            "best_bound": None,
+            "gap": None,
+            "class_hours": class_hours,
+            "required_hours": sum(self.hours_per_subject.get((year, subject), 0)
+                                  for year in self.years for section in self.sections[year]
+                                  for subject in self.subjects.get(year, [])),
+            "sections_complete": complete,
+            "sections": len(self.section_indices),
+        }
+        if self.model.HasObjective():
+            objective, bound = callback.ObjectiveValue(), callback.BestObjectiveBound()
+            summary.update(objective=objective, best_bound=bound,
+                           gap=abs(bound - objective) / max(1.0, abs(objective)))
+        return summary
+
+    def can_decompose(self):
+        """Whether solve() may split the model; joint, incremental and warm-started solves need all of it."""
+        return self.options.decompose and not (self.joint_labs or self.pin_stages or self.hints)
+
+    def independent_components(self):
+        """
+        Groups of years sharing no teacher, each a list of years in self.years order.
+
+        The sections of a year always stay together (constraint 10 synchronizes their
+        language classes), and constraint 2 ties together years with a common teacher.
+        The classroom cap (constraint 5) is the only other link, see room_shares.
+        """
+        parent = {year: year for year in self.years}
+
+        def find(year):
+            while parent[year] != year:
+                parent[year] = parent[parent[year]]
+                year = parent[year]
+            return year
+
+        first_year = {}
+        for (year, section, subject), teacher in self.teacher_assignments.items():
+            other = first_year.setdefault(teacher, year)
+            parent[find(year)] = find(other)
+
+        components = {}
+        for year in self.years:
+            components.setdefault(find(year), []).append(year)
+        return list(components.values())
+
+    def room_shares(self, components):
+        """
+        Classrooms given to each component, and whether that split restricts the solve.
+
+        With a classroom for every section the cap never binds and each component keeps
+        one room per section; otherwise the rooms are split in proportion to the sections.
+        """
+        sizes = [sum(len(self.sections[year]) for year in years) for years in components]
+        total = sum(sizes)
+        if total <= self.room_capacity:
+            return sizes, False
+
+        # Largest remainder split
+        quotas = [self.room_capacity * size / total for size in sizes]
+        shares = [int(quota) for quota in quotas]
+        by_remainder = sorted(range(len(sizes)), key=lambda i: quotas[i] - shares[i], reverse=True)
+        for i in by_remainder[:self.room_capacity - sum(shares)]:
+            shares[i] += 1
+        return shares, True
+
+    def component_inputs(self, years):
+        """Constructor arguments for a solver of only the given years."""
+        return {
+            "lab_schedule": [entry for entry in self.lab_schedule if entry['Year'] in years],
+            "years_sections": {year: self.sections[year] for year in years},
+            "num_subjects": self.num_subjects,
+            "lang": self.lang,
+            "num_classrooms": self.num_classrooms,
+            "subject_input": self.subject_input,
+            "hours_input": self.hours_input,
+            "teacher_name": self.teacher_name,
+            "optional_subject": self.optional_subject,
+            "optional_subject_hours": self.optional_subject_hours,
+            "optional_subject_teacher": self.optional_subject_teacher,
+            "rooms": self.rooms,
+        }
+
+    def solve_components(self):
+        """
+        Solve the independent components (see independent_components) in parallel processes.
+
+        Each process rebuilds and solves the model of its component's years; the
+        solutions are merged into one TimetableResult. When the classrooms had to be
+        split (see room_shares) and a component is infeasible with its share, returns
+        None and solve() falls back to the whole model. Also returns None when there is
+        only one component.
+        """
+        components = self.independent_components()
+        if len(components) < 2:
+            return None
+
+        shares, rooms_split = self.room_shares(components)
+        processes = min(len(components), self.options.component_workers or os.cpu_count() or 1)
+        options = self.options.to_dict()
+        options["decompose"] = False
+        if options["num_search_workers"] is None:
+            # Share the cores out instead of every search using all of them
+            options["num_search_workers"] = max(1, (os.cpu_count() or 1) // processes)
+        if options["max_time_in_seconds"] is not None and processes < len(components):
+            # Components wait for a free process, so share the time limit out too
+            options["max_time_in_seconds"] *= processes / len(components)
+
+        self.log(f"\nSolving {len(components)} independent components in {processes} processes.")
+        context = multiprocessing.get_context('spawn')
+        self.component_stop = context.Event()
+        if self.stop_requested:
+            self.component_stop.set()
+
+        start = time.perf_counter()
+        # And never run past the time limit, whatever the components took
+        deadline = None if self.options.max_time_in_seconds is None else time.time() + self.options.max_time_in_seconds
+        with self.profiler.span("search.components"), \
+                ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_component_worker,
+                                    initargs=(self.component_stop,)) as executor:
+            futures = [executor.submit(solve_component, self.component_inputs(years), options, share, deadline)
+                       for years, share in zip(components, shares)]
+            outcomes = [future.result() for future in futures]
+        self.component_stop = None
+        wall_time = time.perf_counter() - start
+
+        self.decomposition = {
+            "components": [],
+            "rooms_split": rooms_split,
+            "wall_time": wall_time,
+            "fallback": False,
+        }
+        for years, share, outcome in zip(components, shares, outcomes):
+            num_sections = sum(len(self.sections[year]) for year in years)
+            self.decomposition["components"].append({
+                "years": years,
+                "sections": num_sections,
+                "rooms": share,
+                "status": outcome["status"],
+                "wall_time": outcome["wall_time"],
+            })
+            self.log(f"  Years {', '.join(years)}: {num_sections} sections, {share} rooms, "
+                     f"{outcome['status']} ({outcome['wall_time']:.2f}s)")
+
+        statuses = {outcome["status"] for outcome in outcomes}
+        if statuses <= {"OPTIMAL", "FEASIBLE"}:
+            status = cp_model.OPTIMAL if statuses == {"OPTIMAL"} else cp_model.FEASIBLE
+        elif rooms_split and statuses & {"INFEASIBLE", "MODEL_INVALID"} and not self.stop_requested:
+            # Maybe only the classroom split is infeasible
+            self.log("A component is infeasible with its share of the classrooms; solving the whole model.")
+            self.decomposition["fallback"] = True
+            return None
+        elif "INFEASIBLE" in statuses:
+            status = cp_model.INFEASIBLE
+        elif "MODEL_INVALID" in statuses:
+            status = cp_model.MODEL_INVALID
+        else:
+            status = cp_model.UNKNOWN
+
+        self.status_name = status.name
+        self.wall_time = wall_time
+        self.log(f"\nSolver status: {self.status_name} ({self.wall_time:.2f}s)")
+
+        statistics = {
+            "status": self.status_name,
+            "wall_time": self.wall_time,
+            "num_conflicts": sum(outcome["num_conflicts"] for outcome in outcomes),
+            "num_branches": sum(outcome["num_branches"] for outcome in outcomes),
+            "decomposition": self.decomposition,
+        }
+
+        if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+            self.solution = {key for outcome in outcomes for key in outcome["solution"]}
+        else:
+            self.solution = None
+        return self.make_result(status, statistics)
+
+    def add_lns_objective(self):
+        """LNS mode: maximize the class hours scheduled, bounded by the weekly hours required."""
+        required = sum(self.hours_per_subject.get((year, subject), 0)
+                       for year in self.years
+                       for section in self.sections[year]
+                       for subject in self.subjects.get(year, []))
+        self.scheduled_hours = self.model.NewIntVar(0, required, 'scheduled_hours')
+        self.model.Add(self.scheduled_hours == sum(self.schedule.values()))
+        self.model.Maximize(self.scheduled_hours)
+        self.required_hours = required
+
+    def lns_neighbourhood(self, kind, rng, solution):
+        """
+        A (name, keys) neighbourhood of schedule keys to re-solve, around a section still
+        short of hours:
+        - 'year': every section of its year
+        - 'teacher': every section taught by one of its teachers
+        - 'day': one day of the week, for every section
+        """
+        short = [(year, section) for year in self.years for section in self.sections[year]
+                 if sum(1 for subject in self.subjects.get(year, []) for day in self.days for slot in self.time_slots
+                        if (year, section, subject, day, slot) in solution)
+                 < sum(self.hours_per_subject.get((year, subject), 0) for subject in self.subjects.get(year, []))]
+        year, section = rng.choice(short or [(year, section) for year in self.years for section in self.sections[year]])
+
+        if kind == 'year':
+            return f"year {year}", {key for key in self.schedule if key[0] == year}
+        if kind == 'teacher':
+            teachers = sorted({self.teacher_assignments[(year, section, subject)]
+                               for subject in self.subjects.get(year, [])
+                               if (year, section, subject) in self.teacher_assignments})
+            if teachers:
+                teacher = rng.choice(teachers)
+                sections = {(y, sec) for (y, sec, subject), name in self.teacher_assignments.items() if name == teacher}
+                return f"teacher {teacher}", {key for key in self.schedule if key[:2] in sections}
+        day = rng.choice(self.days)
+        return f"day {day}", {key for key in self.schedule if key[3] == day}
+
+    def solve_lns(self):
+        """
+        Large neighbourhood search within max_time_in_seconds, for institutions too big
+        to solve at once.
+
+        Constraint 1 is relaxed to at most the weekly hours and the model maximizes the
+        class hours scheduled; the hours still missing are the violations. The empty
+        timetable is always valid, and a short solve of the whole model starting from it
+        gives the first timetable. Then, in turn, a year, a teacher's sections or a day around a section
+        still missing hours is re-solved with every other class fixed, keeping the new
+        timetable if it schedules no fewer hours. Every solve is hinted with the whole
+        CP-SAT solution of the current timetable. The search ends when nothing is
+        missing, or when time runs out; without a time limit, also after a round of year,
+        teacher and day neighbourhoods that schedules no more hours, since the missing
+        hours may never fit. statistics["lns"] holds the trajectory.
+
+        Status is FEASIBLE once every hour is scheduled; otherwise UNKNOWN, with the
+        best partial timetable.
+        """
+        rng = random.Random(self.options.random_seed)
+        time_limit = self.search_time_limit()
+        start = time.perf_counter()
+        trajectory = []
+        counts = {"num_conflicts": 0, "num_branches": 0}
+        variables = self.model.Proto().variables
+        indices = {key: var.Index() for key, var in self.schedule.items()}
+
+        def run(name, fixed, solution, hint):
+            """
+            Solve with the fixed keys pinned to their value in solution, hinting hint (every
+            variable's value, or None). Returns the timetable and variable values found, or None.
+            """
+            remaining = None if time_limit is None else time_limit - (time.perf_counter() - start)
+            solver = cp_model.CpSolver()
+            self.options.apply(solver)
+            solver.parameters.max_time_in_seconds = (self.options.lns_neighbourhood_time if remaining is None
+                                                     else max(min(self.options.lns_neighbourhood_time, remaining), 0.0))
+            self.cp_solver = solver
+            if self.stop_requested or self.accepted:
+                solver.parameters.max_time_in_seconds = 0.0
+
+            for key in fixed:
+                domain = variables[indices[key]].domain
+                domain[0] = domain[1] = int(key in solution)
+            self.model.ClearHints()
+            if hint is not None:
+                # A complete hint, so CP-SAT starts from the current timetable right away
+                self.model.Proto().solution_hint.vars.extend(range(len(hint)))
+                self.model.Proto().solution_hint.values.extend(hint)
+            try:
+                status = solver.Solve(self.model, ProgressCallback(self, f"lns {name}"))
+                self.profiler.record_search(f"lns {name}", solver, status, self.model)
+            finally:
+                for key in fixed:
+                    domain = variables[indices[key]].domain
+                    domain[0], domain[1] = 0, 1
+            self.cp_solver = None
+
+            counts["num_conflicts"] += solver.NumConflicts()
+            counts["num_branches"] += solver.NumBranches()
+            found = None
+            if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+                found = ({key for key, var in self.schedule.items() if solver.Value(var)},
+                         list(solver.ResponseProto().solution))
+            scheduled = len(found[0] if found is not None else solution)
+            trajectory.append({
+                "iteration": len(trajectory),
+                "neighbourhood": name,
+                "status": solver.StatusName(status),
+                "time": time.perf_counter() - start,
+                "objective": scheduled,
+                "violations": self.required_hours - scheduled,
+                "accepted": found is not None and scheduled >= len(solution),
+            })
+            return found
+
+        laps = self.profiler.laps("search")
+        # The empty timetable, then whatever a short solve of the whole model improves it to
+        solution, hint = run("empty", self.schedule.keys(), set(), None)
+        found = run("initial", (), solution, hint)
+        if found is not None:
+            solution, hint = found
+        self.log(f"LNS initial timetable: {len(solution)} of {self.required_hours} class hours scheduled.")
+
+        kinds = ('year', 'teacher', 'day')
+        # Neighbourhoods run since the number of scheduled hours last went up
+        stalled = 0
+        while (len(solution) < self.required_hours and not (self.stop_requested or self.accepted)
+               and (time_limit is None or time.perf_counter() - start < time_limit)):
+            if time_limit is None and stalled >= len(kinds):
+                self.log("LNS: a round of neighbourhoods scheduled no more hours; stopping.")
+                break
+            name, free = self.lns_neighbourhood(kinds[len(trajectory) % len(kinds)], rng, solution)
+            found = run(name, self.schedule.keys() - free, solution, hint)
+            stalled += 1
+            if found is not None and len(found[0]) >= len(solution):
+                if len(found[0]) > len(solution):
+                    self.log(f"LNS {name}: {len(found[0])} of {self.required_hours} class hours scheduled.")
+                    stalled = 0
+                solution, hint = found
+        self.model.ClearHints()
+        laps.lap("lns")
+
+        missing = self.required_hours - len(solution)
+        status = cp_model.FEASIBLE if missing == 0 else cp_model.UNKNOWN
+        self.status_name = status.name
+        self.wall_time = time.perf_counter() - start
+        self.log(f"\nSolver status: {self.status_name} ({self.wall_time:.2f}s, {len(trajectory)} LNS iterations)")
+
+        statistics = {
+            "status": self.status_name,
+            "wall_time": self.wall_time,
+            **counts,
+            "lns": {
+                "iterations": len(trajectory),
+                "required_hours": self.required_hours,
+                "scheduled_hours": len(solution),
+                "missing_hours": missing,
+                "trajectory": trajectory,
+            },
+        }
+
+        # With hours missing, the result is the best partial timetable
+        self.solution = solution
+        if missing:
+            self.log(f"{missing} class hours could not be scheduled in time; returning the best partial timetable.")
+        return self.make_result(status, statistics)
+
+    def solve(self):
+        """Solve the model and return a TimetableResult."""
+        self.search_started = time.perf_counter()
+        if self.use_lns:
+            return self.solve_lns()
+        if self.can_decompose():
+            result = self.solve_components()
+            if result is not None:
+                return result
+
+        solver = cp_model.CpSolver()
+        self.options.apply(solver)
+        self.cp_solver = solver
+        # A failed decomposed solve counts against the time limit, as does completing the hints
+        time_limit = self.search_time_limit(
+            self.decomposition["wall_time"] if self.decomposition is not None else 0.0)
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        if self.hints:
+            # Presolve would otherwise break symmetries in ways that rule out the hinted timetable
+            solver.parameters.keep_symmetry_in_presolve = True
+            # Only the classes and labs are hinted when they break a constraint
+            solver.parameters.repair_hint = not self.hint_counts["complete"]
+        if self.stop_requested:
+            # Stopped before the search started; let CP-SAT return immediately
+            solver.parameters.max_time_in_seconds = 0.0
+        if self.pin_stages:
+            status = self.solve_incremental(solver)
         else:
-            print("\nNo feasible timetable found. Try adjusting constraints or requirements.")
-            sys.stdout = sys.__stdout__  # Reset to default
-            log_file.close()
-            return path
+            with self.profiler.span("search"):
+                status = solver.Solve(self.model, ProgressCallback(self, "search"))
+            self.profiler.record_search("search", solver, status, self.model)
+        self.cp_solver = None
+
+        self.status_name = solver.StatusName(status)
+        self.wall_time = self.incremental_wall_time if self.pin_stages else solver.WallTime()
+        self.log(f"\nSolver status: {self.status_name} ({self.wall_time:.2f}s)")
+
+        statistics = {
+            "status": self.status_name,
+            "wall_time": self.wall_time,
+            "num_conflicts": solver.NumConflicts(),
+            "num_branches": solver.NumBranches(),
+        }
+
+        if self.pin_stages:
+            statistics["incremental_stage"] = self.incremental_stage
+        if self.decomposition is not None:
+            statistics["decomposition"] = self.decomposition
 
+        if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+            # Keep only the scheduled (year, section, subject, day, slot) keys
+            self.solution = {key for key, var in self.schedule.items() if solver.Value(var)}
+            if self.hints:
+                statistics["warm_start"] = self.hint_statistics(solver)
+            if self.joint_labs:
+                self.apply_lab_solution(solver, statistics)
+        else:
+            self.solution = None
+        return self.make_result(status, statistics)
+
+    def make_result(self, status, statistics):
+        """The TimetableResult of a finished search, built from self.solution when one was found."""
+        proto = self.model.Proto()
+        statistics["model"] = {"variables": len(proto.variables), "constraints": len(proto.constraints)}
+        if self.accepted:
+            # Ended early by accept() with the best timetable found by then
+            statistics["accepted"] = True
+        if self.use_soft and self.solution is not None:
+            statistics["penalties"] = self.penalty_breakdown(self.solution)
+            self.log(f"Soft penalties: {statistics['penalties']['total']} ("
+                     + ", ".join(f"{name} {penalty['count']}" for name, penalty in statistics["penalties"].items()
+                                 if name != "total") + ")")
+
+        if self.solution is not None:
+            result = self.build_result(statistics)
+            if self.previous is not None:
+                result.diff = timetable_diff(self.previous, result)
+                self.log(f"{len(result.diff)} timetable cells changed.")
+        else:
+            if status == cp_model.UNKNOWN:
+                self.log("\nNo timetable found within the time limit. Try a longer max_time_in_seconds.")
+            else:
+                self.log("\nNo feasible timetable found. Try adjusting constraints or requirements.")
+            result = TimetableResult(self.status_name, self.wall_time, statistics=statistics)
+
+        result.output = self.report.getvalue()
+        if self.attach_profile:
+            result.profile = self.profiler.report()
+        return result
+
+    def apply_lab_solution(self, solver, statistics):
+        """Joint mode: turn the chosen lab sessions into lab_schedule and index it for the result."""
+        subjects_per_year = self.lab_demand.get("subjects_per_year", {})
+        chosen = [key for key, var in self.lab_sessions.items() if solver.Value(var)]
+        self.lab_schedule = generate_lab_timetable.schedule_from_sessions(chosen, subjects_per_year)
+        self.lab_index = self.build_lab_index()
+
+        unassigned = generate_lab_timetable.unassigned_lab_demand(
+            self.years_sections, self.lab_demand.get("labs_per_section", {}), subjects_per_year, self.lab_schedule)
+        statistics["unassigned_labs"] = unassigned
+        for section, demand in unassigned.items():
+            self.log(f"  - {demand['year']} - {section}: {demand['remaining']} labs unassigned ({demand['reason']})")
+
+    def is_scheduled(self, year, section, subject, day, slot):
+        """Whether the solution places this class in this slot."""
+        return (year, section, subject, day, slot) in self.solution
+
+    def build_result(self, statistics):
+        """Build the TimetableResult for the solution in self.solution."""
+        laps = self.profiler.laps("render")
+
+        # Per-section timetables
+        sections = {}
+        for year in self.years:
+            sections[year] = {}
+            for section in self.sections[year]:
+                grid = {}
+                for day in self.days:
+                    row = []
+                    lab_day = self.lab_index.get((year, section, day))
+                    for slot_idx, slot in enumerate(self.time_slots):
+                        # Check if there's a lab session
+                        if lab_day and lab_day['slot_sessions'][slot_idx]:
+                            lab = lab_day['slot_sessions'][slot_idx]
+                            row.append({"type": "lab", "subject": lab['subject'], "batch": lab['batch']})
+                        # Check if it's break time (12:00-13:00) on weekdays
+                        elif slot == self.break_slot and day in self.weekdays:
+                            row.append({"type": "break"})
+                        else:
+                            # Check if there's a class scheduled
+                            cell = None
+                            for subject in self.subjects.get(year, []):
+                                if self.is_scheduled(year, section, subject, day, slot):
+                                    teacher = self.teacher_assignments.get((year, section, subject), "")
+                                    cell = {"type": "class", "subject": subject, "teacher": teacher}
+                                    break
+                            row.append(cell)
+                    grid[day] = row
+
+                # Calculate total hours for this section for each day
+                daily_hours = {}
+                for day in self.days:
+                    lab_hours = self.count_lab_hours_in_day(year, section, day)
+                    class_hours = sum(
+                        1 for subject in self.subjects.get(year, [])
+                        for slot in self.time_slots
+                        if self.is_scheduled(year, section, subject, day, slot)
+                    )
+                    break_hours = 0
+                    if day in self.weekdays and not self.slot_overlaps_lab(year, section, day, self.break_slot):
+                        break_hours = 1
+
+                    daily_hours[day] = {
+                        "total": lab_hours + class_hours + break_hours,
+                        "lab": lab_hours,
+                        "class": class_hours,
+                        "break": break_hours,
+                    }
+
+                sections[year][section] = {"grid": grid, "daily_hours": daily_hours}
+        laps.lap("sections")
+
+        # Language subject synchronization summary
+        language_sync = {}
+        for year in self.lang_subject:
+            lang = self.lang_subject[year]
+
+            # Find all slots where language is scheduled
+            lang_slots = []
+            for day in self.days:
+                for slot in self.time_slots:
+                    sections_with_lang = [section for section in self.sections[year]
+                                          if self.is_scheduled(year, section, lang, day, slot)]
+                    if sections_with_lang:
+                        lang_slots.append({"day": day, "slot": slot, "sections": sections_with_lang})
+
+            language_sync[year] = {"subject": lang, "slots": lang_slots}
 
-    def generate_teacher_timetables(self, years, sections, subjects, schedule, teacher_assignments, time_slots, days, lab_schedule, solver):
+        # Teacher assignment summary, core subjects first
+        teacher_assignments = {}
+        for year in self.years:
+            teachers_used = set()
+            for (y, sec, subj), teacher in self.teacher_assignments.items():
+                if y == year:
+                    teachers_used.add(teacher)
+
+            teacher_assignments[year] = {
+                "required_teachers": self.required_teachers[year],
+                "core_subjects": self.subjects[year][:self.core_subjects_per_year[year]],
+                "additional_subjects": self.subjects[year][self.core_subjects_per_year[year]:],
+                "teachers_assigned": len(teachers_used),
+                "sections": {
+                    section: {subject: self.teacher_assignments.get((year, section, subject), "Not assigned")
+                              for subject in self.subjects[year]}
+                    for section in self.sections[year]
+                },
+            }
+
+        # Summary statistics
+        statistics = dict(statistics)
+        statistics["total_classes"] = len(self.solution)
+        statistics["total_lab_sessions"] = len(self.lab_schedule)
+        statistics["break_slots"] = sum(
+            1 for day in self.weekdays
+            for year in self.years
+            for section in self.sections[year]
+            if not self.slot_overlaps_lab(year, section, day, self.break_slot)
+        )
+
+        laps.lap("summaries")
+
+        # Generate individual teacher timetables
+        teachers = self.generate_teacher_timetables(
+            self.years,
+            self.sections,
+            self.subjects,
+            self.schedule,
+            self.teacher_assignments,
+            self.time_slots,
+            self.days,
+            self.lab_schedule,
+            self.solution
+        )
+        laps.lap("teacher_timetables")
+
+        return TimetableResult(
+            self.status_name,
+            self.wall_time,
+            time_slots=self.time_slots,
+            days=self.days,
+            sections=sections,
+            teachers=teachers,
+            language_sync=language_sync,
+            teacher_assignments=teacher_assignments,
+            statistics=statistics,
+            lab_schedule=self.lab_schedule,
+        )
+
+    def generate_teacher_timetables(self, years, sections, subjects, schedule, teacher_assignments, time_slots, days, lab_schedule, solution):
         """
         Generate individual timetables for each teacher based on their subject allocations.
 
@@ -803,26 +2131,30 @@ class IntegratedTimetableSolver:
         - time_slots: List of time slots
         - days: List of days
         - lab_schedule: List of lab scheduling information
-        - solver: CP solver instance with solution values
+        - solution: Set of scheduled (year, section, subject, day, slot) keys
 
         Returns:
         - Dictionary mapping teacher names to their individual timetables
         """
-        # First, identify all teachers in the system
+        # First, identify all teachers in the system and the classes each one teaches
         all_teachers = set()
+        teacher_classes = {}
+        for year in years:
+            for section in sections[year]:
+                for subject in subjects.get(year, []):
+                    teacher = teacher_assignments.get((year, section, subject))
+                    if teacher is not None:
+                        teacher_classes.setdefault(teacher, []).append((year, section, subject))
         for (year, section, subject), teacher in teacher_assignments.items():
             all_teachers.add(teacher)
+            teacher_classes.setdefault(teacher, [])
 
-        print(f"\n===== INDIVIDUAL TEACHER TIMETABLES =====")
-        print(f"Total teachers: {len(all_teachers)}")
+        timetables = {}
 
         # For each teacher, create a timetable
         for teacher in sorted(all_teachers):
-            print(f"\n\n== Timetable for Teacher: {teacher} ==")
-
             # Create timetable data structure (day × time)
-            table_data = []
-            headers = ["Day"] + time_slots
+            grid = {}
 
             # Track teacher's total teaching hours and lab supervision
             total_class_hours = 0
@@ -830,63 +2162,38 @@ class IntegratedTimetableSolver:
 
             # For each day, populate the timetable
             for day in days:
-                row = [day]
+                row = []
                 for slot in time_slots:
+                    slot_bit = 1 << self.time_slot_indices[slot]
                     # Check if the teacher has a class at this time
-                    class_entry = "--"
-                    for year in years:
-                        for section in sections[year]:
-                            for subject in subjects.get(year, []):
-                                if teacher_assignments.get((year, section, subject)) == teacher:
-                                    if solver.Value(schedule.get((year, section, subject, day, slot), 0)) == 1:
-                                        class_entry = f"{year}-{section} {subject}"
-                                        total_class_hours += 1
-
-                                    # Check if there's a lab for this subject supervised by this teacher
-                                    for lab in lab_schedule:
-                                        if (lab['Year'] == year and
-                                            lab['Section'] == section and
-                                            lab['Day'] == day and
-                                            lab['Subject'] == subject):
-
-                                            lab_time = lab['Time']
-                                            lab_start = int(lab_time.split(':')[0])
-                                            lab_end = int(lab_time.split(' - ')[1].split(':')[0])
-                                            slot_hour = int(slot.split(':')[0])
-
-                                            if lab_start <= slot_hour < lab_end:
-                                                class_entry = f"LAB {year}-{section} {subject}"
-                                                lab_key = (year, section, subject, day, lab_time)
-                                                lab_supervision.add(lab_key)
-
-                    row.append(class_entry)
-
-                table_data.append(row)
-
-            # Print the teacher's timetable
-            print(tabulate(table_data, headers=headers, tablefmt="grid"))
-
-            # Print summary statistics for this teacher
-            print(f"\nSummary for {teacher}:")
-            print(f"Total teaching hours per week: {total_class_hours}")
-            print(f"Total lab supervision sessions: {len(lab_supervision)}")
+                    cell = None
+                    for year, section, subject in teacher_classes[teacher]:
+                        if (year, section, subject, day, slot) in solution:
+                            cell = {"type": "class", "year": year, "section": section, "subject": subject}
+                            total_class_hours += 1
+
+                        # Check if there's a lab for this subject supervised by this teacher
+                        lab_day = self.lab_index.get((year, section, day))
+                        if lab_day and lab_day['mask'] & slot_bit:
+                            slot_hour = int(slot.split(':')[0])
+                            for lab in lab_day['sessions']:
+                                if lab['subject'] == subject and lab['start'] <= slot_hour < lab['end']:
+                                    cell = {"type": "lab", "year": year, "section": section, "subject": subject}
+                                    lab_key = (year, section, subject, day, lab['time'])
+                                    lab_supervision.add(lab_key)
+
+                    row.append(cell)
+
+                grid[day] = row
 
             # Calculate teaching load by day
             daily_load = {}
             for day in days:
-                day_hours = sum(
-                    solver.Value(schedule.get((year, section, subject, day, slot), 0))
-                    for year in years
-                    for section in sections[year]
-                    for subject in subjects.get(year, [])
+                daily_load[day] = sum(
+                    1 for year, section, subject in teacher_classes[teacher]
                     for slot in time_slots
-                    if teacher_assignments.get((year, section, subject)) == teacher
+                    if (year, section, subject, day, slot) in solution
                 )
-                daily_load[day] = day_hours
-
-            print("Daily teaching load:")
-            for day, hours in daily_load.items():
-                print(f"  {day}: {hours} hours")
 
             # List all subjects taught
             subjects_taught = set()
@@ -894,7 +2201,71 @@ class IntegratedTimetableSolver:
                 if assigned_teacher == teacher:
                     subjects_taught.add(f"{year} - {subject}")
 
-            print("Subjects taught:")
-            for subject in sorted(subjects_taught):
-                print(f"  {subject}")
-
+            timetables[teacher] = {
+                "grid": grid,
+                "weekly_hours": total_class_hours,
+                "lab_sessions": len(lab_supervision),
+                "daily_load": daily_load,
+                "subjects": sorted(subjects_taught),
+            }
+
+        return timetables
+
+
+# The stop event of the decomposed solve this process works for, see init_component_worker
+component_stop = None
+
+# How often a component process checks whether the solve was stopped
+STOP_POLL_INTERVAL = 0.2
+
+
+def init_component_worker(stop_event):
+    """Process pool initializer of IntegratedTimetableSolver.solve_components."""
+    global component_stop
+    component_stop = stop_event
+
+
+def solve_component(inputs, options, room_capacity, deadline=None):
+    """
+    Process pool task of IntegratedTimetableSolver.solve_components: build and solve
+    the model of one component, stopping at the time.time() deadline if given. Returns
+    the status, search statistics and the scheduled (year, section, subject, day, slot) keys.
+    """
+    solver = IntegratedTimetableSolver(**inputs, options=SolverOptions(**options))
+    solver.room_capacity = room_capacity
+    solver.create_variables()
+    solver.add_constraints()
+
+    cp_solver = cp_model.CpSolver()
+    solver.options.apply(cp_solver)
+    if deadline is not None:
+        cp_solver.parameters.max_time_in_seconds = max(
+            min(cp_solver.parameters.max_time_in_seconds, deadline - time.time()), 0.0)
+    if component_stop.is_set():
+        cp_solver.parameters.max_time_in_seconds = 0.0
+
+    finished = threading.Event()
+
+    def watch_for_stop():
+        while not finished.is_set():
+            if component_stop.wait(STOP_POLL_INTERVAL):
+                cp_solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch_for_stop, daemon=True)
+    watcher.start()
+    try:
+        status = cp_solver.Solve(solver.model)
+    finally:
+        finished.set()
+
+    solution = []
+    if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+        solution = [key for key, var in solver.schedule.items() if cp_solver.Value(var)]
+    return {
+        "status": cp_solver.StatusName(status),
+        "wall_time": cp_solver.WallTime(),
+        "num_conflicts": cp_solver.NumConflicts(),
+        "num_branches": cp_solver.NumBranches(),
+        "solution": solution,
+    }
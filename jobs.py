@@ -0,0 +1,414 @@
+"""
+Background jobs for /generate_timetable.
+
+Jobs are recorded in a local SQLite database and solved in a bounded process pool,
+so no external broker is needed. The worker process watches the job row and stops
+the CP-SAT search when a cancel is requested, or ends it with the best timetable so
+far when an accept is requested. Every solution the search finds is recorded as a
+job event (see JobStore.add_event), which /jobs/<id>/events streams to clients.
+
+Jobs a stopped service left queued or running are failed by a startup command,
+run once before the service's workers start (several workers share jobs.db, so
+none of them may do it on import):
+
+    python jobs.py fail-unfinished [jobs.db]
+"""
+import json
+import multiprocessing
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# How often a running worker checks whether its job was cancelled or accepted
+CANCEL_POLL_SECONDS = 0.5
+
+# Error of the jobs fail-unfinished marks as failed
+INTERRUPTED_ERROR = 'Interrupted by a service restart'
+
+
+class JobStore:
+    """SQLite-backed job table, shared by the web process and the worker processes."""
+
+    def __init__(self, path='jobs.db'):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    progress TEXT,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    accept_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            # Job tables created before accept existed
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(jobs)')]
+            if 'accept_requested' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN accept_requested INTEGER NOT NULL DEFAULT 0')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id)')
+
+    def _connect(self):
+        # A fresh connection per call keeps the store safe to use from any thread or process
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, payload):
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, status, progress, payload, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, QUEUED, 'waiting for a worker', json.dumps(payload), time.time()))
+        return job_id
+
+    def get(self, job_id):
+        """Return the job row as a dict, or None if there is no such job."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id, **fields):
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def finish(self, job_id, status, result=None, error=None):
+        self.update(job_id, status=status, progress=status,
+                    result=None if result is None else json.dumps(result),
+                    error=error, finished_at=time.time())
+
+    def request_cancel(self, job_id):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+
+    def cancel_requested(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def request_accept(self, job_id):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET accept_requested = 1 WHERE id = ?', (job_id,))
+
+    def requests(self, job_id):
+        """(cancel requested, accept requested) for the job."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT cancel_requested, accept_requested FROM jobs WHERE id = ?',
+                               (job_id,)).fetchone()
+        if row is None:
+            return False, False
+        return bool(row['cancel_requested']), bool(row['accept_requested'])
+
+    def add_event(self, job_id, event, data):
+        """Record a progress event of a job; data is any JSON-serializable object."""
+        with self._connect() as conn:
+            conn.execute('INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+                         (job_id, event, json.dumps(data), time.time()))
+
+    def events(self, job_id, after=0):
+        """The job's events with an id above after, oldest first, as {"id", "event", "data"} dicts."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT id, event, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id',
+                                (job_id, after)).fetchall()
+        return [{"id": row['id'], "event": row['event'], "data": json.loads(row['data'])} for row in rows]
+
+    def latest_done(self):
+        """The most recently finished job with a result, or None."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE status = ? ORDER BY finished_at DESC LIMIT 1',
+                               (DONE,)).fetchone()
+        return dict(row) if row else None
+
+    def fail_unfinished(self, error):
+        """
+        Mark every queued or running job as failed. Returns how many there were. Only
+        safe while no service process is running jobs from this store.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                'UPDATE jobs SET status = ?, progress = ?, error = ?, finished_at = ? WHERE status IN (?, ?)',
+                (FAILED, FAILED, error, time.time(), QUEUED, RUNNING)).rowcount
+
+
+def job_status(job):
+    """Public view of a job row, without the payload and result."""
+    started = job['started_at']
+    finished = job['finished_at']
+    elapsed = None
+    if started is not None:
+        elapsed = (finished or time.time()) - started
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "progress": job['progress'],
+        "error": job['error'],
+        "cancel_requested": bool(job['cancel_requested']),
+        "accept_requested": bool(job['accept_requested']),
+        "created_at": job['created_at'],
+        "started_at": started,
+        "finished_at": finished,
+        "elapsed": elapsed,
+    }
+
+
+def build_timetable_solver(data, progress=None):
+    """
+    Build an IntegratedTimetableSolver from a /generate_timetable payload. With
+    "debug": true the result carries the solver's profile (see solver_profile.py).
+    progress is passed on to the solver.
+    """
+    import generate_lab_timetable
+    from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+    from solver_profile import SolverProfiler
+
+    # With a lab_demand the labs are placed by the solver itself (joint mode)
+    lab_demand = data.get("lab_demand")
+    lab_summary = None
+    if lab_demand is None:
+        lab_summary = generate_lab_timetable.print_lab_timetable(data.get("lab_summary"))
+
+    return IntegratedTimetableSolver(
+        lab_summary,
+        data.get("years_sections"),
+        data.get("num_subjects"),
+        data.get("lang"),
+        data.get("num_classrooms"),
+        data.get("subject_input"),
+        data.get("hours_input"),
+        data.get("teacher_name"),
+        data.get("optional_subject"),
+        data.get("optional_subject_hours"),
+        data.get("optional_subject_teacher"),
+        data.get("rooms"),
+        lab_demand=lab_demand,
+        options=SolverOptions.from_dict(data.get("solver_options")),
+        profiler=SolverProfiler() if data.get("debug") else None,
+        progress=progress,
+    )
+
+
+def previous_result(store, spec):
+    """
+    The TimetableResult an incremental or warm_start payload starts from: an inline
+    "previous_result" dict, the result of the finished job "previous_job_id", or with
+    "latest": true the last finished job's result.
+    """
+    from timetable_result import TimetableResult
+
+    if spec.get("previous_result") is not None:
+        return TimetableResult.from_dict(spec["previous_result"])
+    if spec.get("latest"):
+        job = store.latest_done()
+        if job is None:
+            raise ValueError("no finished job to start from")
+    else:
+        job = store.get(spec.get("previous_job_id"))
+        if job is None or job['status'] != DONE:
+            raise ValueError(f"previous job {spec.get('previous_job_id')} has no result")
+    return TimetableResult.from_dict(json.loads(job['result']))
+
+
+def run_timetable_job(db_path, job_id):
+    """Worker process entry point: solve one job and store its result."""
+    store = JobStore(db_path)
+    if store.cancel_requested(job_id):
+        store.finish(job_id, CANCELLED)
+        return
+
+    store.update(job_id, status=RUNNING, progress='building model', started_at=time.time())
+    job = store.get(job_id)
+
+    try:
+        payload = json.loads(job['payload'])
+        solver = build_timetable_solver(payload, progress=lambda summary: store.add_event(job_id, 'solution', summary))
+        solver.create_variables()
+        solver.add_constraints()
+
+        # Stop the CP-SAT searches (those completing warm start hints too) as soon as a
+        # cancel shows up in the job table, or end the search with the best timetable so
+        # far on an accept
+        finished = threading.Event()
+
+        def watch_requests():
+            while not finished.wait(CANCEL_POLL_SECONDS):
+                cancel, accept = store.requests(job_id)
+                if cancel:
+                    solver.stop()
+                elif accept and not solver.accept_requested:
+                    solver.accept()
+
+        watcher = threading.Thread(target=watch_requests, daemon=True)
+        watcher.start()
+
+        try:
+            # Re-solve only around what changed since a previous timetable
+            incremental = payload.get("incremental")
+            if incremental:
+                solver.pin_previous(previous_result(store, incremental), incremental.get("changed"))
+            # Or just hint the search with a previous timetable
+            elif payload.get("warm_start"):
+                solver.warm_start(previous_result(store, payload["warm_start"]))
+
+            store.update(job_id, progress='solving')
+            result = solver.solve()
+        finally:
+            finished.set()
+            watcher.join()
+
+        if solver.stop_requested:
+            store.finish(job_id, CANCELLED)
+            return
+
+        store.finish(job_id, DONE, result=result.to_dict())
+    except Exception as error:
+        store.finish(job_id, FAILED, error=f"{type(error).__name__}: {error}")
+
+
+class JobQueue:
+    """
+    Bounded process pool that runs timetable jobs recorded in a JobStore.
+
+    With a result_cache (see result_cache.ResultCache), jobs submitted with a cache key
+    reuse a cached result, or share an identical job that is still queued or running,
+    and their results are cached when they finish. A shared job is only cancelled once
+    every submitter sharing it has asked to.
+
+    on_finish, if given, is called in this process as on_finish(job, result) for every
+    job a worker ran, once it is finished: the job row and, for a done job, its result
+    dict (None otherwise). Meant for metrics.
+    """
+
+    def __init__(self, store, max_workers=2, result_cache=None, on_finish=None):
+        self.store = store
+        self.max_workers = max_workers
+        self.result_cache = result_cache
+        self.on_finish = on_finish
+        self.executor = None
+        self.futures = {}
+        self.inflight = {}  # cache key -> id of the queued or running job solving it
+        self.job_keys = {}  # job id -> cache key
+        self.submitters = {}  # job id -> submitters sharing it that have not cancelled
+        self.lock = threading.Lock()
+
+    def _executor(self):
+        if self.executor is None:
+            # Spawned rather than forked, so workers don't inherit the web process's threads
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self.executor
+
+    def submit(self, payload, cache_key=None):
+        """
+        Queue a job and return its id. With a cache_key the job may instead be an
+        already finished one holding the cached result, or the identical job in flight.
+        """
+        if cache_key is not None and self.result_cache is not None:
+            with self.lock:
+                job_id = self.inflight.get(cache_key)
+                if job_id is not None:
+                    self.submitters[job_id] += 1
+            if job_id is not None:
+                return job_id
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                job_id = self.store.create(payload)
+                self.store.finish(job_id, DONE, result=cached)
+                return job_id
+
+        job_id = self.store.create(payload)
+        with self.lock:
+            future = self._executor().submit(run_timetable_job, self.store.path, job_id)
+            self.futures[job_id] = future
+            if cache_key is not None and self.result_cache is not None:
+                self.inflight[cache_key] = job_id
+                self.job_keys[job_id] = cache_key
+                self.submitters[job_id] = 1
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return job_id
+
+    def _on_done(self, job_id, future):
+        with self.lock:
+            self.futures.pop(job_id, None)
+            cache_key = self.job_keys.pop(job_id, None)
+            self.submitters.pop(job_id, None)
+            if cache_key is not None and self.inflight.get(cache_key) == job_id:
+                del self.inflight[cache_key]
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # The worker died before it could record the outcome itself
+            self.store.finish(job_id, FAILED, error=f"{type(error).__name__}: {error}")
+
+        if cache_key is None and self.on_finish is None:
+            return
+        job = self.store.get(job_id)
+        result = json.loads(job['result']) if job['status'] == DONE else None
+        # Only a finished search is worth repeating: a time-limited or accepted-early
+        # result may well improve on another try
+        if (cache_key is not None and result is not None and result['status'] == 'OPTIMAL'
+                and not result.get('statistics', {}).get('accepted')):
+            self.result_cache.put(cache_key, result)
+        if self.on_finish is not None:
+            self.on_finish(job, result)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Queued jobs are dropped, running jobs have their search stopped.
+
+        A job shared by identical submissions keeps running for the others: the cancel
+        only detaches one submitter, and returns False. Returns True once the job is
+        cancelled.
+        """
+        with self.lock:
+            if self.submitters.get(job_id, 1) > 1:
+                self.submitters[job_id] -= 1
+                return False
+            # New identical submissions get a job of their own
+            cache_key = self.job_keys.get(job_id)
+            if cache_key is not None and self.inflight.get(cache_key) == job_id:
+                del self.inflight[cache_key]
+            future = self.futures.get(job_id)
+        self.store.request_cancel(job_id)
+        if future is not None and future.cancel():
+            self.store.finish(job_id, CANCELLED)
+        return True
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3) or sys.argv[1] != 'fail-unfinished':
+        sys.exit("usage: python jobs.py fail-unfinished [jobs.db]")
+    failed = JobStore(sys.argv[2] if len(sys.argv) == 3 else 'jobs.db').fail_unfinished(INTERRUPTED_ERROR)
+    print(f"{failed} unfinished jobs marked as failed")
@@ -0,0 +1,75 @@
+"""
+Storage of generated lab timetables.
+
+lab_timetables.timetable holds the whole schedule as a native JSON column, and every
+session is also stored in lab_sessions, indexed by (year, section, day), so history
+can be filtered without decoding timetables.
+"""
+import ast
+import json
+
+CREATE_LAB_SESSIONS = '''
+create table if not exists lab_sessions (
+id int auto_increment primary key,
+timetable_id int not null,
+year varchar(64) not null,
+section varchar(64) not null,
+day varchar(16) not null,
+time varchar(32) not null,
+batch varchar(255) not null,
+subject varchar(255),
+index idx_lab_sessions_year_section_day (year, section, day),
+index idx_lab_sessions_timetable (timetable_id),
+foreign key (timetable_id) references lab_timetables (id) on delete cascade
+);
+'''
+
+INSERT_SESSION = '''
+INSERT INTO lab_sessions (timetable_id, year, section, day, time, batch, subject)
+VALUES (%s, %s, %s, %s, %s, %s, %s);
+'''
+
+
+def ensure_schema(cursor):
+    """Create lab_sessions if it is missing; lab_timetables itself predates this module."""
+    cursor.execute(CREATE_LAB_SESSIONS)
+
+
+def session_rows(timetable_id, schedule):
+    """lab_sessions rows for a lab schedule as returned by generate_lab_timetable.main."""
+    return [
+        (timetable_id, str(entry['Year']), str(entry['Section']), entry['Day'],
+         entry['Time'], entry['Batch'], entry.get('Subject'))
+        for entry in schedule
+    ]
+
+
+def save_timetable(cursor, schedule):
+    """Insert a timetable and its sessions with cursor; the caller commits. Returns the new id."""
+    cursor.execute("INSERT INTO lab_timetables (timetable) VALUES (%s);", (json.dumps(schedule),))
+    timetable_id = cursor.lastrowid
+    rows = session_rows(timetable_id, schedule)
+    if rows:
+        cursor.executemany(INSERT_SESSION, rows)
+    return timetable_id
+
+
+def load_timetable(value):
+    """
+    Decode a lab_timetables.timetable value; pymysql returns JSON columns as text.
+
+    Rows not yet converted by migrate_lab_timetables.py hold Python repr strings, which
+    are read the way the migration reads them. Raises ValueError if value is neither.
+    """
+    if isinstance(value, bytes):
+        value = value.decode()
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        raise ValueError("stored lab timetable is neither JSON nor a Python literal") from None
@@ -0,0 +1,214 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms live in a Registry and are rendered by
+Registry.render() for a scraper (see /metrics in app.py). Recording is cheap
+enough to leave on: a labelled series is looked up in a dict and updated under
+its own lock, so threads only contend when they touch the same series. Values
+that already exist elsewhere (pool and cache statistics) are read when the
+registry is rendered instead of being copied on every change; see
+Registry.collect.
+
+    requests = registry.counter("http_requests_total", "HTTP requests.", ("route", "code"))
+    requests.labels("/year", "200").inc()
+"""
+import bisect
+import math
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a fast cached response to a long CP-SAT search
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class CounterValue:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        if amount < 0:
+            raise ValueError("a counter can only go up")
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name, labelnames, labelvalues):
+        return [f"{name}{format_labels(labelnames, labelvalues)} {format_value(self.value)}"]
+
+
+class GaugeValue:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def samples(self, name, labelnames, labelvalues):
+        return [f"{name}{format_labels(labelnames, labelvalues)} {format_value(self.value)}"]
+
+
+class HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # per bucket, not cumulative; the last one is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name, labelnames, labelvalues):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            labels = format_labels((*labelnames, "le"), (*labelvalues, format_value(bound)))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = format_labels(labelnames, labelvalues)
+        lines.append(f"{name}_sum{labels} {format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Metric:
+    """
+    A metric family: one series per combination of label values. Get a series with
+    labels(*values); a metric without labels is used directly (metric.inc(), ...).
+    """
+
+    def __init__(self, kind, name, documentation, labelnames, make_value):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.make_value = make_value
+        self.series = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self.series[()] = make_value()
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        series = self.series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {', '.join(self.labelnames)}")
+            # Only creating a new series takes the family lock
+            with self.lock:
+                series = self.series.setdefault(values, self.make_value())
+        return series
+
+    def __getattr__(self, attribute):
+        # inc/set/observe of an unlabelled metric
+        if attribute in ("inc", "dec", "set", "observe") and not self.labelnames:
+            return getattr(self.series[()], attribute)
+        raise AttributeError(attribute)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.series.items())
+        for values, series in items:
+            lines.extend(series.samples(self.name, self.labelnames, values))
+        return lines
+
+
+class Collected:
+    """A metric family whose samples are read from collect() when the registry is rendered."""
+
+    def __init__(self, kind, name, documentation, labelnames, collect):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.collect():
+            if value is None:
+                continue
+            if not isinstance(values, tuple):
+                values = (values,)
+            lines.append(f"{self.name}{format_labels(self.labelnames, values)} {format_value(value)}")
+        return lines
+
+
+class Registry:
+    """The metrics of one process, in registration order."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Metric("counter", name, documentation, labelnames, CounterValue))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Metric("gauge", name, documentation, labelnames, GaugeValue))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        buckets = tuple(sorted(buckets))
+        return self._register(Metric("histogram", name, documentation, labelnames,
+                                     lambda: HistogramValue(buckets)))
+
+    def collect(self, kind, name, documentation, labelnames, collect):
+        """
+        Register a counter or gauge family read at render time: collect() returns
+        (label values, value) pairs, label values being a tuple or a single value.
+        Pairs with a value of None are left out.
+        """
+        if kind not in ("counter", "gauge"):
+            raise ValueError("kind must be counter or gauge")
+        return self._register(Collected(kind, name, documentation, labelnames, collect))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,107 @@
+"""
+One-time migration of lab_timetables from Python repr strings to a JSON column.
+
+- creates lab_sessions and fills it from every stored timetable
+- converts each repr string with ast.literal_eval into a new JSON column
+- swaps the JSON column in place of the old text column
+- indexes lab_timetables.created_date for history filtering
+
+Safe to re-run: it resumes from rows that have not been converted yet and does
+nothing once lab_timetables.timetable is already JSON.
+
+    python migrate_lab_timetables.py
+"""
+import ast
+import json
+
+import db_connection
+import lab_timetable_store
+
+BATCH_SIZE = 500
+
+
+def column_type(cursor, table, column):
+    cursor.execute('''
+        SELECT DATA_TYPE AS data_type FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s;
+    ''', (table, column))
+    row = cursor.fetchone()
+    return row['data_type'].lower() if row else None
+
+
+def ensure_created_date_index(cursor):
+    """Index for the created_date range filter of GET /generate_lab_timetable."""
+    cursor.execute('''
+        SELECT COUNT(*) AS count FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'lab_timetables'
+        AND INDEX_NAME = 'idx_lab_timetables_created_date';
+    ''')
+    if not cursor.fetchone()['count']:
+        cursor.execute("CREATE INDEX idx_lab_timetables_created_date ON lab_timetables (created_date);")
+
+
+def swap_json_column(cursor):
+    cursor.execute("ALTER TABLE lab_timetables CHANGE COLUMN timetable_json timetable JSON NOT NULL;")
+
+
+def main():
+    connection = db_connection.get_connection()
+    cursor = connection.cursor()
+
+    ensure_created_date_index(cursor)
+    connection.commit()
+
+    if column_type(cursor, 'lab_timetables', 'timetable') == 'json':
+        print("lab_timetables.timetable is already JSON, nothing to do.")
+        connection.close()
+        return
+
+    if column_type(cursor, 'lab_timetables', 'timetable') is None:
+        # A previous run dropped the old column but stopped before renaming the new one
+        swap_json_column(cursor)
+        connection.commit()
+        connection.close()
+        print("Finished renaming timetable_json to timetable.")
+        return
+
+    lab_timetable_store.ensure_schema(cursor)
+    if column_type(cursor, 'lab_timetables', 'timetable_json') is None:
+        cursor.execute("ALTER TABLE lab_timetables ADD COLUMN timetable_json JSON NULL;")
+    connection.commit()
+
+    converted = 0
+    last_id = 0
+    while True:
+        cursor.execute('''
+            SELECT id, timetable FROM lab_timetables
+            WHERE id > %s AND timetable_json IS NULL
+            ORDER BY id LIMIT %s;
+        ''', (last_id, BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        for row in rows:
+            schedule = ast.literal_eval(row['timetable']) if row['timetable'] else []
+            cursor.execute("DELETE FROM lab_sessions WHERE timetable_id = %s;", (row['id'],))
+            sessions = lab_timetable_store.session_rows(row['id'], schedule)
+            if sessions:
+                cursor.executemany(lab_timetable_store.INSERT_SESSION, sessions)
+            cursor.execute("UPDATE lab_timetables SET timetable_json = %s WHERE id = %s;",
+                           (json.dumps(schedule), row['id']))
+
+        # One transaction per batch, so an interrupted run resumes where it stopped
+        connection.commit()
+        converted += len(rows)
+        last_id = rows[-1]['id']
+        print(f"Converted {converted} timetables")
+
+    cursor.execute("ALTER TABLE lab_timetables DROP COLUMN timetable;")
+    swap_json_column(cursor)
+    connection.commit()
+    connection.close()
+    print(f"Done. {converted} timetables migrated to JSON.")
+
+
+if __name__ == '__main__':
+    main()
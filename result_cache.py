@@ -0,0 +1,175 @@
+"""
+Content-addressed cache of solve results.
+
+Results are keyed by a SHA-256 of the normalized request inputs, so resubmitting the
+same /generate_timetable or /generate_lab_timetable payload (a double click, a reload,
+two admins) returns the stored result instead of solving again. Two tiers:
+
+- memory: an LRU bounded by entry count and total size
+- disk: a SQLite table shared by every process, with a time to live
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Request fields that determine a timetable; anything else in the payload is ignored
+TIMETABLE_FIELDS = (
+    "years_sections", "num_subjects", "lang", "num_classrooms", "subject_input", "hours_input",
+    "teacher_name", "optional_subject", "optional_subject_hours", "optional_subject_teacher",
+    "rooms", "lab_summary", "lab_demand", "solver_options",
+)
+LAB_TIMETABLE_FIELDS = ("years_sections", "labs_per_sections", "subjects_per_year", "mode", "lab_resources")
+
+
+def cache_key(kind, inputs):
+    """SHA-256 of kind and the canonical JSON of inputs (sorted keys, no whitespace)."""
+    canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(f"{kind}\n{canonical}".encode('utf-8')).hexdigest()
+
+
+def timetable_key(data):
+    """
+    Cache key of a /generate_timetable payload, or None if its result must not be reused:
+    incremental and warm-started solves depend on a previous result, not just the inputs,
+    and a debug solve is run for its profile.
+    """
+    from integrate_timetable_solver import SolverOptions
+    import generate_lab_timetable
+
+    if data.get("incremental") or data.get("warm_start") or data.get("debug"):
+        return None
+    inputs = {field: data.get(field) for field in TIMETABLE_FIELDS}
+    # Defaults spelled out or left out give the same key
+    inputs["solver_options"] = SolverOptions.from_dict(data.get("solver_options")).to_dict()
+    lab_demand = data.get("lab_demand")
+    if lab_demand is not None:
+        inputs["lab_demand"] = dict(lab_demand, lab_resources=generate_lab_timetable.LabResources.from_dict(
+            lab_demand.get("lab_resources")).to_dict())
+        inputs["lab_summary"] = None
+    return cache_key("timetable", inputs)
+
+
+def lab_timetable_key(data):
+    """Cache key of a /generate_lab_timetable payload."""
+    import generate_lab_timetable
+
+    inputs = {field: data.get(field) for field in LAB_TIMETABLE_FIELDS}
+    inputs["mode"] = data.get("mode", "greedy")
+    inputs["lab_resources"] = generate_lab_timetable.LabResources.from_dict(data.get("lab_resources")).to_dict()
+    return cache_key("lab_timetable", inputs)
+
+
+class ResultCache:
+    """
+    Two-tier result cache: an in-process LRU in front of a SQLite table.
+
+    - path: SQLite file for the disk tier, None for memory only
+    - max_entries, max_bytes: bounds of the memory tier (sizes are the JSON lengths)
+    - ttl: seconds a disk entry stays valid; memory entries expire with it
+
+    Values are any JSON-serializable object. get() and put() are thread-safe, and the
+    disk tier is safe to share between processes.
+    """
+
+    def __init__(self, path='result_cache.db', max_entries=256, max_bytes=64 * 1024 * 1024, ttl=24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.entries = OrderedDict()  # key -> (value, size, stored_at), least recently used first
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        if self.path:
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS results (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        stored_at REAL NOT NULL
+                    )
+                ''')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        """The cached value for key, or None."""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, size, stored_at = entry
+                if now - stored_at <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.counts["memory_hits"] += 1
+                    return value
+                self._drop(key)
+                self.counts["expired"] += 1
+
+        row = None
+        if self.path:
+            with self._connect() as conn:
+                row = conn.execute('SELECT value, stored_at FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                    with self.lock:
+                        self.counts["expired"] += 1
+                    row = None
+
+        with self.lock:
+            if row is None:
+                self.counts["misses"] += 1
+                return None
+            self.counts["disk_hits"] += 1
+            value = json.loads(row[0])
+            self._remember(key, value, len(row[0]), row[1])
+            return value
+
+    def put(self, key, value):
+        encoded = json.dumps(value)
+        stored_at = time.time()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute('INSERT OR REPLACE INTO results (key, value, stored_at) VALUES (?, ?, ?)',
+                             (key, encoded, stored_at))
+        with self.lock:
+            self._remember(key, value, len(encoded), stored_at)
+
+    def purge_expired(self):
+        """Delete expired disk entries. Returns how many were removed."""
+        if not self.path:
+            return 0
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM results WHERE stored_at < ?', (time.time() - self.ttl,)).rowcount
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+            counts["memory_entries"] = len(self.entries)
+            counts["memory_bytes"] = self.size
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        counts["hit_rate"] = (counts["memory_hits"] + counts["disk_hits"]) / lookups if lookups else None
+        return counts
+
+    def _remember(self, key, value, size, stored_at):
+        # Called with the lock held
+        if key in self.entries:
+            self._drop(key)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size, stored_at)
+        self.size += size
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+            self.counts["evictions"] += 1
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.size -= size
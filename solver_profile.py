@@ -0,0 +1,113 @@
+"""
+Timing and model-size instrumentation of IntegratedTimetableSolver.
+
+The solver records a span for every phase it goes through: the parts of __init__,
+create_variables, each numbered constraint family of add_constraints, the CP-SAT
+search and the rendering of the result. A span holds its time and the variables
+and constraints it added to the model. CP-SAT searches are recorded with their
+response statistics.
+
+Pass a SolverProfiler to the solver to get the report in result.profile, and give
+the profiler listeners (ProfileListener subclasses) to receive every span and
+search as it happens, e.g. to feed a metrics system.
+"""
+import contextlib
+import time
+
+
+class ProfileListener:
+    """Receives a SolverProfiler's spans and searches as they are recorded. Override what you need."""
+
+    def on_span(self, span):
+        """A phase finished; span is {"name", "seconds", "variables", "constraints"}."""
+
+    def on_search(self, search):
+        """A CP-SAT search finished; search is a SolverProfiler.record_search dict."""
+
+
+class Laps:
+    """
+    Consecutive spans of one phase: each lap(name) records "<phase>.<name>" with the
+    time and model growth since the previous lap (or since the Laps was created).
+    """
+
+    def __init__(self, profiler, phase, model=None):
+        self.profiler = profiler
+        self.phase = phase
+        self.model = model
+        self._reset()
+
+    def _reset(self):
+        self.started = time.perf_counter()
+        self.variables, self.constraints = self._model_size()
+
+    def _model_size(self):
+        if self.model is None:
+            return 0, 0
+        proto = self.model.Proto()
+        return len(proto.variables), len(proto.constraints)
+
+    def lap(self, name):
+        seconds = time.perf_counter() - self.started
+        variables, constraints = self._model_size()
+        self.profiler.record(f"{self.phase}.{name}" if name else self.phase, seconds,
+                             variables - self.variables, constraints - self.constraints)
+        self._reset()
+
+
+class SolverProfiler:
+    """
+    Collects the spans and CP-SAT searches of one solver run.
+
+    - listeners: ProfileListener instances told about every span and search
+    """
+
+    def __init__(self, listeners=None):
+        self.listeners = list(listeners or [])
+        self.spans = []
+        self.searches = []
+
+    def record(self, name, seconds, variables=0, constraints=0):
+        span = {"name": name, "seconds": seconds, "variables": variables, "constraints": constraints}
+        self.spans.append(span)
+        for listener in self.listeners:
+            listener.on_span(span)
+        return span
+
+    def laps(self, phase, model=None):
+        return Laps(self, phase, model)
+
+    @contextlib.contextmanager
+    def span(self, name, model=None):
+        """Record the block as one span."""
+        laps = Laps(self, name, model)
+        yield
+        laps.lap(None)
+
+    def record_search(self, name, solver, status, model):
+        """Record the response statistics of a cp_model.CpSolver search of model that ended with status."""
+        search = {
+            "name": name,
+            "status": solver.StatusName(status),
+            "wall_time": solver.WallTime(),
+            "user_time": solver.UserTime(),
+            "deterministic_time": solver.ResponseProto().deterministic_time,
+            "num_conflicts": solver.NumConflicts(),
+            "num_branches": solver.NumBranches(),
+            "num_booleans": solver.NumBooleans(),
+        }
+        if model.HasObjective():
+            search["objective"] = solver.ObjectiveValue()
+            search["best_bound"] = solver.BestObjectiveBound()
+        self.searches.append(search)
+        for listener in self.listeners:
+            listener.on_search(search)
+        return search
+
+    def report(self):
+        """The spans and searches, plus the total time of each phase (the span names up to the first '.')."""
+        phases = {}
+        for span in self.spans:
+            phase = span["name"].split(".")[0]
+            phases[phase] = phases.get(phase, 0.0) + span["seconds"]
+        return {"phases": phases, "spans": list(self.spans), "searches": list(self.searches)}
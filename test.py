@@ -1,4 +1,5 @@
 from integrate_timetable_solver import IntegratedTimetableSolver
+from timetable_result import format_text
 import generate_lab_timetable
 
 #inputs
@@ -242,4 +243,6 @@ rooms=["1a", "1b"]
 
 solver.create_variables()
 solver.add_constraints()
-solver.solve()
\ No newline at end of file
+result = solver.solve()
+print(result.output, end="")
+print(format_text(result), end="")
\ No newline at end of file
@@ -0,0 +1,24 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    # app opens jobs.db and result_cache.db in the working directory on import
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        yield importlib.import_module("app")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
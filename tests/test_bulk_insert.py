@@ -0,0 +1,83 @@
+import pytest
+
+
+@pytest.fixture
+def inserted(app_module, monkeypatch):
+    """The (query, rows) of every insert_many call, which succeed without a database."""
+    calls = []
+
+    def insert_many(query, rows):
+        calls.append((query, rows))
+        return True
+
+    monkeypatch.setattr(app_module, "insert_many", insert_many)
+    return calls
+
+
+def test_valid_rows_are_inserted_together(client, inserted):
+    response = client.post("/section/bulk", json=[
+        {"year_id": 1, "section_name": "A"},
+        {"year_id": 2, "section_name": "B", "ignored": True},
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["received"], body["inserted"], body["errors"]) == (2, 2, [])
+    assert inserted == [("INSERT INTO Sections (year_id, section_name) VALUES (%s, %s);", [(1, "A"), (2, "B")])]
+
+
+def test_invalid_rows_are_reported_by_index_and_skipped(client, inserted):
+    response = client.post("/subject/bulk", json=[
+        {"year_id": 1, "subject_name": "Physics", "is_lab": True},
+        {"year_id": 0, "subject_name": "Maths", "is_lab": 0},
+        "not a row",
+        {"year_id": 1, "subject_name": " ", "is_lab": 2},
+        {"year_id": True, "subject_name": "Biology"},
+        {"year_id": 2, "subject_name": "Chemistry", "is_lab": 1},
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["received"], body["inserted"]) == (6, 2)
+    assert body["errors"] == [
+        {"index": 1, "error": "Invalid or missing: year_id"},
+        {"index": 2, "error": "Row must be an object"},
+        {"index": 3, "error": "Invalid or missing: subject_name, is_lab"},
+        {"index": 4, "error": "Invalid or missing: year_id, is_lab"},
+    ]
+    assert inserted[0][1] == [(1, "Physics", True), (2, "Chemistry", 1)]
+
+
+def test_nothing_valid_inserts_nothing(client, inserted):
+    response = client.post("/labs-per-section/bulk", json=[{"section_id": 1, "num_labs": -1}])
+
+    assert response.status_code == 200
+    assert response.get_json()["inserted"] == 0
+    assert inserted == []
+
+
+@pytest.mark.parametrize("is_lab", [1.0, 0.0, "1", None])
+def test_is_lab_must_be_a_bool_or_0_or_1(client, inserted, is_lab):
+    response = client.post("/subject/bulk", json=[{"year_id": 1, "subject_name": "Physics", "is_lab": is_lab}])
+
+    assert response.get_json()["errors"] == [{"index": 0, "error": "Invalid or missing: is_lab"}]
+    assert inserted == []
+
+
+@pytest.mark.parametrize("body", [{"name": "2024"}, "2024", None])
+def test_body_must_be_an_array(client, inserted, body):
+    response = client.post("/year/bulk", json=body)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Expected a JSON array of rows"}
+    assert inserted == []
+
+
+def test_database_error_inserts_nothing(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "insert_many", lambda query, rows: RuntimeError("table is locked"))
+    response = client.post("/year/bulk", json=[{"name": "2024"}, {"name": ""}])
+
+    assert response.status_code == 500
+    body = response.get_json()
+    assert (body["error"], body["inserted"]) == ("table is locked", 0)
+    assert body["errors"] == [{"index": 1, "error": "Invalid or missing: name"}]
@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+
+import db_connection
+from db_connection import ConnectionPool, PoolTimeout
+
+
+class Clock:
+    """Stands in for time.monotonic so idle times can be stepped through."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db_connection.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def make_pool(tmp_path):
+    opened = []
+
+    def connect():
+        connection = sqlite3.connect(tmp_path / "test.db", check_same_thread=False)
+        opened.append(connection)
+        return connection
+
+    def make_pool(**settings):
+        pool = ConnectionPool(connect, **settings)
+        pool.opened = opened
+        return pool
+
+    return make_pool
+
+
+def is_closed(connection):
+    try:
+        connection.execute("SELECT 1")
+        return False
+    except sqlite3.ProgrammingError:
+        return True
+
+
+def test_reuses_the_most_recently_released_connection(make_pool, clock):
+    pool = make_pool()
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    clock.now += 1
+    pool.release(second)
+
+    assert pool.acquire() is second
+    assert pool.acquire() is first
+    assert len(pool.opened) == 2
+    assert pool.stats() == {"size": 2, "idle": 0, "in_use": 2, "max_size": 10}
+
+
+def test_closes_connections_idle_longer_than_max_idle(make_pool, clock):
+    pool = make_pool(max_idle=60, ping_after=30)
+    old, recent = pool.acquire(), pool.acquire()
+    pool.release(old)
+    clock.now += 50
+    pool.release(recent)
+    clock.now += 20
+
+    # old has been idle for 70s: reuse skips it, and it is closed and no longer counted
+    assert pool.acquire() is recent
+    third = pool.acquire()
+    assert third is not old and third not in pool.opened[:2]
+    assert is_closed(old)
+    assert pool.stats()["size"] == 2
+
+
+def test_release_closes_expired_idle_connections(make_pool, clock):
+    pool = make_pool(max_idle=60)
+    old, other = pool.acquire(), pool.acquire()
+    pool.release(old)
+    clock.now += 61
+    pool.release(other)
+
+    assert is_closed(old)
+    assert pool.stats() == {"size": 1, "idle": 1, "in_use": 0, "max_size": 10}
+
+
+def test_pings_connections_idle_longer_than_ping_after(make_pool, clock):
+    pool = make_pool(max_idle=300, ping_after=30)
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.close()  # e.g. dropped by the server
+
+    # Recently released connections are handed out without a check
+    clock.now += 10
+    assert pool.acquire() is connection
+    pool.release(connection)
+
+    # After ping_after the broken connection is found and replaced
+    clock.now += 31
+    replacement = pool.acquire()
+    assert replacement is not connection
+    assert replacement.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()["size"] == 1
+
+
+def test_checkout_timeout_when_every_connection_is_in_use(make_pool):
+    pool = make_pool(max_size=2, checkout_timeout=0.05)
+    first, _ = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    # A released connection is handed to the next caller
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_discarded_connections_free_their_place(make_pool):
+    pool = make_pool(max_size=1, checkout_timeout=0.05)
+    connection = pool.acquire()
+    pool.release(connection, discard=True)
+
+    assert is_closed(connection)
+    assert pool.acquire() is not connection
+    assert pool.stats()["size"] == 1
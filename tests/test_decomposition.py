@@ -0,0 +1,54 @@
+from ortools.sat.python import cp_model
+
+from benchmarks.bench_gap_encoding import synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+
+def two_year_instance(sections_per_year=3, own_staff=True):
+    """synthetic_instance split over two years, each with its own teachers when own_staff."""
+    instance = synthetic_instance(2 * sections_per_year)
+    years = {f"S{i}": str(i // sections_per_year + 1) for i in range(2 * sections_per_year)}
+    instance["years_sections"] = {"1": [], "2": []}
+    for section, year in years.items():
+        instance["years_sections"][year].append(section)
+    for entry in instance["lab_schedule"]:
+        entry["Year"] = years[entry["Section"]]
+    if own_staff:
+        instance["teacher_name"] = {year: [f"{name}-{year}" for name in instance["teacher_name"]]
+                                    for year in ("1", "2")}
+    return instance
+
+
+def build(instance, **options):
+    solver = IntegratedTimetableSolver(options=SolverOptions(num_search_workers=1, random_seed=1, **options),
+                                       **instance)
+    solver.create_variables()
+    solver.add_constraints()
+    return solver
+
+
+def test_years_sharing_teachers_are_one_component():
+    assert build(two_year_instance(own_staff=False)).independent_components() == [["1", "2"]]
+    assert build(two_year_instance()).independent_components() == [["1"], ["2"]]
+
+
+def test_decomposed_timetable_satisfies_the_whole_model():
+    instance = two_year_instance()
+    result = build(instance, decompose=True, component_workers=2).solve()
+
+    assert result.status == "OPTIMAL"
+    decomposition = result.statistics["decomposition"]
+    assert [component["years"] for component in decomposition["components"]] == [["1"], ["2"]]
+    assert not decomposition["fallback"]
+
+    whole = build(instance)
+    classes = result.class_keys()
+    assert classes <= whole.schedule.keys()
+    model = whole.fixed_model((var, key in classes) for key, var in whole.schedule.items())
+    assert cp_model.CpSolver().Solve(model) == cp_model.OPTIMAL
+
+
+def test_decomposition_is_opt_in():
+    solver = build(two_year_instance())
+    assert not solver.can_decompose()
+    assert "decomposition" not in solver.solve().statistics
@@ -0,0 +1,53 @@
+import itertools
+
+import pytest
+from ortools.sat.python import cp_model
+
+from benchmarks.bench_gap_encoding import synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+
+def day_is_allowed(encoding, pattern):
+    """Whether the gap constraints of encoding accept a day whose slots are used as in pattern."""
+    solver = IntegratedTimetableSolver(options=SolverOptions(gap_encoding=encoding), **synthetic_instance(1))
+    model = solver.model
+    slots = [f"slot{k}" for k in range(len(pattern))]
+    slot_used = {("Monday", slot): model.NewConstant(used) for slot, used in zip(slots, pattern)}
+    add_gap_constraints = getattr(solver, f"add_gap_constraints_{encoding}")
+    add_gap_constraints("1", "S0", "Monday", slots, slot_used)
+    return cp_model.CpSolver().Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+
+def test_encodings_accept_the_same_days():
+    for num_slots in range(2, 8):
+        for pattern in itertools.product((0, 1), repeat=num_slots):
+            assert day_is_allowed("linear", pattern) == day_is_allowed("pairwise", pattern), pattern
+
+
+def test_linear_encoding_allows_one_gap():
+    assert day_is_allowed("linear", (1, 0, 1, 1, 0, 0))
+    assert not day_is_allowed("linear", (1, 0, 1, 0, 1))
+    assert day_is_allowed("linear", (0, 0, 0, 0))
+
+
+def build(encoding, num_sections):
+    options = SolverOptions(gap_encoding=encoding, num_search_workers=1, random_seed=1)
+    solver = IntegratedTimetableSolver(options=options, **synthetic_instance(num_sections))
+    solver.create_variables()
+    solver.add_constraints()
+    return solver
+
+
+@pytest.mark.parametrize("num_sections", [3, 6])
+def test_encodings_accept_each_others_timetables(num_sections):
+    results = {encoding: build(encoding, num_sections).solve() for encoding in SolverOptions.GAP_ENCODINGS}
+    assert results["linear"].status == results["pairwise"].status == "OPTIMAL"
+    # The linear model is the smaller one
+    assert (results["linear"].statistics["model"]["variables"]
+            < results["pairwise"].statistics["model"]["variables"])
+
+    for encoding, other in (("linear", "pairwise"), ("pairwise", "linear")):
+        solver = build(encoding, num_sections)
+        classes = results[other].class_keys()
+        model = solver.fixed_model((var, key in classes) for key, var in solver.schedule.items())
+        assert cp_model.CpSolver().Solve(model) == cp_model.OPTIMAL, (encoding, other)
@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.fixture
+def submitted(app_module, monkeypatch):
+    """The payloads /generate_timetable queues, with the job queue's store but no workers."""
+    payloads = []
+
+    def submit(payload, cache_key=None):
+        payloads.append(payload)
+        return app_module.job_queue.store.create(payload)
+
+    monkeypatch.setattr(app_module.job_queue, "submit", submit)
+    return payloads
+
+
+def test_jobs_get_the_service_time_limit(app_module, client, submitted):
+    response = client.post("/generate_timetable", json={"years_sections": {}, "solver_options": {"random_seed": 3}})
+
+    assert response.status_code == 202
+    assert response.get_json()["max_time_in_seconds"] == app_module.TIMETABLE_TIME_LIMIT
+    assert submitted[0]["solver_options"] == {"random_seed": 3, "max_time_in_seconds": app_module.TIMETABLE_TIME_LIMIT}
+
+    client.post("/generate_timetable", json={"years_sections": {}})
+    assert submitted[1]["solver_options"] == {"max_time_in_seconds": app_module.TIMETABLE_TIME_LIMIT}
+
+
+@pytest.mark.parametrize("limit", [30, None])
+def test_requested_time_limit_is_kept(client, submitted, limit):
+    response = client.post("/generate_timetable", json={"solver_options": {"max_time_in_seconds": limit}})
+
+    assert response.get_json()["max_time_in_seconds"] == limit
+    assert submitted[0]["solver_options"]["max_time_in_seconds"] == limit
+
+
+def test_invalid_time_limit_is_rejected(client, submitted):
+    response = client.post("/generate_timetable", json={"solver_options": {"max_time_in_seconds": 0}})
+
+    assert response.status_code == 400
+    assert submitted == []
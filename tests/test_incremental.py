@@ -0,0 +1,69 @@
+import copy
+
+from benchmarks.bench_gap_encoding import LAB_TIMES, synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+NUM_SECTIONS = 8
+
+
+def build(instance):
+    solver = IntegratedTimetableSolver(options=SolverOptions(num_search_workers=1, random_seed=1), **instance)
+    solver.create_variables()
+    solver.add_constraints()
+    return solver
+
+
+def moved_lab(instance, previous, section):
+    """instance with the lab of section moved over one of its classes in previous."""
+    lab = next(entry for entry in instance["lab_schedule"] if entry["Section"] == section)
+    day, slot = next((day, slot) for year, name, subject, day, slot in sorted(previous.class_keys())
+                     if name == section and day != lab["Day"])
+    hour = int(slot.split(":")[0])
+    changed = copy.deepcopy(instance)
+    moved = next(entry for entry in changed["lab_schedule"] if entry["Section"] == section)
+    moved.update(Day=day, Time=next(lab_time for lab_time in LAB_TIMES
+                                    if int(lab_time.split(":")[0]) <= hour < int(lab_time.split(" - ")[1].split(":")[0])))
+    return changed
+
+
+def other_classes(result, section):
+    return {key for key in result.class_keys() if key[1] != section}
+
+
+def test_unchanged_input_keeps_the_timetable():
+    instance = synthetic_instance(NUM_SECTIONS)
+    previous = build(instance).solve()
+    solver = build(instance)
+    solver.pin_previous(previous)
+    result = solver.solve()
+
+    assert result.statistics["incremental_stage"] == "changed sections"
+    assert result.class_keys() == previous.class_keys()
+    assert result.diff == []
+
+
+def test_moved_lab_only_changes_its_section():
+    instance = synthetic_instance(NUM_SECTIONS)
+    previous = build(instance).solve()
+    solver = build(moved_lab(instance, previous, "S5"))
+    solver.pin_previous(previous)
+    result = solver.solve()
+
+    assert result.feasible
+    assert result.statistics["incremental_stage"] == "changed sections"
+    assert other_classes(result, "S5") == other_classes(previous, "S5")
+    assert result.diff and {change["section"] for change in result.diff} == {"S5"}
+
+
+def test_named_teacher_frees_their_sections():
+    instance = synthetic_instance(NUM_SECTIONS)
+    previous = build(instance).solve()
+    solver = build(instance)
+    teacher = solver.teacher_assignments[("1", "S0", instance["subject_input"][0])]
+    solver.pin_previous(previous, {"teachers": [teacher]})
+
+    freed = {key for key in solver.pins if key not in solver.pin_stages[0][1]}
+    assert ("1", "S0") in freed
+    assert freed == {(year, section) for (year, section, subject), name in solver.teacher_assignments.items()
+                     if name == teacher}
+    assert solver.solve().feasible
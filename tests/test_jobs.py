@@ -0,0 +1,151 @@
+from concurrent.futures import Future
+
+import pytest
+
+import jobs
+from benchmarks.bench_gap_encoding import synthetic_instance
+from jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue, JobStore
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def timetable_payload(num_sections=2):
+    """A /generate_timetable payload for a small synthetic institution."""
+    payload = synthetic_instance(num_sections)
+    payload["lab_summary"] = payload.pop("lab_schedule")
+    return payload
+
+
+def test_job_lifecycle(store):
+    job_id = store.create({"years_sections": {}})
+    job = store.get(job_id)
+    assert (job["status"], job["progress"]) == (QUEUED, "waiting for a worker")
+    assert jobs.job_status(job)["elapsed"] is None
+
+    store.update(job_id, status=RUNNING, progress="solving", started_at=job["created_at"])
+    assert store.get(job_id)["status"] == RUNNING
+    assert store.latest_done() is None
+
+    store.finish(job_id, DONE, result={"status": "OPTIMAL"})
+    job = store.get(job_id)
+    assert (job["status"], job["progress"], job["error"]) == (DONE, DONE, None)
+    assert job["finished_at"] is not None
+    assert store.latest_done()["id"] == job_id
+    assert store.get("missing") is None
+
+
+def test_cancel_and_accept_requests(store):
+    job_id = store.create({})
+    assert store.requests(job_id) == (False, False)
+    store.request_accept(job_id)
+    assert store.requests(job_id) == (False, True)
+    store.request_cancel(job_id)
+    assert store.cancel_requested(job_id)
+    assert store.requests(job_id) == (True, True)
+    assert jobs.job_status(store.get(job_id))["cancel_requested"]
+    assert store.requests("missing") == (False, False)
+
+
+def test_events_resume_after_an_id(store):
+    job_id = store.create({})
+    for count in range(3):
+        store.add_event(job_id, "solution", {"solutions": count + 1})
+    store.add_event(store.create({}), "solution", {"solutions": 1})
+
+    events = store.events(job_id)
+    assert [event["data"]["solutions"] for event in events] == [1, 2, 3]
+    assert store.events(job_id, after=events[1]["id"]) == events[2:]
+
+
+def test_fail_unfinished_only_touches_queued_and_running_jobs(store):
+    queued, running, done = store.create({}), store.create({}), store.create({})
+    store.update(running, status=RUNNING)
+    store.finish(done, DONE, result={})
+
+    assert store.fail_unfinished(jobs.INTERRUPTED_ERROR) == 2
+    assert [store.get(job_id)["status"] for job_id in (queued, running, done)] == [FAILED, FAILED, DONE]
+    assert store.get(queued)["error"] == jobs.INTERRUPTED_ERROR
+    assert store.fail_unfinished(jobs.INTERRUPTED_ERROR) == 0
+
+
+def test_worker_solves_a_job(store):
+    job_id = store.create(timetable_payload())
+    jobs.run_timetable_job(store.path, job_id)
+
+    job = store.get(job_id)
+    assert job["status"] == DONE
+    assert job["started_at"] <= job["finished_at"]
+    assert jobs.previous_result(store, {"previous_job_id": job_id}).status == "OPTIMAL"
+    assert store.events(job_id)[0]["event"] == "solution"
+
+
+def test_worker_skips_a_job_cancelled_while_queued(store):
+    job_id = store.create(timetable_payload())
+    store.request_cancel(job_id)
+    jobs.run_timetable_job(store.path, job_id)
+    assert store.get(job_id)["status"] == CANCELLED
+
+
+def test_worker_records_a_failure(store):
+    job_id = store.create({"years_sections": None})
+    jobs.run_timetable_job(store.path, job_id)
+
+    job = store.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"]
+
+
+def finish_job(queue, store, cache_key, result):
+    """Run JobQueue's completion handling for a job the worker finished with result."""
+    job_id = store.create({})
+    store.finish(job_id, DONE, result=result)
+    queue.job_keys[job_id] = cache_key
+    future = Future()
+    future.set_result(None)
+    queue._on_done(job_id, future)
+    return job_id
+
+
+def test_only_finished_searches_are_cached(store, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    finished = []
+    queue = JobQueue(store, result_cache=cache, on_finish=lambda job, result: finished.append(result))
+
+    finish_job(queue, store, "optimal", {"status": "OPTIMAL", "statistics": {}})
+    finish_job(queue, store, "accepted", {"status": "OPTIMAL", "statistics": {"accepted": True}})
+    finish_job(queue, store, "time limit", {"status": "FEASIBLE", "statistics": {}})
+
+    assert cache.get("optimal") is not None
+    assert cache.get("accepted") is None and cache.get("time limit") is None
+    assert len(finished) == 3
+
+    # A cached result is answered by an already finished job, without a worker
+    job_id = queue.submit({}, cache_key="optimal")
+    assert store.get(job_id)["status"] == DONE
+    assert queue.executor is None
+
+
+class IdleExecutor:
+    """Accepts jobs but never runs them, so they stay queued."""
+
+    def submit(self, fn, *args):
+        return Future()
+
+
+def test_shared_job_is_cancelled_once_every_submitter_cancels(store, tmp_path):
+    queue = JobQueue(store, result_cache=ResultCache(str(tmp_path / "cache.db")))
+    queue.executor = IdleExecutor()
+    job_id = queue.submit({}, cache_key="same")
+    assert queue.submit({}, cache_key="same") == job_id
+
+    assert not queue.cancel(job_id)
+    assert store.get(job_id)["status"] == QUEUED and not store.cancel_requested(job_id)
+
+    assert queue.cancel(job_id)
+    assert store.get(job_id)["status"] == CANCELLED
+    # An identical submission after the cancel gets a job of its own
+    assert queue.submit({}, cache_key="same") != job_id
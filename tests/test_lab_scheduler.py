@@ -0,0 +1,206 @@
+import random
+
+import pytest
+
+import generate_lab_timetable
+from benchmarks.bench_lab_scheduler import synthetic_demand
+
+
+def original_allocation(years_sections, num_labs_per_section, subjects_per_year):
+    """
+    The list-based greedy scheduler greedy_lab_allocation replaced, as it was before
+    (printing left out), to compare schedules with.
+    """
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+    time_slots = [(8, 11), (11, 14), (14, 17)]
+    saturday_slots = [(8, 11), (11, 14)]
+    lab_pairs = [(1, 2), (3, 4), (5, 6)]
+
+    lab_schedule = []
+    section_list = [(year, section) for year in years_sections for section in years_sections[year]]
+    priority_queue = sorted([(year, section, num_labs_per_section[section])
+                             for year, section in section_list
+                             if num_labs_per_section[section] > 0],
+                            key=lambda x: x[2], reverse=True)
+
+    def slots(day):
+        return saturday_slots if day == 'Saturday' else time_slots
+
+    lab_usage = {day: {slot: set() for slot in slots(day)} for day in days}
+    year_slot_usage = {day: {slot: set() for slot in slots(day)} for day in days}
+    section_slot_usage = {day: {slot: set() for slot in slots(day)} for day in days}
+    section_subject_state = {section: {'cycle_position': 0, 'assigned_dates': set()}
+                             for year in years_sections for section in years_sections[year]}
+    total_labs_to_assign = sum(num_labs_per_section.values())
+    labs_assigned = 0
+    tried_slots = {(year, section): set() for year, section in section_list}
+    attempt_counter = 0
+
+    while priority_queue and labs_assigned < total_labs_to_assign and attempt_counter < 1000:
+        attempt_counter += 1
+        year, section, _ = priority_queue.pop(0)
+        if num_labs_per_section[section] < 2:
+            continue
+        subject_count = len(subjects_per_year[year])
+        if subject_count < 2:
+            continue
+
+        cycle_pos = section_subject_state[section]['cycle_position']
+        subjects = subjects_per_year[year]
+        if subject_count == 2:
+            subject1, subject2 = (subjects[0], subjects[1]) if cycle_pos == 0 else (subjects[1], subjects[0])
+        elif subject_count == 3:
+            subject1, subject2 = [(subjects[0], subjects[1]), (subjects[2], subjects[0]),
+                                  (subjects[1], subjects[2])][cycle_pos]
+        else:
+            subject1, subject2 = subjects[cycle_pos % subject_count], subjects[(cycle_pos + 1) % subject_count]
+
+        assigned = False
+        for day in days:
+            if day in section_subject_state[section]['assigned_dates']:
+                continue
+            for time_slot in slots(day):
+                if (day, time_slot) in tried_slots[(year, section)]:
+                    continue
+                tried_slots[(year, section)].add((day, time_slot))
+                if section in section_slot_usage[day][time_slot] or year in year_slot_usage[day][time_slot]:
+                    continue
+                for lab1, lab2 in lab_pairs:
+                    if lab1 in lab_usage[day][time_slot] or lab2 in lab_usage[day][time_slot]:
+                        continue
+                    lab_usage[day][time_slot].update((lab1, lab2))
+                    year_slot_usage[day][time_slot].add(year)
+                    section_slot_usage[day][time_slot].add(section)
+                    time_text = f'{time_slot[0]}:00 - {time_slot[1]}:00'
+                    for batch, lab, subject in ((1, lab1, subject1), (2, lab2, subject2)):
+                        lab_schedule.append({'Year': year, 'Section': section, 'Day': day, 'Time': time_text,
+                                             'Batch': f'Batch {batch} (Lab {lab}, {subject})', 'Subject': subject})
+                    num_labs_per_section[section] -= 2
+                    labs_assigned += 2
+                    section_subject_state[section]['assigned_dates'].add(day)
+                    section_subject_state[section]['cycle_position'] = (cycle_pos + 1) % subject_count
+                    assigned = True
+                    break
+                if assigned:
+                    break
+            if assigned:
+                break
+
+        if num_labs_per_section[section] >= 2:
+            priority_queue.append((year, section, num_labs_per_section[section]))
+
+    return lab_schedule
+
+
+def random_department(seed):
+    """years_sections, num_labs_per_section and subjects_per_year of a random department."""
+    rng = random.Random(seed)
+    years_sections, labs, subjects = {}, {}, {}
+    for year in map(str, range(rng.randint(1, 5))):
+        years_sections[year] = [f"{year}{letter}" for letter in "ABCDEFGH"[:rng.randint(1, 8)]]
+        subjects[year] = [f"Lab {k}" for k in range(rng.choice([1, 2, 2, 3, 3, 4, 5]))]
+        for section in years_sections[year]:
+            labs[section] = rng.choice([0, 1, 2, 3, 4, 4, 6, 8])
+    return years_sections, labs, subjects
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_schedule_matches_the_original_scheduler(seed):
+    years_sections, labs, subjects = random_department(seed)
+    expected = original_allocation(years_sections, dict(labs), subjects)
+    remaining = dict(labs)
+    schedule = generate_lab_timetable.greedy_lab_allocation(years_sections, remaining, subjects)
+
+    assert schedule == expected
+    assert sum(remaining.values()) == sum(labs.values()) - len(schedule)
+
+
+def assert_no_conflicts(schedule, labs):
+    """No lab used twice at once, one session per year and slot and per section and day, no extra labs."""
+    labs_in_use = set()
+    sessions = set()
+    for entry in schedule:
+        lab = entry["Batch"].split("Lab ")[1].split(",")[0]
+        assert (entry["Day"], entry["Time"], lab) not in labs_in_use
+        labs_in_use.add((entry["Day"], entry["Time"], lab))
+        sessions.add((entry["Year"], entry["Section"], entry["Day"], entry["Time"]))
+    assert len({(year, day, time) for year, _, day, time in sessions}) == len(sessions)
+    assert len({(section, day) for _, section, day, _ in sessions}) == len(sessions)
+    for section, requested in labs.items():
+        assert sum(1 for entry in schedule if entry["Section"] == section) <= requested
+
+
+def test_large_department_is_scheduled_without_conflicts():
+    years_sections, labs, subjects = synthetic_demand(200, 4)
+    schedule = generate_lab_timetable.greedy_lab_allocation(years_sections, dict(labs), subjects)
+
+    assert_no_conflicts(schedule, labs)
+    # Every (day, slot, lab pair) of the week is used
+    assert len(schedule) == 2 * generate_lab_timetable.LabResources.default().max_sessions_per_week()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_exact_mode_is_valid_and_never_worse_than_greedy(seed):
+    years_sections, labs, subjects = random_department(seed)
+    greedy = generate_lab_timetable.allocate_labs(years_sections, labs, subjects, "greedy")
+    exact = generate_lab_timetable.allocate_labs(years_sections, labs, subjects, "exact", time_limit=5.0)
+
+    assert_no_conflicts(exact["schedule"], labs)
+    assert len(exact["schedule"]) >= len(greedy["schedule"])
+    assert (sum(demand["remaining"] for demand in exact["unassigned"].values())
+            == sum(labs.values()) - len(exact["schedule"]))
+
+
+def test_exact_mode_finds_pairs_greedy_misses():
+    # Greedy takes the first free pair, (1, 2), which blocks both others; (1, 4) and (3, 2) fit together
+    resources = generate_lab_timetable.LabResources.from_dict({
+        "labs": [{"id": lab} for lab in range(1, 5)],
+        "pairs": [[1, 2], [1, 4], [3, 2]],
+        "calendar": {"Monday": [[8, 11]]},
+    })
+    years_sections, labs, subjects = {"1": ["A"], "2": ["B"]}, {"A": 2, "B": 2}, {"1": ["P", "C"], "2": ["P", "C"]}
+    greedy = generate_lab_timetable.allocate_labs(years_sections, labs, subjects, "greedy", resources=resources)
+    exact = generate_lab_timetable.allocate_labs(years_sections, labs, subjects, "exact", resources=resources)
+
+    assert (len(greedy["schedule"]), list(greedy["unassigned"])) == (2, ["B"])
+    assert (len(exact["schedule"]), exact["mode"], exact["unassigned"]) == (4, "exact", {})
+    assert_no_conflicts(exact["schedule"], labs)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        generate_lab_timetable.allocate_labs({}, {}, {}, "optimal")
+
+
+@pytest.mark.parametrize("data", [
+    {"labs": 5},
+    {"labs": [{"id": 1}, {"id": 2}], "pairs": 3},
+    {"labs": [{"id": "a"}, {"id": "b"}], "pairs": [[["x"], "b"]]},
+    {"labs": [{"id": "a"}, {"id": "b"}], "pairs": [[{"id": "a"}, "b"]]},
+    {"calendar": {"Monday": 5}},
+    {"calendar": {"Monday": [[8, 11], 5]}},
+    {"calendar": {"Monday": [[8, 11], [11, 11.5]]}},
+])
+def test_malformed_lab_resources_are_rejected_with_a_value_error(data):
+    data = dict({"labs": [{"id": lab} for lab in range(1, 7)]}, **data)
+    with pytest.raises(ValueError):
+        generate_lab_timetable.LabResources.from_dict(data)
+
+
+def test_lab_resources_round_trip():
+    data = {"labs": [{"id": 1, "capacity": 30}, {"id": 2, "capacity": None}], "pairs": [[1, 2]],
+            "calendar": {"Tuesday": [(11, 14), [8, 11]]}, "min_capacity": 0}
+    resources = generate_lab_timetable.LabResources.from_dict(data)
+
+    assert resources.calendar == {"Tuesday": [(8, 11), (11, 14)]}
+    assert generate_lab_timetable.LabResources.from_dict(resources.to_dict()).to_dict() == resources.to_dict()
+
+
+def test_malformed_lab_resources_are_a_bad_request(client):
+    response = client.post("/generate_lab_timetable", json={
+        "years_sections": {"1": ["A"]}, "labs_per_sections": {"A": 2}, "subjects_per_year": {"1": ["P", "C"]},
+        "lab_resources": {"labs": [{"id": 1}, {"id": 2}], "calendar": {"Monday": 5}},
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("lab_resources: calendar: Monday")
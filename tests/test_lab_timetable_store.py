@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import lab_timetable_store
+
+SCHEDULE = [
+    {"Year": 1, "Section": "A", "Day": "Monday", "Time": "8:00 - 11:00",
+     "Batch": "Batch 1 (Lab 1, Physics)", "Subject": "Physics"},
+    {"Year": 1, "Section": "A", "Day": "Monday", "Time": "8:00 - 11:00",
+     "Batch": "Batch 2 (Lab 2, Chemistry)", "Subject": "Chemistry"},
+]
+
+
+class RecordingCursor:
+    """Records execute and executemany calls; inserts get id 7."""
+
+    def __init__(self):
+        self.calls = []
+        self.lastrowid = None
+
+    def execute(self, query, values=None):
+        self.calls.append(("execute", query, values))
+        self.lastrowid = 7
+
+    def executemany(self, query, rows):
+        self.calls.append(("executemany", query, rows))
+
+
+def test_save_timetable_stores_json_and_one_row_per_session():
+    cursor = RecordingCursor()
+    assert lab_timetable_store.save_timetable(cursor, SCHEDULE) == 7
+
+    (_, insert, values), (method, _, rows) = cursor.calls
+    assert insert.startswith("INSERT INTO lab_timetables")
+    assert json.loads(values[0]) == SCHEDULE
+    assert method == "executemany"
+    assert rows == [(7, "1", "A", "Monday", "8:00 - 11:00", "Batch 1 (Lab 1, Physics)", "Physics"),
+                    (7, "1", "A", "Monday", "8:00 - 11:00", "Batch 2 (Lab 2, Chemistry)", "Chemistry")]
+
+
+def test_empty_timetable_has_no_sessions():
+    cursor = RecordingCursor()
+    lab_timetable_store.save_timetable(cursor, [])
+    assert [call[0] for call in cursor.calls] == ["execute"]
+
+
+@pytest.mark.parametrize("value", [json.dumps(SCHEDULE), json.dumps(SCHEDULE).encode(), SCHEDULE])
+def test_load_timetable_reads_json(value):
+    assert lab_timetable_store.load_timetable(value) == SCHEDULE
+
+
+def test_load_timetable_reads_rows_from_before_the_migration():
+    assert lab_timetable_store.load_timetable(repr(SCHEDULE)) == SCHEDULE
+
+
+def test_load_timetable_rejects_anything_else():
+    with pytest.raises(ValueError):
+        lab_timetable_store.load_timetable("[{'Year': 1,")
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+
+import pytest
+
+SCHEDULES = {
+    3: [{"Year": "1", "Section": "A", "Day": "Monday", "Time": "8:00 - 11:00",
+         "Batch": "Batch 1 (Lab 1, Physics)", "Subject": "Physics"}],
+    # Stored before the JSON migration
+    2: repr([{"Year": "1", "Section": "B", "Day": "Friday", "Time": "11:00 - 14:00",
+              "Batch": "Batch 2 (Lab 2, Chemistry)", "Subject": "Chemistry"}]),
+    1: [],
+}
+
+
+@pytest.fixture
+def queries(app_module, monkeypatch):
+    """The (query, values) of every fetch_data call, answered from SCHEDULES."""
+    calls = []
+
+    def fetch_data(query, values=None):
+        calls.append((query, list(values)))
+        if query.startswith("SELECT t.id"):
+            *_, limit = values
+            ids = sorted(SCHEDULES, reverse=True)
+            if "t.id < %s" in query:
+                ids = [timetable_id for timetable_id in ids if timetable_id < values[0]]
+            return [{"id": timetable_id, "created_date": datetime(2024, 1, timetable_id)}
+                    for timetable_id in ids[:limit]]
+        return [{"id": timetable_id,
+                 "timetable": SCHEDULES[timetable_id] if isinstance(SCHEDULES[timetable_id], str)
+                 else json.dumps(SCHEDULES[timetable_id])}
+                for timetable_id in values]
+
+    monkeypatch.setattr(app_module, "fetch_data", fetch_data)
+    return calls
+
+
+def test_pages_follow_the_cursor(client, queries):
+    first = client.get("/generate_lab_timetable?limit=2").get_json()
+    assert [item["id"] for item in first["items"]] == [3, 2]
+    assert first["items"][0]["created_date"] == "2024-01-03T00:00:00"
+    assert first["items"][1]["timetable"][0]["Section"] == "B"
+    assert first["next_cursor"] == "2"
+
+    second = client.get(f"/generate_lab_timetable?limit=2&cursor={first['next_cursor']}").get_json()
+    assert second == {"items": [{"id": 1, "created_date": "2024-01-01T00:00:00", "timetable": []}],
+                      "next_cursor": None}
+
+
+def test_metadata_skips_loading_timetables(client, queries):
+    body = client.get("/generate_lab_timetable?fields=metadata").get_json()
+    assert body["items"][0] == {"id": 3, "created_date": "2024-01-03T00:00:00"}
+    assert len(queries) == 1
+
+
+def test_filters_become_query_conditions(client, queries):
+    client.get("/generate_lab_timetable?fields=id&year=1&section=A&created_from=2024-01-02")
+    [(query, values)] = queries
+    assert "t.created_date >= %s" in query
+    assert "EXISTS (SELECT 1 FROM lab_sessions s WHERE s.timetable_id = t.id AND s.year = %s AND s.section = %s)" in query
+    assert values == [datetime(2024, 1, 2), "1", "A", 20]
+
+
+def test_matching_etag_is_not_modified(client, queries):
+    response = client.get("/generate_lab_timetable")
+    again = client.get("/generate_lab_timetable", headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+    # Only the page of ids was read the second time
+    assert len(queries) == 3
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=101", "limit=x", "cursor=x", "created_to=June", "fields=name"])
+def test_invalid_queries_are_rejected(client, queries, query):
+    assert client.get(f"/generate_lab_timetable?{query}").status_code == 400
+    assert queries == []
+
+
+def test_unreadable_timetable_is_reported(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "fetch_data", lambda query, values=None: (
+        [{"id": 3, "created_date": datetime(2024, 1, 3)}] if query.startswith("SELECT t.id")
+        else [{"id": 3, "timetable": "not a timetable"}]))
+    response = client.get("/generate_lab_timetable")
+    assert response.status_code == 500
+    assert "neither JSON nor a Python literal" in response.get_json()["error"]
@@ -0,0 +1,29 @@
+from benchmarks.bench_gap_encoding import synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+
+def solve_lns(instance, **options):
+    options = SolverOptions(strategy="lns", num_search_workers=1, random_seed=1, **options)
+    solver = IntegratedTimetableSolver(options=options, **instance)
+    solver.create_variables()
+    solver.add_constraints()
+    return solver.solve()
+
+
+def test_lns_schedules_every_hour():
+    result = solve_lns(synthetic_instance(3), max_time_in_seconds=30.0, lns_neighbourhood_time=2.0)
+
+    assert result.status == "FEASIBLE"
+    lns = result.statistics["lns"]
+    assert lns["missing_hours"] == 0
+    assert lns["scheduled_hours"] == lns["required_hours"]
+
+
+def test_lns_without_a_time_limit_stops_when_hours_cannot_fit():
+    instance = dict(synthetic_instance(2), hours_input=12)
+    result = solve_lns(instance, lns_neighbourhood_time=1.0)
+
+    assert result.status == "UNKNOWN"
+    lns = result.statistics["lns"]
+    assert lns["missing_hours"] > 0
+    assert lns["scheduled_hours"] < lns["required_hours"]
@@ -0,0 +1,72 @@
+import pytest
+
+import metrics
+
+
+def test_counter_and_gauge_render_one_line_per_series():
+    registry = metrics.Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    requests.labels("/a").inc()
+    requests.labels("/a").inc(2)
+    requests.labels('say "hi"\n').inc()
+    workers = registry.gauge("workers", "Workers.")
+    workers.set(3)
+    workers.dec()
+
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/a"} 3\n'
+        'requests_total{route="say \\"hi\\"\\n"} 1\n'
+        "# HELP workers Workers.\n"
+        "# TYPE workers gauge\n"
+        "workers 2\n"
+    )
+    with pytest.raises(ValueError):
+        requests.labels("/a").inc(-1)
+    with pytest.raises(ValueError):
+        requests.labels("/a", "extra")
+    with pytest.raises(ValueError):
+        registry.gauge("workers", "Again.")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.Registry()
+    duration = registry.histogram("duration_seconds", "Duration.", buckets=(1.0, 0.5))
+    for value in (0.2, 0.5, 0.7, 3.0):
+        duration.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'duration_seconds_bucket{le="0.5"} 2',
+        'duration_seconds_bucket{le="1"} 3',
+        'duration_seconds_bucket{le="+Inf"} 4',
+        "duration_seconds_sum 4.4",
+        "duration_seconds_count 4",
+    ]
+
+
+def test_collected_values_are_read_at_render_time():
+    registry = metrics.Registry()
+    sizes = {"a": 1, "b": None}
+    registry.collect("gauge", "size", "Size.", ("name",), lambda: list(sizes.items()))
+    assert registry.render().splitlines()[2:] == ['size{name="a"} 1']
+    sizes["a"] = 5
+    assert registry.render().splitlines()[2:] == ['size{name="a"} 5']
+    with pytest.raises(ValueError):
+        registry.collect("histogram", "other", "Other.", (), lambda: [])
+
+
+def test_metrics_endpoint_reports_requests_and_jobs(app_module, client):
+    client.get("/jobs/missing")
+    app_module.record_timetable_job(
+        {"status": "done", "started_at": 10.0, "finished_at": 12.5},
+        {"status": "OPTIMAL", "wall_time": 2.0, "statistics": {"model": {"variables": 500, "constraints": 800}}})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/jobs/<job_id>",code="404"} ' in text
+    assert 'timetable_solves_total{outcome="done",status="OPTIMAL"} ' in text
+    assert 'timetable_model_variables_bucket{le="1000"} ' in text
+    assert "timetable_jobs_in_flight " in text
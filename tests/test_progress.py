@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from benchmarks.bench_gap_encoding import synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+
+def build(progress, **options):
+    options = SolverOptions(num_search_workers=1, random_seed=1, **options)
+    solver = IntegratedTimetableSolver(options=options, progress=progress, **synthetic_instance(8))
+    solver.create_variables()
+    solver.add_constraints()
+    return solver
+
+
+def test_every_solution_is_reported():
+    summaries = []
+    result = build(summaries.append, objective="soft").solve()
+
+    assert summaries and [summary["solution"] for summary in summaries] == list(range(1, len(summaries) + 1))
+    last = summaries[-1]
+    assert last["search"] == "search"
+    assert last["objective"] == result.statistics["penalties"]["total"]
+    assert last["class_hours"] == last["required_hours"]
+    assert last["sections_complete"] == last["sections"] == 8
+    assert "accepted" not in result.statistics
+
+
+def test_accept_ends_the_search_at_the_first_solution():
+    summaries = []
+
+    def progress(summary):
+        summaries.append(summary)
+        solver.accept()
+
+    solver = build(progress, objective="soft")
+    result = solver.solve()
+
+    assert len(summaries) == 1
+    assert result.feasible and result.statistics["accepted"]
+
+
+def test_accept_before_any_solution_waits_for_the_first():
+    solver = build(None)
+    solver.accept()
+    assert not solver.accepted
+    result = solver.solve()
+    assert result.feasible and result.statistics["accepted"]
+
+
+@pytest.fixture
+def job_store(app_module):
+    return app_module.job_queue.store
+
+
+def events(response):
+    """The (event, id, data) of a Server-Sent Events response."""
+    parsed = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        parsed.append((fields["event"], fields.get("id"), json.loads(fields["data"])))
+    return parsed
+
+
+def test_events_stream_solutions_then_the_finished_status(client, job_store):
+    job_id = job_store.create({})
+    for count in (1, 2):
+        job_store.add_event(job_id, "solution", {"solution": count})
+    job_store.finish(job_id, "done", result={})
+
+    response = client.get(f"/jobs/{job_id}/events")
+    assert response.mimetype == "text/event-stream"
+    stream = events(response)
+    assert [(event, data.get("solution")) for event, _, data in stream] == [
+        ("solution", 1), ("solution", 2), ("status", None)]
+    assert stream[-1][2]["status"] == "done"
+
+    resumed = events(client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": stream[0][1]}))
+    assert [data.get("solution") for _, _, data in resumed] == [2, None]
+
+
+def test_events_of_unknown_jobs_and_bad_ids(client, job_store):
+    assert client.get("/jobs/missing/events").status_code == 404
+    job_id = job_store.create({})
+    assert client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": "x"}).status_code == 400
+
+
+def test_accept_is_recorded_for_unfinished_jobs(client, job_store):
+    job_id = job_store.create({})
+    response = client.post(f"/jobs/{job_id}/accept")
+    assert response.status_code == 200
+    assert job_store.requests(job_id) == (False, True)
+    assert client.post("/jobs/missing/accept").status_code == 404
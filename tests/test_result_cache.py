@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache
+
+
+class Clock:
+    """Stands in for time.time so entries can be aged past the TTL."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "time", clock)
+    return clock
+
+
+def test_memory_hit_then_disk_hit(tmp_path, clock):
+    path = tmp_path / "cache.db"
+    ResultCache(path).put("key", {"status": "OPTIMAL"})
+
+    # Another process sharing the file finds it on disk, then in memory
+    cache = ResultCache(path)
+    assert cache.get("key") == {"status": "OPTIMAL"}
+    assert cache.get("key") == {"status": "OPTIMAL"}
+    assert cache.get("other") is None
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = ResultCache(tmp_path / "cache.db", ttl=60)
+    cache.put("key", [1, 2, 3])
+    clock.now += 60
+    assert cache.get("key") == [1, 2, 3]
+
+    clock.now += 1
+    assert cache.get("key") is None
+    # Expired in memory and on disk, and deleted from disk
+    assert cache.stats()["expired"] == 2
+    assert ResultCache(tmp_path / "cache.db", ttl=3600).get("key") is None
+
+
+def test_purge_expired_deletes_old_disk_entries(tmp_path, clock):
+    cache = ResultCache(tmp_path / "cache.db", ttl=60)
+    cache.put("old", 1)
+    clock.now += 30
+    cache.put("new", 2)
+    clock.now += 40
+
+    assert cache.purge_expired() == 1
+    assert cache.get("new") == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResultCache(None, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # b is now the least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_tier_is_bounded_by_size(clock):
+    value = "x" * 100
+    size = len(json.dumps(value))
+    cache = ResultCache(None, max_bytes=2 * size)
+    for key in ("a", "b", "c"):
+        cache.put(key, value)
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2 and stats["memory_bytes"] == 2 * size
+    assert cache.get("a") is None
+
+    # A value larger than the whole tier is not kept in memory
+    cache.put("big", "y" * 1000)
+    assert cache.get("big") is None
+    assert cache.get("c") == value
+
+
+def test_keys_ignore_field_order_and_default_options():
+    payload = {"years_sections": {"1": ["A"]}, "num_subjects": 4, "solver_options": {}}
+    reordered = {"solver_options": {"gap_encoding": "linear"}, "num_subjects": 4, "years_sections": {"1": ["A"]}}
+    assert result_cache.timetable_key(payload) == result_cache.timetable_key(reordered)
+    assert result_cache.timetable_key(dict(payload, num_subjects=5)) != result_cache.timetable_key(payload)
+    assert result_cache.timetable_key(dict(payload, warm_start={"job_id": "x"})) is None
@@ -0,0 +1,64 @@
+import pytest
+from ortools.sat.python import cp_model
+
+from benchmarks.bench_gap_encoding import synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+from solver_profile import SolverProfiler
+
+
+def build(num_sections=6, **options):
+    options = SolverOptions(num_search_workers=1, random_seed=1, **options)
+    solver = IntegratedTimetableSolver(options=options, profiler=SolverProfiler(), **synthetic_instance(num_sections))
+    solver.create_variables()
+    solver.add_constraints()
+    return solver
+
+
+def test_objective_is_the_penalty_breakdown():
+    soft = build(objective="soft", late_hour=14)
+    result = soft.solve()
+    assert result.status == "OPTIMAL"
+
+    penalties = result.statistics["penalties"]
+    assert penalties == soft.penalty_breakdown(result.class_keys())
+    [search] = result.profile["searches"]
+    assert search["objective"] == penalties["total"]
+
+    # The hard model's timetable, also valid in soft mode, costs no less
+    hard = build().solve()
+    assert hard.status == "OPTIMAL"
+    hard_penalties = soft.penalty_breakdown(hard.class_keys())
+    assert hard_penalties["gaps"]["count"] == 0
+    assert hard_penalties["total"] >= penalties["total"]
+
+
+def test_soft_gaps_are_counted_not_forbidden():
+    solver = IntegratedTimetableSolver(options=SolverOptions(objective="soft"), **synthetic_instance(1))
+    model = solver.model
+    slots = [f"slot{k}" for k in range(6)]
+    pattern = (1, 0, 1, 0, 0, 1)
+    slot_used = {("Monday", slot): model.NewConstant(used) for slot, used in zip(slots, pattern)}
+    extra_gaps = solver.add_gap_constraints_linear("1", "S0", "Monday", slots, slot_used, soft=True)
+    model.Minimize(extra_gaps)
+
+    cp_solver = cp_model.CpSolver()
+    assert cp_solver.Solve(model) == cp_model.OPTIMAL
+    assert cp_solver.Value(extra_gaps) == 2
+
+
+def test_zero_weight_drops_a_penalty():
+    solver = build(objective="soft", penalty_weights={"late_classes": 0})
+    assert "late_classes" not in solver.penalties
+    assert solver.penalty_breakdown(set())["late_classes"]["weight"] == 0
+
+
+@pytest.mark.parametrize("options", [
+    {"penalty_weights": {"noise": 1}},
+    {"penalty_weights": {"gaps": -1}},
+    {"penalty_weights": {"gaps": True}},
+    {"objective": "soft", "strategy": "lns"},
+    {"objective": "fastest"},
+])
+def test_invalid_soft_options(options):
+    with pytest.raises(ValueError):
+        SolverOptions(**options)
@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.bench_gap_encoding import synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+from solver_profile import ProfileListener, SolverProfiler
+
+
+class RecordingListener(ProfileListener):
+    def __init__(self):
+        self.spans = []
+        self.searches = []
+
+    def on_span(self, span):
+        self.spans.append(span)
+
+    def on_search(self, search):
+        self.searches.append(search)
+
+
+def solve(profiler=None):
+    solver = IntegratedTimetableSolver(options=SolverOptions(num_search_workers=1, random_seed=1),
+                                       profiler=profiler, **synthetic_instance(4))
+    solver.create_variables()
+    solver.add_constraints()
+    return solver, solver.solve()
+
+
+def test_profile_covers_every_phase():
+    listener = RecordingListener()
+    solver, result = solve(SolverProfiler([listener]))
+    profile = result.profile
+
+    assert set(profile["phases"]) >= {"init", "create_variables", "constraints", "search", "render"}
+    for phase, seconds in profile["phases"].items():
+        assert seconds == pytest.approx(sum(span["seconds"] for span in profile["spans"]
+                                            if span["name"].split(".")[0] == phase))
+    # The spans account for the whole model
+    proto = solver.model.Proto()
+    assert sum(span["variables"] for span in profile["spans"]) == len(proto.variables)
+    assert sum(span["constraints"] for span in profile["spans"]) == len(proto.constraints)
+
+    [search] = profile["searches"]
+    assert (search["name"], search["status"]) == ("search", result.status)
+    assert listener.spans == profile["spans"] and listener.searches == profile["searches"]
+    assert result.to_dict()["profile"] == profile
+
+
+def test_no_profile_without_a_profiler():
+    _, result = solve()
+    assert result.profile is None
@@ -0,0 +1,94 @@
+import copy
+
+import pytest
+from ortools.sat.python import cp_model
+
+from benchmarks.bench_gap_encoding import synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+
+class DenseSolver(IntegratedTimetableSolver):
+    """
+    The model before class variables became sparse: a variable for every slot, with
+    the slots class_slot_mask leaves out forced to zero as constraints 4, 6, 7 and 11 did.
+    """
+
+    def class_slot_mask(self, year, section, day):
+        return (1 << len(self.time_slots)) - 1
+
+    def add_constraints(self):
+        super().add_constraints()
+        masks = {}
+        for (year, section, subject, day, slot), var in self.schedule.items():
+            key = (year, section, day)
+            if key not in masks:
+                masks[key] = IntegratedTimetableSolver.class_slot_mask(self, year, section, day)
+            if not masks[key] >> self.time_slots.index(slot) & 1:
+                self.model.Add(var == 0)
+
+
+def build(solver_class, instance):
+    options = SolverOptions(num_search_workers=1, random_seed=1)
+    solver = solver_class(options=options, **instance)
+    solver.create_variables()
+    solver.add_constraints()
+    return solver
+
+
+def accepts(solver_class, instance, result):
+    """Whether the model of solver_class admits the classes and labs of result."""
+    solver = build(solver_class, instance)
+    classes = result.class_keys()
+    if not classes <= solver.schedule.keys():
+        return False
+    assignment = [(var, key in classes) for key, var in solver.schedule.items()]
+    return cp_model.CpSolver().Solve(solver.fixed_model(assignment)) == cp_model.OPTIMAL
+
+
+def joint_instance(num_sections):
+    """synthetic_instance with the labs placed by the solver, two sessions per section."""
+    instance = synthetic_instance(num_sections)
+    instance["lab_schedule"] = None
+    instance["lab_demand"] = {
+        "labs_per_section": {section: 2 for sections in instance["years_sections"].values() for section in sections},
+        "subjects_per_year": {year: ["Lab A", "Lab B"] for year in instance["years_sections"]},
+    }
+    return instance
+
+
+def overloaded_instance(num_sections):
+    """synthetic_instance with more class hours than a week holds."""
+    instance = synthetic_instance(num_sections)
+    instance["hours_input"] = 12
+    return instance
+
+
+INSTANCES = {
+    "fixed labs": lambda: synthetic_instance(4),
+    "more sections": lambda: synthetic_instance(8),
+    "three hours a subject": lambda: dict(synthetic_instance(4), hours_input=3),
+    "overloaded": lambda: overloaded_instance(2),
+}
+
+
+@pytest.mark.parametrize("name", INSTANCES)
+def test_sparse_and_dense_models_agree(name):
+    instance = INSTANCES[name]()
+    sparse, dense = build(IntegratedTimetableSolver, instance), build(DenseSolver, copy.deepcopy(instance))
+    assert len(sparse.schedule) < len(dense.schedule)
+
+    sparse_result, dense_result = sparse.solve(), dense.solve()
+    assert sparse_result.status == dense_result.status
+    if sparse_result.feasible:
+        assert accepts(DenseSolver, instance, sparse_result)
+        assert accepts(IntegratedTimetableSolver, instance, dense_result)
+
+
+def test_sparse_and_dense_models_agree_with_joint_labs():
+    instance = joint_instance(3)
+    sparse, dense = build(IntegratedTimetableSolver, instance), build(DenseSolver, copy.deepcopy(instance))
+    sparse_result, dense_result = sparse.solve(), dense.solve()
+
+    assert sparse_result.status == dense_result.status == "OPTIMAL"
+    assert accepts(DenseSolver, instance, sparse_result)
+    assert accepts(IntegratedTimetableSolver, instance, dense_result)
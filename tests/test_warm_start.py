@@ -0,0 +1,90 @@
+import copy
+
+from benchmarks.bench_gap_encoding import LAB_TIMES, synthetic_instance
+from integrate_timetable_solver import IntegratedTimetableSolver, SolverOptions
+
+NUM_SECTIONS = 8
+
+
+def first_solution(instance, previous=None):
+    """The first timetable found."""
+    # One worker and a fixed seed keep the search, and so its branch count, reproducible
+    options = SolverOptions(num_search_workers=1, random_seed=1, stop_after_first_solution=True)
+    solver = IntegratedTimetableSolver(options=options, **instance)
+    solver.create_variables()
+    solver.add_constraints()
+    if previous is not None:
+        solver.warm_start(previous)
+    return solver.solve()
+
+
+def test_unchanged_timetable_is_the_first_solution():
+    instance = synthetic_instance(NUM_SECTIONS)
+    previous = first_solution(instance)
+    cold = first_solution(instance)
+    warm = first_solution(instance, previous)
+
+    statistics = warm.statistics["warm_start"]
+    assert statistics["complete"] and statistics["hints_changed"] == 0
+    assert statistics["classes_kept"] == statistics["matched_classes"] == statistics["previous_classes"]
+    assert statistics["hints_kept"] == statistics["hinted_variables"]
+    assert warm.class_keys() == previous.class_keys()
+    # The hint is feasible as it is, so no search is needed to reach it
+    assert warm.statistics["num_branches"] == 0 < cold.statistics["num_branches"]
+
+
+def test_moved_lab_keeps_most_of_the_previous_timetable():
+    instance = synthetic_instance(NUM_SECTIONS)
+    previous = first_solution(instance)
+    # Move the lab of S5 over one of its previous classes
+    lab = next(entry for entry in instance["lab_schedule"] if entry["Section"] == "S5")
+    day, slot = next((day, slot) for year, section, subject, day, slot in sorted(previous.class_keys())
+                     if section == "S5" and day != lab["Day"])
+    hour = int(slot.split(":")[0])
+    changed = copy.deepcopy(instance)
+    moved = next(entry for entry in changed["lab_schedule"] if entry["Section"] == "S5")
+    moved.update(Day=day, Time=next(lab_time for lab_time in LAB_TIMES
+                                    if int(lab_time.split(":")[0]) <= hour < int(lab_time.split(" - ")[1].split(":")[0])))
+    warm = first_solution(changed, previous)
+
+    assert warm.status in ("OPTIMAL", "FEASIBLE")
+    statistics = warm.statistics["warm_start"]
+    # The previous timetable no longer fits; the closest one that does is hinted
+    assert statistics["complete"]
+    assert statistics["hints_changed"] > 0
+    assert statistics["classes_kept"] >= 0.9 * statistics["matched_classes"]
+
+
+def warm_started(instance, previous, **options):
+    """A solver for instance, built and warm started from previous."""
+    solver = IntegratedTimetableSolver(options=SolverOptions(num_search_workers=1, random_seed=1, **options),
+                                       **instance)
+    solver.create_variables()
+    solver.add_constraints()
+    solver.warm_start(previous)
+    return solver
+
+
+def test_hint_completion_counts_against_the_time_limit():
+    instance = synthetic_instance(NUM_SECTIONS)
+    previous = first_solution(instance)
+    solver = warm_started(instance, previous, max_time_in_seconds=30.0)
+
+    assert solver.hint_counts["complete"]
+    assert 0 < solver.hint_time < 30.0
+    assert solver.search_time_limit() == 30.0 - solver.hint_time
+    assert warm_started(instance, previous).search_time_limit() is None
+
+
+def test_stop_before_the_warm_start_skips_hint_completion():
+    instance = synthetic_instance(NUM_SECTIONS)
+    previous = first_solution(instance)
+    solver = IntegratedTimetableSolver(options=SolverOptions(num_search_workers=1), **instance)
+    solver.create_variables()
+    solver.add_constraints()
+    solver.stop()
+    solver.warm_start(previous)
+
+    assert not solver.hint_counts["complete"]
+    assert solver.cp_solver is None
+    assert solver.solve().status == "UNKNOWN"
@@ -0,0 +1,213 @@
+from tabulate import tabulate
+
+
+class TimetableResult:
+    """
+    Outcome of IntegratedTimetableSolver.solve().
+
+    - status: CP-SAT status name (OPTIMAL, FEASIBLE, INFEASIBLE, UNKNOWN, ...)
+    - wall_time: CP-SAT search time in seconds
+    - output: the solver's printed report
+    - time_slots, days: the axes of every grid
+    - sections: {year: {section: {"grid": {day: [cell per slot]}, "daily_hours": {day: {...}}}}}
+    - teachers: {teacher: {"grid", "weekly_hours", "lab_sessions", "daily_load", "subjects"}}
+    - language_sync: {year: {"subject": lang, "slots": [{"day", "slot", "sections"}]}}
+    - teacher_assignments: {year: {"required_teachers", "core_subjects", "additional_subjects",
+                                   "teachers_assigned", "sections": {section: {subject: teacher}}}}
+    - statistics: solver and schedule counters
+    - lab_schedule: the lab sessions the timetable was built around, as generate_lab_timetable
+      entries; in joint mode these were chosen by the same solve
+    - diff: for an incremental re-solve, the section cells that changed against the
+      previous timetable (see timetable_diff); None otherwise
+    - profile: phase timings, model sizes and CP-SAT search statistics (see
+      solver_profile.SolverProfiler.report) when the solver was given a profiler; None otherwise
+
+    A grid cell is None for a free slot, or a dict with a "type" of "class", "lab" or "break".
+    Everything except status, wall_time and statistics is empty when no timetable was found.
+    """
+
+    def __init__(
+        self,
+        status,
+        wall_time,
+        output="",
+        time_slots=None,
+        days=None,
+        sections=None,
+        teachers=None,
+        language_sync=None,
+        teacher_assignments=None,
+        statistics=None,
+        lab_schedule=None,
+        diff=None,
+        profile=None
+    ):
+        self.status = status
+        self.wall_time = wall_time
+        self.output = output
+        self.time_slots = time_slots or []
+        self.days = days or []
+        self.sections = sections or {}
+        self.teachers = teachers or {}
+        self.language_sync = language_sync or {}
+        self.teacher_assignments = teacher_assignments or {}
+        self.statistics = statistics or {}
+        self.lab_schedule = lab_schedule or []
+        self.diff = diff
+        self.profile = profile
+
+    @property
+    def feasible(self):
+        return self.status in ('OPTIMAL', 'FEASIBLE')
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "wall_time": self.wall_time,
+            "output": self.output,
+            "time_slots": self.time_slots,
+            "days": self.days,
+            "sections": self.sections,
+            "teachers": self.teachers,
+            "language_sync": self.language_sync,
+            "teacher_assignments": self.teacher_assignments,
+            "statistics": self.statistics,
+            "lab_schedule": self.lab_schedule,
+            "diff": self.diff,
+            "profile": self.profile,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def class_keys(self):
+        """The scheduled classes as (year, section, subject, day, slot) keys, the solver's variable keys."""
+        keys = set()
+        for year, year_sections in self.sections.items():
+            for section, timetable in year_sections.items():
+                for day, row in timetable["grid"].items():
+                    for slot, cell in zip(self.time_slots, row):
+                        if cell and cell["type"] == "class":
+                            keys.add((year, section, cell["subject"], day, slot))
+        return keys
+
+
+def timetable_diff(before, after):
+    """
+    Section cells that differ between two TimetableResults, as a list of
+    {"year", "section", "day", "slot", "before", "after"} in timetable order.
+    A section that is new in after compares against empty cells.
+    """
+    changes = []
+    for year, year_sections in after.sections.items():
+        for section, timetable in year_sections.items():
+            previous = before.sections.get(year, {}).get(section, {}).get("grid", {})
+            for day, row in timetable["grid"].items():
+                previous_row = previous.get(day, [None] * len(row))
+                for slot, old, new in zip(after.time_slots, previous_row, row):
+                    if old != new:
+                        changes.append({"year": year, "section": section, "day": day, "slot": slot,
+                                        "before": old, "after": new})
+    return changes
+
+
+def format_section_cell(cell):
+    if cell is None:
+        return "--"
+    if cell["type"] == "lab":
+        return f"LAB {cell['subject']} ({cell['batch']})"
+    if cell["type"] == "break":
+        return "BREAK"
+    return f"{cell['subject']} ({cell['teacher']})"
+
+
+def format_teacher_cell(cell):
+    if cell is None:
+        return "--"
+    if cell["type"] == "lab":
+        return f"LAB {cell['year']}-{cell['section']} {cell['subject']}"
+    return f"{cell['year']}-{cell['section']} {cell['subject']}"
+
+
+def format_text(result):
+    """Render a TimetableResult as the plain-text tabulate report."""
+    lines = []
+    if not result.feasible:
+        lines.append("\nNo timetable to show.")
+        return "\n".join(lines) + "\n"
+
+    headers = ["Day"] + result.time_slots
+
+    lines.append("\nComplete Timetable Generated Successfully!")
+
+    # Combined timetable for each year and section
+    for year, year_sections in result.sections.items():
+        for section, timetable in year_sections.items():
+            lines.append(f"\n=== Year {year}, Section {section} Timetable ===")
+            table_data = [[day] + [format_section_cell(cell) for cell in timetable["grid"][day]]
+                          for day in result.days]
+            lines.append(tabulate(table_data, headers=headers, tablefmt="grid"))
+
+            lines.append("\nDaily Hours Summary:")
+            for day in result.days:
+                hours = timetable["daily_hours"][day]
+                lines.append(f"{day}: {hours['total']} hours (Lab: {hours['lab']}, "
+                             f"Class: {hours['class']}, Break: {hours['break']})")
+
+    # Language subject synchronization summary
+    if result.language_sync:
+        lines.append("\nLanguage Subject Synchronization Summary:")
+        for year, sync in result.language_sync.items():
+            lines.append(f"\nYear {year} - Language Subject: {sync['subject']}")
+            for entry in sync["slots"]:
+                lines.append(f"  {entry['day']}, {entry['slot']}: {sync['subject']} scheduled for sections "
+                             f"{', '.join(entry['sections'])}")
+
+    # Teacher assignment summary
+    lines.append("\nTeacher Assignment Summary:")
+    for year, summary in result.teacher_assignments.items():
+        lines.append(f"\nYear {year}:")
+        lines.append(f"  Required teachers for core subjects: {summary['required_teachers']}")
+        lines.append(f"  Sections: {len(summary['sections'])}")
+        lines.append(f"  Core subjects: {len(summary['core_subjects'])}")
+        if summary["additional_subjects"]:
+            lines.append(f"  Additional subjects: {len(summary['additional_subjects'])}")
+        lines.append(f"  Total teachers assigned: {summary['teachers_assigned']}")
+        lines.append("  Teacher assignments per section:")
+        for section, assignments in summary["sections"].items():
+            lines.append(f"    Section {section}:")
+            for title, subjects in (("Core Subjects", summary["core_subjects"]),
+                                    ("Additional Subjects", summary["additional_subjects"])):
+                if subjects:
+                    lines.append(f"      {title}:")
+                    for subject in subjects:
+                        lines.append(f"        {subject}: {assignments[subject]}")
+
+    # Summary statistics
+    stats = result.statistics
+    lines.append("\nSchedule Summary:")
+    lines.append(f"Total scheduled classes: {stats['total_classes']}")
+    lines.append(f"Total scheduled lab sessions: {stats['total_lab_sessions']}")
+    lines.append(f"Total break slots: {stats['break_slots']}")
+
+    # Individual teacher timetables
+    lines.append("\n===== INDIVIDUAL TEACHER TIMETABLES =====")
+    lines.append(f"Total teachers: {len(result.teachers)}")
+    for teacher, timetable in result.teachers.items():
+        lines.append(f"\n\n== Timetable for Teacher: {teacher} ==")
+        table_data = [[day] + [format_teacher_cell(cell) for cell in timetable["grid"][day]]
+                      for day in result.days]
+        lines.append(tabulate(table_data, headers=headers, tablefmt="grid"))
+
+        lines.append(f"\nSummary for {teacher}:")
+        lines.append(f"Total teaching hours per week: {timetable['weekly_hours']}")
+        lines.append(f"Total lab supervision sessions: {timetable['lab_sessions']}")
+        lines.append("Daily teaching load:")
+        for day, hours in timetable["daily_load"].items():
+            lines.append(f"  {day}: {hours} hours")
+        lines.append("Subjects taught:")
+        for subject in timetable["subjects"]:
+            lines.append(f"  {subject}")
+
+    return "\n".join(lines) + "\n"